@@ -1,8 +1,29 @@
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from starlette.routing import Match
 from pydantic import BaseModel
-from wallet_yield import get_wallet_yield
-from utils.llm_parser import parse_nlp_to_payload
+from wallet_yield import (
+    get_wallet_yield_cached_async, get_multi_chain_yield_async, refresh_wallet_yield_async, chains_for_wallet,
+    explorer_wait_time, loaded_clients, SUPPORTED_CHAINS
+)
+from protocols.defillama import (
+    schedule_pool_refresh, get_pool_snapshot_async, load_pool_snapshot_from_disk, current_pool_snapshot
+)
+from utils.http_client import close_async_client
+from utils.llm_parser import parse_nlp_to_payload_async
+from utils.batch import stream_wallet_yields
+from utils.watchlist import get_watchlist, PrewarmScheduler
+from utils.apy_history import backtest_positions
+from utils.simulator import SimulationParams, simulate_reallocation_cached
+from utils.alerts import get_alert_hub, check_webhook_url
+from utils.config import BATCH_CONCURRENCY, SERVER_TIMING, SHARED_CACHE_PATH, APY_HISTORY_DAYS, warn_missing_keys
+from utils.metrics import (
+    HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT, render_metrics, start_request_timing, server_timing_header
+)
+import asyncio
+import math
 import os
+import time
 
 
 app = FastAPI(
@@ -11,22 +32,106 @@ app = FastAPI(
     version="6.0.0"
 )
 
-SUPPORTED_CHAINS = ["ethereum", "avalanche", "arbitrum", "optimism", "base", "solana"]
-
-
 class WalletYieldRequest(BaseModel):
     wallet: str | None = None
     chain: str | None = None
+    chains: list[str] | None = None
     openai_api_key: str | None = None
     model: str | None = "gpt-4o"
     input: str | None = None
 
 
+@app.on_event("startup")
+async def warm_pool_snapshot():
+    warn_missing_keys()
+    # ✅ Map the last snapshot file (milliseconds, even if stale), then refresh in the background
+    await asyncio.to_thread(load_pool_snapshot_from_disk)
+    schedule_pool_refresh()
+
+
+_prewarm = PrewarmScheduler(get_watchlist(), refresh_wallet_yield_async, explorer_wait_time)
+
+
+@app.on_event("startup")
+async def start_prewarm():
+    # ✅ Keep watched wallets' results warm in the result cache
+    _prewarm.start()
+
+
+@app.on_event("startup")
+async def start_alerts():
+    # ✅ Alerts raised by pool snapshot refreshes are delivered on this loop
+    get_alert_hub().start()
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await _prewarm.stop()
+    await get_alert_hub().stop()
+    await close_async_client()
+
+
+def _route_path(request: Request) -> str:
+    # Label by route template, so arbitrary URLs cannot blow up the metric series
+    for route in app.router.routes:
+        if route.matches(request.scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    path = _route_path(request)
+    timings = start_request_timing() if SERVER_TIMING or request.headers.get("x-server-timing") == "1" else None
+
+    HTTP_IN_FLIGHT.inc(path=path)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        HTTP_IN_FLIGHT.dec(path=path)
+
+    elapsed = time.perf_counter() - started
+    HTTP_REQUESTS.inc(path=path, status=response.status_code)
+    HTTP_SECONDS.observe(elapsed, path=path)
+
+    # ✅ Opt-in breakdown of where the time went (streamed responses finish after this point)
+    if timings is not None:
+        timings["total"] = elapsed
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+@app.get("/ready")
+def ready():
+    # ✅ Load balancers route to a worker only once it has a pool snapshot to answer from
+    snapshot = current_pool_snapshot()
+    state = {
+        "ready": snapshot is not None,
+        "state": "warm" if snapshot is not None else "cold",
+        "pid": os.getpid(),
+        "pool_snapshot": None if snapshot is None else {
+            "version": snapshot.version,
+            "pools": len(snapshot),
+            "age_seconds": round(time.time() - snapshot.fetched_at, 1),
+            "stale": snapshot.is_stale(),
+        },
+        "protocol_clients": loaded_clients(),
+        "shared_cache": SHARED_CACHE_PATH or None,
+    }
+    return JSONResponse(state, status_code=200 if snapshot is not None else 503)
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def home():
     return {
         "message": "✅ Yield Optimizer MCP is live!",
-        "usage": "POST /wallet-yield with {'wallet':..., 'chain':..., 'openai_api_key':...} OR {'input': 'Natural language', openai_api_key}",
+        "usage": "POST /wallet-yield with {'wallet':..., 'chain':..., 'openai_api_key':...} OR {'input': 'Natural language', openai_api_key}. Use 'chain': 'all' or 'chains': [...] to check several chains at once.",
         "supported_chains": SUPPORTED_CHAINS
     }
 
@@ -37,6 +142,17 @@ async def wallet_yield(request: Request):
 
     wallet = data.get("wallet")
     chain = (data.get("chain") or "").lower()
+    requested = data.get("chains") or []
+    if not isinstance(requested, list) or not all(isinstance(c, str) for c in requested):
+        raise HTTPException(status_code=400, detail="❌ 'chains' must be a list of chain names.")
+
+    # ✅ Unsupported entries are dropped before the fan-out instead of failing one by one
+    chains = [c.lower() for c in requested if c.lower() in SUPPORTED_CHAINS]
+    if requested and not chains:
+        raise HTTPException(
+            status_code=400,
+            detail=f"❌ Unsupported chains {requested}. Supported chains are: {SUPPORTED_CHAINS}"
+        )
 
     # ✅ Read API Key and Model from body or fallback to ENV
     openai_api_key = data.get("openai_api_key") or os.getenv("OPENAI_API_KEY")
@@ -48,17 +164,52 @@ async def wallet_yield(request: Request):
             detail="❌ 'openai_api_key' is required either in request body or set in .env (ENV variable)."
         )
 
-    # ✅ If NLP input is provided, parse it
+    wallets = [wallet] if wallet else []
+
+    # ✅ If NLP input is provided, parse it (regex fast path; the LLM is only a fallback)
     if "input" in data and data["input"]:
         try:
-            parsed = parse_nlp_to_payload(data["input"], openai_api_key, model)
-            wallet = parsed.get("wallet", wallet)
-            chain = parsed.get("chain", chain).lower()
+            parsed = await parse_nlp_to_payload_async(data["input"], openai_api_key, model)
         except Exception as e:
             raise HTTPException(
                 status_code=400,
                 detail=f"❌ NLP parsing failed: {str(e)}"
             )
+        wallets = parsed["wallets"]
+        chain = "all" if "all" in parsed["chains"] else parsed["chain"]
+        chains = parsed["chains"] if len(parsed["chains"]) > 1 and chain != "all" else []
+        if len(wallets) == 1:
+            wallet_chains = _wallet_chains(wallets[0], chain, chains)
+            chain, chains = (wallet_chains[0], []) if len(wallet_chains) == 1 else (None, wallet_chains)
+
+    # ✅ Several wallets in one sentence are looked up concurrently, one output entry each
+    if len(wallets) > 1:
+        async def _one_wallet(w):
+            wallet_chains = _wallet_chains(w, chain, chains)
+            try:
+                if len(wallet_chains) == 1:
+                    return (await _wallet_yield_response(w, wallet_chains[0], []))["output"]
+                return (await _wallet_yield_response(w, None, wallet_chains))["output"]
+            except HTTPException as e:
+                return {"wallet": w, "error": e.detail}
+
+        return {"output": await asyncio.gather(*(_one_wallet(w) for w in wallets))}
+
+    return await _wallet_yield_response(wallets[0] if wallets else None, chain, chains)
+
+
+def _wallet_chains(wallet: str, chain: str, chains: list) -> list:
+    # Only the chains this address can live on, e.g. a Solana wallet next to "on eth"
+    possible = chains_for_wallet(wallet)
+    return [c for c in chains or [chain] if c == "all" or c in possible] or possible
+
+
+async def _wallet_yield_response(wallet: str, chain: str, chains: list):
+    if wallet and chain == "all":
+        chains = chains_for_wallet(wallet)
+
+    if wallet and chains:
+        return await _multi_chain_wallet_yield(wallet, chains)
 
     if not wallet or not chain:
         raise HTTPException(
@@ -72,9 +223,9 @@ async def wallet_yield(request: Request):
             detail=f"❌ Unsupported chain '{chain}'. Supported chains are: {SUPPORTED_CHAINS}"
         )
 
-    # ✅ Fetch yield data
+    # ✅ Fetch yield data (served from the result cache while the wallet has no new transfers)
     try:
-        result = get_wallet_yield(wallet, chain)
+        result = await get_wallet_yield_cached_async(wallet, chain)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -90,6 +241,236 @@ async def wallet_yield(request: Request):
     return {"output": result}
 
 
+async def _multi_chain_wallet_yield(wallet: str, chains: list):
+    unsupported = [c for c in chains if c not in SUPPORTED_CHAINS]
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail=f"❌ Unsupported chains {unsupported}. Supported chains are: {SUPPORTED_CHAINS}"
+        )
+
+    # ✅ Query every chain concurrently; failed chains are reported, not raised
+    try:
+        result = await get_multi_chain_yield_async(wallet, chains)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"❌ Internal error fetching yield: {str(e)}"
+        )
+
+    if len(result["failed_chains"]) == len(chains):
+        raise HTTPException(status_code=404, detail="❌ No data found for this wallet on any chain.")
+
+    return {"output": result}
+
+
+@app.post("/wallet-yield/batch")
+async def wallet_yield_batch(request: Request):
+    data = await request.json()
+    items = data.get("wallets") if isinstance(data, dict) else None
+
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=400,
+            detail="❌ 'wallets' must be a list of {'wallet': ..., 'chain': ...} entries."
+        )
+
+    try:
+        concurrency = int(data.get("concurrency", BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="❌ 'concurrency' must be an integer.")
+
+    # ✅ Each result is streamed as one NDJSON line as soon as it is ready
+    return StreamingResponse(
+        stream_wallet_yields(items, concurrency),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/wallet-yield/backtest")
+async def wallet_yield_backtest(request: Request):
+    data = await request.json()
+    wallet = data.get("wallet")
+    chain = (data.get("chain") or "").lower()
+
+    try:
+        days = float(data.get("days", 30))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="❌ 'days' must be a number.")
+    if not math.isfinite(days) or days <= 0:
+        raise HTTPException(status_code=400, detail="❌ 'days' must be a positive number.")
+    # History older than APY_HISTORY_DAYS has been pruned, so a longer window has nothing to replay
+    if days > APY_HISTORY_DAYS:
+        raise HTTPException(status_code=400, detail=f"❌ 'days' must be at most {APY_HISTORY_DAYS} (APY_HISTORY_DAYS).")
+    if chain == "all":
+        raise HTTPException(status_code=400, detail="❌ Backtests run on one chain at a time; 'all' is not supported.")
+
+    # ✅ Current positions and their matched pools, replayed against the recorded APY history
+    result = (await _wallet_yield_response(wallet, chain, []))["output"]
+    try:
+        backtest = await asyncio.to_thread(backtest_positions, result.get("positions", []), days)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"❌ Internal error running backtest: {str(e)}"
+        )
+
+    return {"output": {"wallet": wallet, "chain": chain, "days": days, **backtest}}
+
+
+@app.post("/wallet-yield/simulate")
+async def wallet_yield_simulate(request: Request):
+    data = await request.json()
+    wallet = data.get("wallet")
+    chain = (data.get("chain") or "").lower()
+    if chain == "all":
+        raise HTTPException(status_code=400, detail="❌ Simulations run on one chain at a time; 'all' is not supported.")
+
+    try:
+        params = SimulationParams.for_chain(
+            chain,
+            gas_usd=data.get("gas_usd"),
+            swap_fee_bps=data.get("swap_fee_bps"),
+            max_tvl_share=data.get("max_tvl_share"),
+            horizon_days=data.get("horizon_days"),
+        )
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=400,
+            detail="❌ 'gas_usd', 'swap_fee_bps', 'max_tvl_share' and 'horizon_days' must be numbers."
+        )
+
+    # ✅ Current positions, searched against the current pool snapshot (plans are cached per snapshot version)
+    result = (await _wallet_yield_response(wallet, chain, []))["output"]
+    snapshot = await get_pool_snapshot_async()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="❌ Pool data is not available yet.")
+
+    try:
+        simulation = await simulate_reallocation_cached(result.get("positions", []), chain, snapshot, params)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"❌ Internal error running simulation: {str(e)}"
+        )
+
+    return {"output": {"wallet": wallet, **simulation}}
+
+
+def _watch_entries(data) -> list:
+    items = data.get("wallets") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=400,
+            detail="❌ 'wallets' must be a list of {'wallet': ..., 'chain': ...} entries."
+        )
+
+    pairs = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not all(isinstance(item.get(k), str) and item[k] for k in ("wallet", "chain")):
+            raise HTTPException(
+                status_code=400,
+                detail=f"❌ Entry {index}: each entry needs 'wallet' and 'chain' strings."
+            )
+        wallet, chain = item["wallet"], item["chain"].lower()
+        chains = chains_for_wallet(wallet) if chain == "all" else [chain]
+        unsupported = [c for c in chains if c not in SUPPORTED_CHAINS]
+        if unsupported:
+            raise HTTPException(
+                status_code=400,
+                detail=f"❌ Entry {index}: unsupported chains {unsupported}. Supported chains are: {SUPPORTED_CHAINS}"
+            )
+        pairs.extend((wallet, c) for c in chains)
+    return pairs
+
+
+@app.post("/watchlist")
+async def watch_wallets(request: Request):
+    pairs = _watch_entries(await request.json())
+    watchlist = get_watchlist()
+
+    # ✅ Watched pairs are refreshed in the background; unrequested ones age out
+    rejected = [{"wallet": w, "chain": c} for w, c in pairs if not watchlist.watch(w, c)]
+    return {"output": {"watched": len(pairs) - len(rejected), "rejected": rejected}}
+
+
+@app.delete("/watchlist")
+async def unwatch_wallets(request: Request):
+    pairs = _watch_entries(await request.json())
+    watchlist = get_watchlist()
+    return {"output": {"removed": sum(watchlist.unwatch(w, c) for w, c in pairs)}}
+
+
+@app.get("/watchlist")
+def list_watched_wallets():
+    return {"output": get_watchlist().snapshot()}
+
+
+def _optional_number(data: dict, key: str):
+    value = data.get(key)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"❌ '{key}' must be a number.")
+
+
+@app.post("/alerts")
+async def subscribe_alerts(request: Request):
+    data = await request.json()
+    wallet = data.get("wallet")
+    chain = (data.get("chain") or "").lower()
+    webhook_url = data.get("webhook_url")
+    if chain == "all":
+        raise HTTPException(status_code=400, detail="❌ Alerts watch one chain at a time; 'all' is not supported.")
+
+    if webhook_url:
+        try:
+            await check_webhook_url(str(webhook_url))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"❌ {e}")
+    thresholds = {key: _optional_number(data, key) for key in ("apy_change", "apy_below", "apy_above")}
+
+    # ✅ The subscription watches the pools behind the wallet's current positions
+    result = (await _wallet_yield_response(wallet, chain, []))["output"]
+    subscription = get_alert_hub().subscribe(wallet, chain, result, webhook_url, **thresholds)
+    if subscription is None:
+        raise HTTPException(status_code=429, detail="❌ Alert subscription limit reached.")
+
+    return {"output": {
+        "id": subscription["id"],
+        "pools": len(subscription["pools"]),
+        "stream": f"/alerts/{subscription['id']}/stream"
+    }}
+
+
+@app.get("/alerts")
+def list_alerts():
+    return {"output": get_alert_hub().snapshot()}
+
+
+@app.delete("/alerts/{subscription_id}")
+def unsubscribe_alerts(subscription_id: str):
+    if not get_alert_hub().unsubscribe(subscription_id):
+        raise HTTPException(status_code=404, detail="❌ Unknown alert subscription.")
+    return {"output": {"removed": subscription_id}}
+
+
+@app.get("/alerts/{subscription_id}/stream")
+def stream_alerts(subscription_id: str):
+    hub = get_alert_hub()
+    if hub.get(subscription_id) is None:
+        raise HTTPException(status_code=404, detail="❌ Unknown alert subscription.")
+
+    # ✅ Server-sent events: one 'alert' event per snapshot that moved a watched pool
+    return StreamingResponse(
+        hub.stream(subscription_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
 @app.get("/metadata")
 def metadata():
     return {
@@ -101,10 +482,13 @@ def metadata():
 
         JSON keys:
         - 'wallet': Wallet address (optional if using 'input')
-        - 'chain': Blockchain name like 'ethereum' (optional if using 'input')
+        - 'chain': Blockchain name like 'ethereum', or 'all' (optional if using 'input')
+        - 'chains': List of blockchain names to check concurrently (optional)
         - 'openai_api_key': OpenAI API Key for NLP parsing (optional if set in ENV)
         - 'model': OpenAI model like 'gpt-4o' (optional if set in ENV, defaults to 'gpt-4o')
-        - 'input': Natural language query like 'Check yield for wallet 0xabc on ethereum'
+        - 'input': Natural language query like 'Check yield for wallet 0xabc on ethereum'.
+          Chain aliases (eth, avax, arb, op, sol), Solana addresses, and several wallets or chains are understood;
+          the OpenAI model is only consulted when these cannot be found.
         """,
         "https_uri": "https://penguin-wholesale-tin-voltage.trycloudflare.com",
         "endpoint": "https://penguin-wholesale-tin-voltage.trycloudflare.com/wallet-yield/",
@@ -112,9 +496,43 @@ def metadata():
         "input_format": {
             "input": "Optional. Natural language like 'Check yield for wallet 0xabc on ethereum'.",
             "wallet": "Wallet address (optional if using 'input')",
-            "chain": f"Blockchain name (one of {SUPPORTED_CHAINS}, optional if using 'input')",
+            "chain": f"Blockchain name (one of {SUPPORTED_CHAINS} or 'all', optional if using 'input')",
+            "chains": "Optional. List of blockchain names to check concurrently.",
             "openai_api_key": "Required if not set in .env (OPENAI_API_KEY).",
             "model": "OpenAI model like 'gpt-4o' (optional if not set in .env, defaults to gpt-4o)"
         },
-        "output": "Returns wallet holdings, USD value, best APY yield, protocol, and estimated yearly yield."
+        "batch_endpoint": "https://penguin-wholesale-tin-voltage.trycloudflare.com/wallet-yield/batch",
+        "batch_input_format": {
+            "wallets": "List of {'wallet': ..., 'chain': ...} entries.",
+            "concurrency": "Optional. Maximum lookups in flight (defaults to BATCH_CONCURRENCY)."
+        },
+        "backtest_endpoint": "https://penguin-wholesale-tin-voltage.trycloudflare.com/wallet-yield/backtest",
+        "backtest_input_format": {
+            "wallet": "Wallet address",
+            "chain": f"Blockchain name (one of {SUPPORTED_CHAINS})",
+            "days": "Optional. Window length in days (defaults to 30)."
+        },
+        "simulate_endpoint": "https://penguin-wholesale-tin-voltage.trycloudflare.com/wallet-yield/simulate",
+        "simulate_input_format": {
+            "wallet": "Wallet address",
+            "chain": f"Blockchain name (one of {SUPPORTED_CHAINS})",
+            "gas_usd": "Optional. Cost of one move in USD (defaults per chain).",
+            "swap_fee_bps": "Optional. Swap fee when the target pool needs a different token.",
+            "max_tvl_share": "Optional. Largest deposit as a share of the target pool's TVL.",
+            "horizon_days": "Optional. Period one-off costs are spread over (defaults to 365)."
+        },
+        "alerts_endpoint": "https://penguin-wholesale-tin-voltage.trycloudflare.com/alerts",
+        "alerts_input_format": {
+            "wallet": "Wallet address",
+            "chain": f"Blockchain name (one of {SUPPORTED_CHAINS})",
+            "webhook_url": "Optional. Receives each alert as a JSON POST; alerts are also streamed from GET /alerts/{id}/stream (server-sent events).",
+            "apy_change": "Optional. Alert when a watched pool's APY moves this many percentage points (defaults to ALERT_APY_CHANGE).",
+            "apy_below": "Optional. Alert when a watched pool's APY falls below this value.",
+            "apy_above": "Optional. Alert when a watched pool's APY rises above this value."
+        },
+        "watchlist_endpoint": "https://penguin-wholesale-tin-voltage.trycloudflare.com/watchlist",
+        "watchlist_input_format": {
+            "wallets": "POST to watch or DELETE to unwatch a list of {'wallet': ..., 'chain': ...} entries ('chain' may be 'all'). GET lists watched entries."
+        },
+        "output": "Returns wallet holdings, USD value, best risk-adjusted APY yield, protocol, estimated yearly yield, and top alternative pools per position. The batch endpoint streams one NDJSON line per wallet."
     }
\ No newline at end of file
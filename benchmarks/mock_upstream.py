@@ -0,0 +1,202 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from benchmarks import synthetic
+
+
+class MockUpstream:
+    """
+    Local stand-in for every upstream the app calls, serving synthetic data in recorded shapes.
+
+    Routes:
+        /explorer/<chain>/api      Etherscan-family tokentx (windowed by startblock/offset)
+        /pools                     DeFiLlama /pools
+        /prices/current/<keys>     DeFiLlama coins API
+        /helius/v0/addresses/<wallet>/balances
+        POST /helius-rpc           Helius getAssetBatch (mint metadata)
+        POST /rpc/<chain>          Batched EVM JSON-RPC (balanceOf via eth_call, eth_getBalance)
+
+    Args:
+        latency (float): Seconds added to every response, to mimic a network round trip.
+        rate_limit_ratio (float): Share of explorer calls answered with the "rate limit" shape.
+        pool_count (int): Size of the /pools payload.
+        transfers_per_wallet (int): tokentx history length per (wallet, chain).
+    """
+
+    def __init__(self, latency: float = 0.02, rate_limit_ratio: float = 0.0,
+                 pool_count: int = 18000, transfers_per_wallet: int = 300):
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.transfers_per_wallet = transfers_per_wallet
+        self.pools_body = json.dumps(synthetic.generate_pools(pool_count)).encode()
+        self.empty_body = json.dumps(synthetic.load_fixture("tokentx_empty.json")).encode()
+        self.rate_limited_body = json.dumps(synthetic.load_fixture("rate_limited.json")).encode()
+        self.histories = {}
+        self.histories_lock = threading.Lock()
+        self.requests = 0
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """Environment overrides that point the app at this server."""
+        env = {
+            "DEFILLAMA_POOLS_URL": f"{self.url}/pools",
+            "PRICE_API_URL": f"{self.url}/prices/current",
+            "HELIUS_API_URL": f"{self.url}/helius",
+            "HELIUS_RPC_URL": f"{self.url}/helius-rpc",
+        }
+        for chain, url_env in _EXPLORER_URL_ENVS.items():
+            env[url_env] = f"{self.url}/explorer/{chain}/api"
+        for chain, url_env in _RPC_URL_ENVS.items():
+            env[url_env] = f"{self.url}/rpc/{chain}"
+        return env
+
+    def history(self, wallet: str, chain: str) -> list:
+        key = (wallet.lower(), chain)
+        with self.histories_lock:
+            rows = self.histories.get(key)
+            if rows is None:
+                rows = self.histories[key] = synthetic.generate_transfers(wallet, chain, self.transfers_per_wallet)
+        return rows
+
+    def token_balances(self, wallet: str, chain: str) -> dict:
+        """Current raw balance per token contract, consistent with the tokentx history."""
+        return synthetic.balances_from_transfers(self.history(wallet, chain), wallet)
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="mock-upstream", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# Env variables read by utils/config.py for each explorer URL
+_EXPLORER_URL_ENVS = {
+    "ethereum": "ETHERSCAN_API_URL",
+    "avalanche": "SNOWTRACE_API_URL",
+    "arbitrum": "ARBISCAN_API_URL",
+    "optimism": "OPTIMISMSCAN_API_URL",
+    "base": "BASESCAN_API_URL",
+}
+
+# Env variables read by utils/config.py for each JSON-RPC node URL
+_RPC_URL_ENVS = {
+    "ethereum": "ETHEREUM_RPC_URL",
+    "avalanche": "AVALANCHE_RPC_URL",
+    "arbitrum": "ARBITRUM_RPC_URL",
+    "optimism": "OPTIMISM_RPC_URL",
+    "base": "BASE_RPC_URL",
+}
+
+
+def _handler_for(upstream: MockUpstream):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body: bytes, status: int = 200):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            upstream.requests += 1
+            if upstream.latency:
+                time.sleep(upstream.latency)
+
+            parts = urlsplit(self.path)
+            path = parts.path.strip("/").split("/")
+            query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+            if path == ["pools"]:
+                return self._send(upstream.pools_body)
+
+            if path[:2] == ["prices", "current"] and len(path) == 3:
+                keys = unquote(path[2]).split(",")
+                return self._send(json.dumps(synthetic.generate_prices(keys)).encode())
+
+            if path[0] == "helius" and path[-1] == "balances":
+                return self._send(json.dumps(synthetic.generate_solana_balances(path[-2])).encode())
+
+            if path[0] == "explorer" and len(path) == 3:
+                return self._tokentx(path[1], query)
+
+            self._send(b'{"error": "not found"}', 404)
+
+        def do_POST(self):
+            upstream.requests += 1
+            if upstream.latency:
+                time.sleep(upstream.latency)
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            path = urlsplit(self.path).path.strip("/").split("/")
+
+            if path == ["helius-rpc"] and body.get("method") == "getAssetBatch":
+                return self._send(json.dumps(synthetic.generate_asset_batch(body["params"]["ids"])).encode())
+
+            if path[0] == "rpc" and len(path) == 2 and isinstance(body, list):
+                return self._send(json.dumps([self._rpc_call(path[1], call) for call in body]).encode())
+
+            self._send(b'{"error": "not found"}', 404)
+
+        def _rpc_call(self, chain: str, call: dict) -> dict:
+            reply = {"jsonrpc": "2.0", "id": call.get("id")}
+            params = call.get("params") or []
+            if call.get("method") == "eth_getBalance":
+                reply["result"] = hex(synthetic.native_balance(params[0], chain))
+            elif call.get("method") == "eth_call" and params[0].get("data", "").startswith("0x70a08231"):
+                wallet = "0x" + params[0]["data"][-40:]
+                balance = upstream.token_balances(wallet, chain).get(params[0]["to"].lower(), 0)
+                reply["result"] = "0x" + format(max(balance, 0), "064x")
+            else:
+                reply["error"] = {"code": -32601, "message": "method not found"}
+            return reply
+
+        def _tokentx(self, chain: str, query: dict):
+            if upstream.rate_limit_ratio and random.random() < upstream.rate_limit_ratio:
+                return self._send(upstream.rate_limited_body)
+
+            rows = upstream.history(query.get("address", ""), chain)
+            start_block = int(query.get("startblock", 0))
+            offset = int(query.get("offset", 10000))
+            window = [row for row in rows if int(row["blockNumber"]) >= start_block][:offset]
+            if not window:
+                return self._send(upstream.empty_body)
+
+            self._send(json.dumps({"status": "1", "message": "OK", "result": window}).encode())
+
+    return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixtures on a local port.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    upstream = MockUpstream(latency=args.latency_ms / 1000).start(port=args.port)
+    print(f"✅ Mock upstream on {upstream.url}. Point the app at it with:")
+    for name, value in upstream.env().items():
+        print(f"export {name}={value}")
+    threading.Event().wait()
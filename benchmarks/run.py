@@ -0,0 +1,277 @@
+"""
+Offline benchmark suite: microbenchmarks plus end-to-end /wallet-yield/ load
+against a local mock upstream. Results are written as JSON so runs from two
+commits can be compared with --compare.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --concurrency 1,16,64 --requests 500 --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from benchmarks import synthetic
+from benchmarks.mock_upstream import MockUpstream
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Applied before the app is imported, since utils/config.py reads the environment once
+BENCH_ENV = {
+    "OPENAI_API_KEY": "bench",
+    "ETHERSCAN_API_KEY": "bench",
+    "SNOWTRACE_API_KEY": "bench",
+    "ARBISCAN_API_KEY": "bench",
+    "BASESCAN_API_KEY": "bench",
+    "OPTIMISMSCAN_API_KEY": "bench",
+    "HELIUS_API_KEY": "bench",
+    # The mock is not rate limited, and every upstream shares its one host
+    "EXPLORER_RATE_LIMIT": "1000000",
+    "HTTP_MAX_CONNECTIONS_PER_HOST": "200",
+    "DEFILLAMA_POOLS_TTL": "86400",
+    # Measure full work per request; the cached scenario turns the result cache back on
+    "LEDGER_PATH": "",
+    "RESULT_CACHE_TTL": "0",
+    "RESULT_CACHE_URL": "",
+    "SHARED_CACHE_PATH": "",
+}
+
+# Files the app writes while it runs; main() points them into a temporary directory
+BENCH_FILES = {
+    "POOL_SNAPSHOT_PATH": "pool_snapshot.bin",
+    "APY_HISTORY_DIR": "apy_history",
+}
+
+EVM_BENCH_CHAINS = ["ethereum", "avalanche", "arbitrum", "optimism", "base"]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _time_op(fn, repeat: int = 5) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    best = min(runs)
+    return {
+        "best_us": best * 1e6,
+        "mean_us": sum(runs) / len(runs) * 1e6,
+        "ops_per_sec": 1 / best if best else None,
+    }
+
+
+def run_microbenchmarks(pool_count: int) -> dict:
+    """
+    Aggregation, APY matching and parsing, with no I/O.
+    """
+    from protocols.defillama import _build_snapshot
+    from utils.ledger import fold_transfers, balances_to_tokens
+    from utils.llm_parser import _fast_parse
+    from wallet_yield import _build_wallet_yield
+
+    pools = synthetic.generate_pools(pool_count)["data"]
+    snapshot = _build_snapshot(pools)
+    wallet = synthetic.wallet_for(0)
+    rows = synthetic.generate_transfers(wallet, "ethereum", 10000)
+
+    deltas = {}
+    fold_transfers(rows, wallet, deltas)
+    tokens = balances_to_tokens(deltas)
+    symbols = [s for s, _ in synthetic.TOKENS]
+    sentence = f"check yield for {wallet} on eth, arb and base"
+
+    results = {
+        "fold_transfers_10k_rows": _time_op(lambda: fold_transfers(rows, wallet, {})),
+        "balances_to_tokens": _time_op(lambda: balances_to_tokens(deltas)),
+        f"build_snapshot_{pool_count}_pools": _time_op(lambda: _build_snapshot(pools), repeat=3),
+        "best_pools_lookup_x20": _time_op(lambda: [snapshot.best_pools("ethereum", s) for s in symbols]),
+        "build_wallet_yield": _time_op(lambda: _build_wallet_yield(wallet, "ethereum", tokens, snapshot)),
+        "nlp_parse_uncached": _time_op(lambda: _fast_parse.__wrapped__(sentence)),
+    }
+    return results
+
+
+async def _load(client, payload_for, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def _worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/wallet-yield/", json=payload_for(i))
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [l * 1000 for l in latencies]
+    return {
+        "requests": total,
+        "errors": errors,
+        "p50_ms": _percentile(ms, 50),
+        "p90_ms": _percentile(ms, 90),
+        "p99_ms": _percentile(ms, 99),
+        "max_ms": ms[-1] if ms else 0.0,
+        "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+        "throughput_rps": total / wall if wall else None,
+    }
+
+
+async def run_end_to_end(concurrency_levels: list, total: int) -> dict:
+    """
+    Drive the FastAPI app in-process (ASGI transport) against the mock upstream.
+    """
+    import httpx
+    from app import app
+    from protocols.defillama import get_pool_snapshot_async
+    from utils.result_cache import get_result_cache
+
+    await get_pool_snapshot_async()
+    cache = get_result_cache()
+    chains = EVM_BENCH_CHAINS + ["solana"]
+    next_wallet = iter(range(1, 10 ** 9))
+
+    def _uncached(i):
+        chain = chains[i % len(chains)]
+        return {"wallet": synthetic.wallet_for(next(next_wallet), chain), "chain": chain}
+
+    def _cached(i):
+        return {"wallet": synthetic.wallet_for(i % 16), "chain": "ethereum"}
+
+    def _all_chains(i):
+        return {"wallet": synthetic.wallet_for(next(next_wallet)), "chain": "all"}
+
+    scenarios = {
+        "single_chain_uncached": (_uncached, 0, total),
+        "single_chain_cached": (_cached, 300, total),
+        "all_chains_uncached": (_all_chains, 0, max(1, total // 5)),
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, (payload_for, ttl, count) in scenarios.items():
+            cache.ttl = ttl
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                # One unmeasured pass warms connections, prices and (for the cached scenario) results
+                await _load(client, payload_for, min(count, 16), min(concurrency, 16))
+                stats = await _load(client, payload_for, count, concurrency)
+                results[name][str(concurrency)] = stats
+                print(f"  {name:<24} c={concurrency:<4} p50={stats['p50_ms']:8.2f}ms "
+                      f"p99={stats['p99_ms']:8.2f}ms  {stats['throughput_rps']:8.1f} req/s  errors={stats['errors']}")
+
+    return results
+
+
+def compare(current: dict, baseline: dict):
+    """Print relative change per metric; lower is better for times, higher for throughput."""
+    print(f"\n📊 {baseline.get('commit')} -> {current.get('commit')}")
+    for name, stats in current["micro"].items():
+        base = baseline.get("micro", {}).get(name)
+        if base:
+            change = (stats["best_us"] - base["best_us"]) / base["best_us"] * 100
+            print(f"  {name:<32} {base['best_us']:12.2f}us -> {stats['best_us']:12.2f}us  ({change:+.1f}%)")
+
+    for scenario, levels in current["end_to_end"].items():
+        for level, stats in levels.items():
+            base = baseline.get("end_to_end", {}).get(scenario, {}).get(level)
+            if not base:
+                continue
+            p50 = (stats["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100 if base["p50_ms"] else 0
+            rps = (stats["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] * 100
+            print(f"  {scenario:<24} c={level:<4} p50 {p50:+.1f}%  throughput {rps:+.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the yield pipeline against a local mock upstream.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level.")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Simulated upstream latency.")
+    parser.add_argument("--pools", type=int, default=18000, help="Size of the /pools payload.")
+    parser.add_argument("--transfers", type=int, default=300, help="tokentx history length per wallet.")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of explorer calls throttled.")
+    parser.add_argument("--skip-e2e", action="store_true", help="Only run microbenchmarks.")
+    parser.add_argument("--output", help="Result file (defaults to benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    upstream = MockUpstream(
+        latency=args.latency_ms / 1000,
+        rate_limit_ratio=args.rate_limit_ratio,
+        pool_count=args.pools,
+        transfers_per_wallet=args.transfers,
+    ).start()
+    workdir = tempfile.TemporaryDirectory(prefix="yield-bench-")
+    os.environ.update(BENCH_ENV)
+    os.environ.update({name: os.path.join(workdir.name, path) for name, path in BENCH_FILES.items()})
+    os.environ.update(upstream.env())
+
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+    }
+
+    try:
+        print("⏱️ Microbenchmarks")
+        results["micro"] = run_microbenchmarks(args.pools)
+        for name, stats in results["micro"].items():
+            print(f"  {name:<32} {stats['best_us']:12.2f}us")
+
+        results["end_to_end"] = {}
+        if not args.skip_e2e:
+            print("⏱️ End-to-end /wallet-yield/")
+            results["end_to_end"] = asyncio.run(run_end_to_end(levels, args.requests))
+            results["upstream_requests"] = upstream.requests
+    finally:
+        upstream.stop()
+        workdir.cleanup()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# DeFiLlama chain names for each supported chain
+LLAMA_CHAINS = {
+    "ethereum": "Ethereum",
+    "avalanche": "Avalanche",
+    "arbitrum": "Arbitrum",
+    "optimism": "Optimism",
+    "base": "Base",
+    "solana": "Solana",
+}
+
+# Chains in the /pools universe we never query, so the payload has realistic noise
+OTHER_LLAMA_CHAINS = ["BSC", "Polygon", "Fantom", "Tron", "Sui", "Aptos", "Linea", "Scroll", "Blast", "Mantle"]
+
+TOKENS = [
+    ("USDC", 6), ("USDT", 6), ("DAI", 18), ("WETH", 18), ("WBTC", 8), ("LINK", 18), ("UNI", 18),
+    ("AAVE", 18), ("CRV", 18), ("LDO", 18), ("FRAX", 18), ("STETH", 18), ("RETH", 18), ("GHO", 18),
+    ("ARB", 18), ("OP", 18), ("AVAX", 18), ("SNX", 18), ("MKR", 18), ("PENDLE", 18),
+]
+
+STABLECOINS = {"USDC", "USDT", "DAI", "FRAX", "GHO"}
+
+PROJECTS = [
+    "aave-v3", "compound-v3", "uniswap-v3", "curve-dex", "convex-finance", "yearn-finance", "lido",
+    "balancer-v2", "morpho-blue", "pendle", "spark", "stargate", "beefy", "velodrome-v2", "aerodrome-v1",
+]
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return json.load(f)
+
+
+def _rng(*parts) -> random.Random:
+    seed = hashlib.sha256(":".join(str(p) for p in parts).encode()).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def token_contract(chain: str, symbol: str) -> str:
+    return "0x" + hashlib.sha256(f"{chain}:{symbol}".encode()).hexdigest()[:40]
+
+
+def generate_pools(count: int = 18000, seed: int = 7) -> dict:
+    """
+    A /pools payload with the recorded pool shape, scaled to `count` pools.
+
+    Roughly half the pools sit on supported chains, like the live universe.
+    """
+    rng = random.Random(seed)
+    template = load_fixture("pools.json")["data"][0]
+    chains = list(LLAMA_CHAINS.values()) + OTHER_LLAMA_CHAINS
+
+    data = []
+    for i in range(count):
+        symbols = [s for s, _ in rng.sample(TOKENS, rng.choice([1, 1, 2, 2, 3]))]
+        apy = round(rng.lognormvariate(1.3, 1.1), 4)
+        pool = dict(template)
+        pool.update({
+            "chain": rng.choice(chains),
+            "project": rng.choice(PROJECTS),
+            "symbol": "-".join(symbols),
+            "tvlUsd": int(rng.lognormvariate(13, 2.5)),
+            "apyBase": apy,
+            "apy": apy,
+            "pool": f"{i:08x}-bench-pool",
+            "exposure": "single" if len(symbols) == 1 else "multi",
+            "ilRisk": "no" if len(symbols) == 1 else "yes",
+            "stablecoin": all(symbol in STABLECOINS for symbol in symbols),
+            "outlier": apy > 200,
+            "mu": round(apy * rng.uniform(0.7, 1.3), 4),
+            "sigma": round(rng.uniform(0.01, 3), 4),
+        })
+        data.append(pool)
+
+    return {"status": "success", "data": data}
+
+
+def generate_transfers(wallet: str, chain: str, count: int = 300) -> list:
+    """
+    A wallet's full tokentx history in the recorded row shape, ascending by block.
+
+    Mostly incoming transfers across a handful of tokens, so balances stay positive.
+    """
+    rng = _rng(wallet, chain)
+    template = load_fixture("tokentx.json")["result"][0]
+    wallet = wallet.lower()
+    held = rng.sample(TOKENS, 8)
+
+    rows = []
+    block = 18_000_000 + rng.randint(0, 1000)
+    for i in range(count):
+        block += rng.choice([0, 1, 3, 17, 250])
+        symbol, decimals = rng.choice(held)
+        incoming = rng.random() < 0.8
+        counterparty = "0x" + f"{rng.getrandbits(160):040x}"
+        row = dict(template)
+        row.update({
+            "blockNumber": str(block),
+            "hash": "0x" + f"{rng.getrandbits(256):064x}",
+            "from": counterparty if incoming else wallet,
+            "to": wallet if incoming else counterparty,
+            "contractAddress": token_contract(chain, symbol),
+            "value": str(rng.randint(1, 5000) * 10 ** decimals // (1 if incoming else 10)),
+            "tokenName": symbol,
+            "tokenSymbol": symbol,
+            "tokenDecimal": str(decimals),
+        })
+        rows.append(row)
+
+    return rows
+
+
+def balances_from_transfers(rows: list, wallet: str) -> dict:
+    """Net raw balance per token contract after a tokentx history."""
+    wallet = wallet.lower()
+    balances = {}
+    for row in rows:
+        contract = row["contractAddress"].lower()
+        value = int(row["value"])
+        if row["to"].lower() == wallet:
+            balances[contract] = balances.get(contract, 0) + value
+        if row["from"].lower() == wallet:
+            balances[contract] = balances.get(contract, 0) - value
+    return balances
+
+
+def native_balance(wallet: str, chain: str) -> int:
+    return _rng(wallet.lower(), chain, "native").randint(0, 50) * 10 ** 17
+
+
+def generate_solana_balances(wallet: str, spam_tokens: int = 20) -> dict:
+    """
+    A Helius balances payload: known SPL tokens (some without tokenSymbol, as Helius often
+    returns them) plus spam mints no metadata lookup can resolve.
+    """
+    rng = _rng(wallet, "solana")
+    template = load_fixture("helius_balances.json")
+    tokens = []
+    for symbol, decimals in rng.sample(TOKENS, 6):
+        token = dict(template["tokens"][0])
+        token.update({"mint": token_contract("solana", symbol), "tokenSymbol": symbol if rng.random() < 0.5 else None,
+                      "amount": rng.randint(1, 10000) * 10 ** decimals, "decimals": decimals})
+        tokens.append(token)
+    for i in range(spam_tokens):
+        token = dict(template["tokens"][0])
+        token.update({"mint": token_contract("solana", f"spam:{wallet}:{i}"), "tokenSymbol": None,
+                      "amount": rng.randint(1, 10 ** 9), "decimals": 0})
+        tokens.append(token)
+    return {"tokens": tokens, "nativeBalance": template["nativeBalance"]}
+
+
+_SOLANA_MINTS = {token_contract("solana", symbol): (symbol, decimals) for symbol, decimals in TOKENS}
+
+
+def generate_asset_batch(ids: list) -> dict:
+    """A Helius getAssetBatch response; unknown mints come back as null."""
+    result = []
+    for mint in ids:
+        known = _SOLANA_MINTS.get(mint)
+        if known is None:
+            result.append(None)
+            continue
+        symbol, decimals = known
+        result.append({"interface": "FungibleToken", "id": mint, "content": {"metadata": {"symbol": symbol}},
+                       "token_info": {"symbol": symbol, "decimals": decimals}})
+    return {"jsonrpc": "2.0", "id": "mint-metadata", "result": result}
+
+
+def generate_prices(keys: list) -> dict:
+    coins = {}
+    for key in keys:
+        rng = _rng(key)
+        coins[key] = {"decimals": 18, "symbol": "BENCH", "price": round(rng.lognormvariate(0, 2), 6),
+                      "timestamp": 1705369960, "confidence": 0.99}
+    return {"coins": coins}
+
+
+def wallet_for(i: int, chain: str = "ethereum") -> str:
+    """Deterministic benchmark wallet; base58-looking for Solana."""
+    digest = hashlib.sha256(f"bench-wallet:{i}".encode()).hexdigest()
+    if chain == "solana":
+        alphabet = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+        n = int(digest, 16)
+        return "".join(alphabet[(n >> (6 * k)) % 58] for k in range(44))
+    return "0x" + digest[:40]
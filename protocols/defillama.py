@@ -1,22 +1,631 @@
+import asyncio
+import os
+import threading
+import time
+
+import numpy as np
 import requests
+from utils.config import (
+    DEFILLAMA_POOLS_URL, DEFILLAMA_POOLS_TTL, EVM_EXPLORERS, POOL_SNAPSHOT_PATH, POOL_DOWNLOAD_LEASE
+)
+from utils.http_client import async_stream
+from utils.json_stream import JsonArrayStream
+from utils.mmap_store import write_arrays, read_arrays, read_meta
+from utils.ranking import RankingProfile, PoolRanking, DEFAULT_PROFILE
+from utils.apy_history import record_snapshot
+from utils.alerts import get_alert_hub
+from utils import shared_cache
+from utils.metrics import timed, record_upstream, POOL_SNAPSHOT_VERSION, POOL_SNAPSHOT_POOLS
 
-def fetch_defillama_yields(chain: str):
-    url = "https://yields.llama.fi/pools"
-    response = requests.get(url)
-
-    if response.status_code != 200:
-        return []
-
-    pools = response.json().get("data", [])
-    filtered = [
-        {
-            "protocol": pool['project'],
-            "apy": pool.get('apy', 0),
-            "symbol": pool['symbol'],
-            "chain": pool['chain'],
-            "tvlUsd": pool.get('tvlUsd', 0),
-            "url": pool.get('url', '')
+
+# Chains we can score (wallet_yield.SUPPORTED_CHAINS); pools elsewhere are dropped while decoding
+POOL_CHAINS = frozenset(EVM_EXPLORERS) | {"solana"}
+
+# Body chunk size for the streamed /pools download
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Snapshot column -> dtype
+COLUMNS = {
+    "chain": np.int16, "protocol": np.int32, "symbol": np.int32, "url": np.int32, "pool": np.int32,
+    "apy": np.float64, "tvl": np.float64, "sigma": np.float64,
+    "stablecoin": np.bool_, "il_risk": np.bool_, "outlier": np.bool_,
+}
+
+
+class PoolSnapshot:
+    """
+    Process-wide view of the DeFiLlama pool universe at one point in time.
+
+    Pools are stored as columns, one row per pool: strings are interned into
+    small tables and rows hold their ids, APY and TVL sit in float arrays.
+    Pool dicts are only built for the rows a caller asks for.
+
+    Attributes:
+        chain_ids, protocol_ids, symbol_ids, url_ids, pool_ids (np.ndarray): Interned ids per row.
+        apy, tvl, sigma (np.ndarray): APY (%), TVL (USD) and APY volatility per row.
+        stablecoin, il_risk, outlier (np.ndarray): DeFiLlama's boolean risk flags per row.
+        chains, protocols, symbols, urls, pools (list): Id -> string tables.
+        fetched_at (float): Unix timestamp of the upstream download.
+        version (int): Bumped on every successful refresh.
+
+    A snapshot can be saved to and memory-mapped back from one file (see
+    save/load), index included, so a restarted worker is warm in milliseconds.
+    """
+
+    def __init__(self, columns: dict, tables: dict, fetched_at: float, version: int, index: dict = None):
+        self.chain_ids = columns["chain"]
+        self.protocol_ids = columns["protocol"]
+        self.symbol_ids = columns["symbol"]
+        self.url_ids = columns["url"]
+        self.pool_ids = columns["pool"]
+        self.apy = columns["apy"]
+        self.tvl = columns["tvl"]
+        self.sigma = columns["sigma"]
+        self.stablecoin = columns["stablecoin"]
+        self.il_risk = columns["il_risk"]
+        self.outlier = columns["outlier"]
+
+        self.chains = tables["chain"]
+        self.protocols = tables["protocol"]
+        self.symbols = tables["symbol"]
+        self.urls = tables["url"]
+        self.pools = tables["pool"]
+        self.protocol_lookup = {name: i for i, name in enumerate(self.protocols)}
+        self.chain_lookup = {name.lower(): i for i, name in enumerate(self.chains)}
+
+        self.fetched_at = fetched_at
+        self.version = version
+        self._attach_index(index or self._build_symbol_index())
+        self._rankings = {}
+        self._pool_rows = None
+
+    def __len__(self) -> int:
+        return len(self.apy)
+
+    def is_stale(self, ttl: int = DEFILLAMA_POOLS_TTL) -> bool:
+        return time.time() - self.fetched_at >= ttl
+
+    def _build_symbol_index(self):
+        """
+        Index rows by (chain, token) so per-token lookups are O(1).
+
+        Multi-asset pools like "USDC-WETH" are indexed under the full symbol and
+        under each constituent, so a USDC holder also sees the USDC-WETH pool.
+        Rows are grouped by (chain, token) and sorted by APY, best first.
+
+        Returns:
+            dict: Index arrays and the token table, as taken by _attach_index.
+        """
+        token_lookup = {}
+        symbol_tokens = []
+        for symbol in self.symbols:
+            normalized = normalize_symbol(symbol)
+            keys = sorted({normalized, *normalized.split('-')} - {""})
+            symbol_tokens.append([token_lookup.setdefault(k, len(token_lookup)) for k in keys])
+
+        counts = np.array([len(t) for t in symbol_tokens], dtype=np.int64)
+        flat_tokens = np.array([t for tokens in symbol_tokens for t in tokens], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)))[:-1]
+
+        # One entry per (row, token): repeat each row once per constituent of its symbol
+        per_row = counts[self.symbol_ids] if len(self) else np.zeros(0, dtype=np.int64)
+        rows = np.repeat(np.arange(len(self), dtype=np.int64), per_row)
+        within = np.arange(len(rows)) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+        tokens = flat_tokens[np.repeat(offsets[self.symbol_ids], per_row) + within] if len(rows) else rows
+
+        keys = self.chain_ids[rows].astype(np.int64) * max(1, len(token_lookup)) + tokens
+        order = np.lexsort((-self.apy[rows], keys))
+        keys = keys[order]
+
+        group_starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))) if len(keys) else keys
+        return {
+            "tokens": list(token_lookup),
+            "index_rows": rows[order].astype(np.int32),
+            "group_keys": keys[group_starts].astype(np.int64),
+            "group_starts": group_starts.astype(np.int32),
+            "group_ends": np.append(group_starts[1:], len(keys)).astype(np.int32),
         }
-        for pool in pools if pool['chain'].lower() == chain.lower()
-    ]
-    return filtered
\ No newline at end of file
+
+    def _attach_index(self, index: dict):
+        self.tokens = index["tokens"]
+        self.token_lookup = {token: i for i, token in enumerate(self.tokens)}
+        self.key_stride = max(1, len(self.tokens))
+        self.index_rows = index["index_rows"]
+        self.group_keys = index["group_keys"]
+        self.group_starts = index["group_starts"]
+        self.group_ends = index["group_ends"]
+        # (chain, token) key -> group position; one small int map instead of a list of dicts per key
+        self.group_lookup = dict(zip(self.group_keys.tolist(), range(len(self.group_keys))))
+        self.group_best = self.index_rows[self.group_starts]
+
+    def _group(self, chain_id: int, symbol: str) -> int:
+        token_id = self.token_lookup.get(normalize_symbol(symbol))
+        if token_id is None:
+            return -1
+        return self.group_lookup.get(chain_id * self.key_stride + token_id, -1)
+
+    def best_pool_rows(self, chain: str, symbols: list) -> np.ndarray:
+        """
+        Best-APY lookup for many tokens at once; the row gather is vectorized.
+
+        Returns:
+            np.ndarray: Best row per symbol, or -1 when no pool holds it.
+        """
+        chain_id = self.chain_lookup.get(chain.lower())
+        if chain_id is None:
+            return np.full(len(symbols), -1, dtype=np.int64)
+
+        groups = np.array([self._group(chain_id, s) for s in symbols], dtype=np.int64)
+        return np.where(groups >= 0, self.group_best[groups], -1) if len(self.group_best) else groups
+
+    def best_pools(self, chain: str, symbol: str, top_k: int = 1) -> list:
+        chain_id = self.chain_lookup.get(chain.lower())
+        group = self._group(chain_id, symbol) if chain_id is not None else -1
+        if group < 0:
+            return []
+        start, end = int(self.group_starts[group]), int(self.group_ends[group])
+        return [self.pool(row) for row in self.index_rows[start:min(end, start + top_k)].tolist()]
+
+    def filter_rows(self, chain: str = None, min_apy: float = None, min_tvl: float = None) -> np.ndarray:
+        """
+        Rows matching every given filter, best APY first.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if chain is not None:
+            chain_id = self.chain_lookup.get(chain.lower())
+            if chain_id is None:
+                return np.zeros(0, dtype=np.int64)
+            mask &= self.chain_ids == chain_id
+        if min_apy is not None:
+            mask &= self.apy >= min_apy
+        if min_tvl is not None:
+            mask &= self.tvl >= min_tvl
+
+        rows = np.flatnonzero(mask)
+        return rows[np.argsort(-self.apy[rows], kind="stable")]
+
+    def rows_for_pools(self, pool_ids: list) -> np.ndarray:
+        """
+        Row per DeFiLlama pool id, or -1 when the pool is not in this snapshot. The lookup is built on first use.
+        """
+        if self._pool_rows is None:
+            self._pool_rows = {self.pools[p]: row for row, p in enumerate(self.pool_ids.tolist())}
+        return np.array([self._pool_rows.get(p, -1) for p in pool_ids], dtype=np.int64)
+
+    def ranking(self, profile: RankingProfile = None) -> PoolRanking:
+        """
+        Risk-adjusted ranking of this snapshot, computed once per profile and reused.
+        """
+        profile = profile or DEFAULT_PROFILE
+        ranking = self._rankings.get(profile.key)
+        if ranking is None:
+            with timed("pools_rank"):
+                ranking = self._rankings[profile.key] = PoolRanking(self, profile)
+        return ranking
+
+    def pool(self, row: int) -> dict:
+        return {
+            "protocol": self.protocols[self.protocol_ids[row]],
+            "apy": float(self.apy[row]),
+            "symbol": self.symbols[self.symbol_ids[row]],
+            "chain": self.chains[self.chain_ids[row]],
+            "tvlUsd": float(self.tvl[row]),
+            "url": self.urls[self.url_ids[row]],
+            "pool": self.pools[self.pool_ids[row]]
+        }
+
+    def pools_for_chain(self, chain: str) -> list:
+        chain_id = self.chain_lookup.get(chain.lower())
+        if chain_id is None:
+            return []
+        return [self.pool(row) for row in np.flatnonzero(self.chain_ids == chain_id)]
+
+    def save(self, path: str):
+        """
+        Write the columns, index and tables to one memory-mappable file.
+        """
+        arrays = {
+            "chain": self.chain_ids, "protocol": self.protocol_ids, "symbol": self.symbol_ids,
+            "url": self.url_ids, "pool": self.pool_ids, "apy": self.apy, "tvl": self.tvl, "sigma": self.sigma,
+            "stablecoin": self.stablecoin, "il_risk": self.il_risk, "outlier": self.outlier,
+            "index_rows": self.index_rows, "group_keys": self.group_keys,
+            "group_starts": self.group_starts, "group_ends": self.group_ends,
+        }
+        meta = {
+            "fetched_at": self.fetched_at,
+            "tables": {
+                "chain": self.chains, "protocol": self.protocols, "symbol": self.symbols,
+                "url": self.urls, "pool": self.pools,
+            },
+            "tokens": self.tokens,
+        }
+        write_arrays(path, arrays, meta)
+
+    @classmethod
+    def load(cls, path: str) -> "PoolSnapshot":
+        """
+        Map a file written by save(). Columns stay on disk and are shared through the page cache.
+        """
+        arrays, meta = read_arrays(path)
+        columns = {name: arrays[name] for name in COLUMNS}
+        index = {name: arrays[name] for name in ("index_rows", "group_keys", "group_starts", "group_ends")}
+        index["tokens"] = meta["tokens"]
+        return cls(columns, meta["tables"], meta["fetched_at"], 0, index)
+
+
+class PoolColumnsBuilder:
+    """
+    Accumulates raw DeFiLlama pools into snapshot columns, one pool at a time.
+
+    Args:
+        chains (set, optional): Lowercased chain names to keep. Defaults to every chain.
+    """
+
+    def __init__(self, chains=None):
+        self.chains = chains
+        self.tables = {"chain": [], "protocol": [], "symbol": [], "url": [], "pool": []}
+        self._ids = {name: {} for name in self.tables}
+        self.columns = {name: [] for name in COLUMNS}
+
+    def _intern(self, table: str, value: str) -> int:
+        ids = self._ids[table]
+        id_ = ids.get(value)
+        if id_ is None:
+            id_ = ids[value] = len(self.tables[table])
+            self.tables[table].append(value)
+        return id_
+
+    def add(self, pool: dict):
+        try:
+            if self.chains is not None and pool['chain'].lower() not in self.chains:
+                return
+            chain = self._intern("chain", pool['chain'])
+            protocol = self._intern("protocol", pool['project'])
+            symbol = self._intern("symbol", pool['symbol'])
+            apy = float(pool.get('apy') or 0)
+            tvl = float(pool.get('tvlUsd') or 0)
+            sigma = float(pool.get('sigma') or 0)
+            url = self._intern("url", pool.get('url') or '')
+            pool_id = self._intern("pool", pool.get('pool') or '')
+        except Exception as e:
+            print(f"⚠️ Skipping malformed DeFiLlama pool: {e}")
+            return
+
+        columns = self.columns
+        columns["chain"].append(chain)
+        columns["protocol"].append(protocol)
+        columns["symbol"].append(symbol)
+        columns["url"].append(url)
+        columns["pool"].append(pool_id)
+        columns["apy"].append(apy)
+        columns["tvl"].append(tvl)
+        columns["sigma"].append(sigma)
+        columns["stablecoin"].append(bool(pool.get('stablecoin')))
+        columns["il_risk"].append(pool.get('ilRisk') == "yes")
+        columns["outlier"].append(bool(pool.get('outlier')))
+
+    def build(self, fetched_at: float = None, version: int = 0) -> PoolSnapshot:
+        columns = {name: np.array(values, dtype=COLUMNS[name]) for name, values in self.columns.items()}
+        return PoolSnapshot(columns, self.tables, fetched_at or time.time(), version)
+
+
+def normalize_symbol(symbol: str) -> str:
+    return (symbol or "").strip().upper()
+
+
+_snapshot = None
+_refresh_lock = threading.Lock()
+_install_lock = threading.Lock()
+_disk_load_lock = threading.Lock()
+_background_refresh = None
+_async_refresh = None
+
+
+def _feed_pools(stream: JsonArrayStream, builder: PoolColumnsBuilder, chunk: bytes):
+    with timed("pools_decode"):
+        for pool in stream.feed(chunk):
+            builder.add(pool)
+
+
+def _download_pools() -> PoolColumnsBuilder:
+    """
+    Stream /pools into snapshot columns.
+
+    The body is decoded chunk by chunk and each pool is reduced to the
+    fields we keep as soon as it is complete, so neither the raw body nor
+    the full object graph is ever held in memory.
+    """
+    stream, builder = JsonArrayStream("data"), PoolColumnsBuilder(POOL_CHAINS)
+
+    started = time.perf_counter()
+    with timed("pools_download"):
+        try:
+            with requests.get(DEFILLAMA_POOLS_URL, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    _feed_pools(stream, builder, chunk)
+            stream.close()
+        except Exception:
+            record_upstream("DeFiLlama pools", "error", time.perf_counter() - started)
+            raise
+    record_upstream("DeFiLlama pools", "ok", time.perf_counter() - started)
+    return builder
+
+
+def _build_snapshot(pools: list, chains=None) -> PoolSnapshot:
+    builder = PoolColumnsBuilder(chains)
+    for pool in pools:
+        builder.add(pool)
+
+    # Version is assigned when the snapshot is installed
+    return builder.build()
+
+
+def _install_snapshot(snapshot: PoolSnapshot, persist: bool = True, replace: bool = True) -> PoolSnapshot:
+    """
+    Make a snapshot current. With replace=False it is only installed if none is yet,
+    checked in the same critical section; otherwise the current snapshot is returned.
+    """
+    global _snapshot
+
+    with _install_lock:
+        previous = _snapshot
+        if previous is not None and not replace:
+            return previous
+        snapshot.version = _snapshot.version + 1 if _snapshot else 1
+        _snapshot = snapshot
+
+    POOL_SNAPSHOT_VERSION.set(snapshot.version)
+    POOL_SNAPSHOT_POOLS.set(len(snapshot))
+
+    try:
+        get_alert_hub().on_snapshot(previous, snapshot)
+    except Exception as e:
+        print(f"⚠️ Could not evaluate APY alerts: {e}")
+
+    if persist and POOL_SNAPSHOT_PATH:
+        try:
+            snapshot.save(POOL_SNAPSHOT_PATH)
+        except Exception as e:
+            print(f"⚠️ Could not write pool snapshot file: {e}")
+    return snapshot
+
+
+def _index_and_install(builder: PoolColumnsBuilder) -> PoolSnapshot:
+    with timed("pools_index"):
+        snapshot = builder.build()
+    # Rank up front, off the request path
+    snapshot.ranking()
+    snapshot = _install_snapshot(snapshot)
+
+    try:
+        record_snapshot(snapshot)
+    except Exception as e:
+        print(f"⚠️ Could not record APY history: {e}")
+    return snapshot
+
+
+def _load_snapshot_file(newer_than: float = None):
+    """
+    Map the last snapshot written by any worker, if there is one (and it is newer than `newer_than`).
+    """
+    if not POOL_SNAPSHOT_PATH or not os.path.exists(POOL_SNAPSHOT_PATH):
+        return None
+
+    try:
+        if newer_than is not None and read_meta(POOL_SNAPSHOT_PATH)["fetched_at"] <= newer_than:
+            return None
+        with timed("pools_load"):
+            return PoolSnapshot.load(POOL_SNAPSHOT_PATH)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable pool snapshot file: {e}")
+        return None
+
+
+def _fresh_snapshot_from_disk():
+    """
+    Adopt a fresh snapshot another worker already downloaded, instead of downloading it again.
+    """
+    disk = _load_snapshot_file(newer_than=_snapshot.fetched_at if _snapshot else None)
+    if disk is None or disk.is_stale():
+        return None
+    disk.ranking()
+    return _install_snapshot(disk, persist=False)
+
+
+def _claim_download() -> bool:
+    """
+    With several workers on a host, only one downloads /pools at a time. The others keep
+    serving their snapshot and adopt the file that worker writes on a later refresh.
+    A worker with no snapshot at all always downloads.
+    """
+    if _snapshot is None or not shared_cache.enabled() or not POOL_SNAPSHOT_PATH:
+        return True
+    try:
+        return shared_cache.acquire_lease("pool_download", POOL_DOWNLOAD_LEASE)
+    except Exception as e:
+        print(f"⚠️ Shared cache unavailable, downloading pools anyway: {e}")
+        return True
+
+
+def _release_download():
+    if shared_cache.enabled():
+        try:
+            shared_cache.release_lease("pool_download")
+        except Exception as e:
+            print(f"⚠️ Could not release pool download lease: {e}")
+
+
+def current_pool_snapshot():
+    """
+    The installed snapshot, without loading or refreshing anything.
+
+    Returns:
+        PoolSnapshot | None: None while the worker is cold.
+    """
+    return _snapshot
+
+
+def load_pool_snapshot_from_disk():
+    """
+    Warm start: install the on-disk snapshot, even a stale one, if nothing is loaded yet.
+
+    A stale file is still served (stale-while-revalidate), so a restart while
+    DeFiLlama is down keeps answering from the last good snapshot.
+
+    Returns:
+        PoolSnapshot | None: The current snapshot.
+    """
+    # Concurrent cold callers wait for one load instead of each mapping the file
+    with _disk_load_lock:
+        if _snapshot is not None:
+            return _snapshot
+
+        disk = _load_snapshot_file()
+        if disk is None:
+            return _snapshot
+        return _install_snapshot(disk, persist=False, replace=False)
+
+
+def refresh_pool_snapshot():
+    """
+    Download /pools and install a new snapshot.
+
+    Single-flight: concurrent callers wait on the same download instead of
+    each hitting upstream. On failure the previous snapshot is kept.
+
+    Returns:
+        PoolSnapshot | None: The current snapshot after the refresh attempt.
+    """
+    started = time.time()
+    with _refresh_lock:
+        # Someone else refreshed while we were waiting for the lock
+        if _snapshot is not None and _snapshot.fetched_at >= started:
+            return _snapshot
+
+        shared = _fresh_snapshot_from_disk()
+        if shared is not None:
+            return shared
+
+        if not _claim_download():
+            return _snapshot
+        try:
+            try:
+                builder = _download_pools()
+            except Exception as e:
+                print(f"❌ DeFiLlama API Error: {e}")
+                return _snapshot
+
+            return _index_and_install(builder)
+        finally:
+            _release_download()
+
+
+def refresh_pool_snapshot_in_background():
+    """
+    Start a background refresh unless one is already running.
+    """
+    global _background_refresh
+
+    if _background_refresh is not None and _background_refresh.is_alive():
+        return
+
+    _background_refresh = threading.Thread(
+        target=refresh_pool_snapshot, name="defillama-refresh", daemon=True
+    )
+    _background_refresh.start()
+
+
+def get_pool_snapshot():
+    """
+    Return the shared pool snapshot (stale-while-revalidate).
+
+    A cold cache blocks on a single-flight download. A stale snapshot is
+    returned immediately while a background refresh replaces it.
+
+    Returns:
+        PoolSnapshot | None: None only if the first download failed.
+    """
+    snapshot = _snapshot or load_pool_snapshot_from_disk()
+    if snapshot is None:
+        return refresh_pool_snapshot()
+
+    if snapshot.is_stale():
+        refresh_pool_snapshot_in_background()
+
+    return snapshot
+
+
+def fetch_defillama_yields(chain: str):
+    snapshot = get_pool_snapshot()
+    return snapshot.pools_for_chain(chain) if snapshot else []
+
+
+async def _refresh_async():
+    if _snapshot is not None and not _snapshot.is_stale():
+        return _snapshot
+
+    shared = await asyncio.to_thread(_fresh_snapshot_from_disk)
+    if shared is not None:
+        return shared
+
+    if not await asyncio.to_thread(_claim_download):
+        return _snapshot
+    try:
+        return await _download_and_install_async()
+    finally:
+        await asyncio.to_thread(_release_download)
+
+
+async def _download_and_install_async():
+    stream, builder = JsonArrayStream("data"), PoolColumnsBuilder(POOL_CHAINS)
+
+    # Each chunk is decoded as it arrives, a few milliseconds at a time, so requests keep flowing
+    started = time.perf_counter()
+    try:
+        with timed("pools_download"):
+            async for chunk in async_stream(DEFILLAMA_POOLS_URL, timeout=30, chunk_size=STREAM_CHUNK_SIZE):
+                _feed_pools(stream, builder, chunk)
+            stream.close()
+    except Exception as e:
+        record_upstream("DeFiLlama pools", "error", time.perf_counter() - started)
+        print(f"❌ DeFiLlama API Error: {e}")
+        return _snapshot
+    record_upstream("DeFiLlama pools", "ok", time.perf_counter() - started)
+
+    # Indexing tens of thousands of pools would stall the event loop
+    try:
+        return await asyncio.to_thread(_index_and_install, builder)
+    except Exception as e:
+        print(f"❌ Failed to index DeFiLlama pools: {e}")
+        return _snapshot
+
+
+def schedule_pool_refresh() -> asyncio.Task:
+    """
+    Start an async refresh on the running loop unless one is already in flight.
+
+    Returns:
+        asyncio.Task: The in-flight refresh, shared by every caller (single-flight).
+    """
+    global _async_refresh
+
+    loop = asyncio.get_running_loop()
+    if _async_refresh is None or _async_refresh.done() or _async_refresh.get_loop() is not loop:
+        _async_refresh = loop.create_task(_refresh_async())
+    return _async_refresh
+
+
+async def get_pool_snapshot_async():
+    """
+    Async variant of get_pool_snapshot. Downloads go through the shared HTTP client.
+    """
+    # Mapping the file and building its lookups is blocking work
+    snapshot = _snapshot or await asyncio.to_thread(load_pool_snapshot_from_disk)
+    if snapshot is None:
+        return await asyncio.shield(schedule_pool_refresh())
+
+    if snapshot.is_stale():
+        schedule_pool_refresh()
+
+    return snapshot
@@ -0,0 +1,192 @@
+import asyncio
+import os
+
+from utils.config import EVM_EXPLORERS, EXPLORER_RATE_LIMIT, EVM_BALANCE_MODE
+from utils.ledger import get_last_block, fold_transfers, record_transfers, balances_to_tokens
+from utils.rate_limit import split_api_keys, choose_api_key
+from utils.metrics import timed
+from protocols.tokentx_pager import iter_token_transfer_pages, aiter_token_transfer_pages, has_transfers_since_async
+from protocols.evm_rpc import fetch_current_balances, fetch_current_balances_async, NATIVE_ADDRESS, NATIVE_DECIMALS
+
+
+
+def _start_block(since_block) -> int:
+    return since_block + 1 if since_block is not None else 0
+
+
+def _use_rpc(explorer: dict) -> bool:
+    return EVM_BALANCE_MODE == "rpc" and bool(explorer.get("rpc_url"))
+
+
+def _apply_current_balances(explorer: dict, balances: dict, current: dict) -> dict:
+    """
+    Replace summed-history balances with on-chain ones and add the native balance.
+    """
+    merged = {
+        contract: {**data, 'balance': current.get(contract, data['balance'])}
+        for contract, data in balances.items()
+    }
+    if current.get(NATIVE_ADDRESS):
+        merged[NATIVE_ADDRESS] = {
+            'symbol': explorer['native_symbol'], 'decimals': NATIVE_DECIMALS, 'balance': current[NATIVE_ADDRESS]
+        }
+    return merged
+
+
+def get_evm_balances(chain: str, wallet: str, api_key: str = None):
+    """
+    Fetch ERC-20 token balances for a wallet on any chain in EVM_EXPLORERS.
+
+    The wallet's ledger is brought up to date by walking only transfers
+    after its last block, folding each page in as it arrives. Incoming
+    transfers add to and outgoing transfers subtract from the balance of
+    their token contract.
+
+    With EVM_BALANCE_MODE=rpc the ledger only tells which contracts the
+    wallet touched; their current balanceOf and the native balance are then
+    read from the chain's JSON-RPC node in batched calls.
+
+    Args:
+        chain (str): Chain name, a key of EVM_EXPLORERS.
+        wallet (str): Wallet address.
+        api_key (str, optional): Explorer API key, or a comma-separated pool of keys.
+            Defaults to the chain's env variable.
+
+    Returns:
+        list: List of tokens with symbol, amount, contract address, and price (placeholder).
+    """
+    explorer = EVM_EXPLORERS[chain]
+    api_keys = split_api_keys(api_key or os.getenv(explorer["api_key_env"]))  # ✅ Use provided API key or fallback
+    since_block = get_last_block(chain, wallet)
+
+    deltas = {}
+    last_block = None
+    with timed("explorer", chain):
+        for rows in iter_token_transfer_pages(explorer, wallet, api_keys, _start_block(since_block)):
+            page_block = fold_transfers(rows, wallet, deltas)
+            last_block = page_block if page_block is not None else last_block
+
+    with timed("ledger", chain):
+        balances = record_transfers(chain, wallet, since_block, last_block, deltas)
+
+    if _use_rpc(explorer):
+        with timed("rpc", chain):
+            try:
+                current = fetch_current_balances(explorer["rpc_url"], wallet, list(balances), f"{chain} RPC")
+                balances = _apply_current_balances(explorer, balances, current)
+            except Exception as e:
+                print(f"⚠️ {chain} RPC balance read failed, using transfer history: {e}")
+
+    return balances_to_tokens(balances)
+
+
+async def get_evm_balances_async(chain: str, wallet: str, api_key: str = None):
+    """
+    Async variant of get_evm_balances using the shared HTTP client.
+    """
+    tokens, _ = await get_evm_balances_with_native_async(chain, wallet, api_key)
+    return tokens
+
+
+async def get_evm_balances_with_native_async(chain: str, wallet: str, api_key: str = None):
+    """
+    get_evm_balances_async that also hands back the raw native balance it read, for cache_stamp.
+
+    Ledger reads and writes are blocking SQLite calls, so they run in a worker thread.
+
+    Returns:
+        tuple: (tokens, raw native balance, or None outside RPC mode or when the read failed)
+    """
+    explorer = EVM_EXPLORERS[chain]
+    api_keys = split_api_keys(api_key or os.getenv(explorer["api_key_env"]))
+    since_block = await asyncio.to_thread(get_last_block, chain, wallet)
+
+    deltas = {}
+    last_block = None
+    with timed("explorer", chain):
+        async for rows in aiter_token_transfer_pages(explorer, wallet, api_keys, _start_block(since_block)):
+            page_block = fold_transfers(rows, wallet, deltas)
+            last_block = page_block if page_block is not None else last_block
+
+    with timed("ledger", chain):
+        balances = await asyncio.to_thread(record_transfers, chain, wallet, since_block, last_block, deltas)
+
+    native = None
+    if _use_rpc(explorer):
+        with timed("rpc", chain):
+            try:
+                current = await fetch_current_balances_async(
+                    explorer["rpc_url"], wallet, list(balances), f"{chain} RPC"
+                )
+                balances = _apply_current_balances(explorer, balances, current)
+                native = current.get(NATIVE_ADDRESS)
+            except Exception as e:
+                print(f"⚠️ {chain} RPC balance read failed, using transfer history: {e}")
+
+    return balances_to_tokens(balances), native
+
+
+def cache_stamp(chain: str, wallet: str, native: int = None):
+    """
+    What a just-computed result for the wallet reflects, for has_new_transfers_async to check later.
+
+    The ledger's last block; with EVM_BALANCE_MODE=rpc also the native balance the lookup read,
+    since native transfers and gas spent never appear in tokentx. Blocking (SQLite).
+
+    Args:
+        chain (str): Chain name, a key of EVM_EXPLORERS.
+        wallet (str): Wallet address.
+        native (int, optional): Raw native balance from get_evm_balances_with_native_async.
+
+    Returns:
+        int | list | None: Last block, [last block, native balance as a string] in RPC mode, or None.
+    """
+    last_block = get_last_block(chain, wallet)
+    if not _use_rpc(EVM_EXPLORERS[chain]):
+        return last_block
+
+    if last_block is None and native is None:
+        return None
+    return [last_block, None if native is None else str(native)]  # uint256 does not fit JSON numbers everywhere
+
+
+async def _native_balance_changed_async(chain: str, explorer: dict, wallet: str, native: int) -> bool:
+    try:
+        current = await fetch_current_balances_async(explorer["rpc_url"], wallet, [], f"{chain} RPC")
+    except Exception as e:
+        print(f"⚠️ {chain} RPC native balance check failed: {e}")
+        return False
+    return NATIVE_ADDRESS in current and current[NATIVE_ADDRESS] != native
+
+
+async def has_new_transfers_async(chain: str, wallet: str, stamp, api_key: str = None) -> bool:
+    """
+    Whether a result stamped by cache_stamp is out of date.
+
+    Latest-block check: one tokentx call with startblock=last block + 1 and offset=1. In RPC
+    mode an eth_getBalance call runs alongside it and compares the native balance.
+
+    Returns:
+        bool: True if the wallet has transfers after the stamp's block or its native balance
+            changed. Explorer and RPC errors count as no news.
+    """
+    explorer = EVM_EXPLORERS[chain]
+    since_block, native = stamp if isinstance(stamp, list) else (stamp, None)
+
+    checks = []
+    if since_block is not None:
+        api_keys = split_api_keys(api_key or os.getenv(explorer["api_key_env"]))
+        checks.append(has_transfers_since_async(explorer, wallet, api_keys, since_block + 1))
+    if native is not None and _use_rpc(explorer):
+        checks.append(_native_balance_changed_async(chain, explorer, wallet, int(native)))
+    return any(await asyncio.gather(*checks))
+
+
+def explorer_wait_time(chain: str, api_key: str = None) -> float:
+    """
+    Seconds until the chain's least busy API key could make a call, 0 if one is free now.
+    """
+    explorer = EVM_EXPLORERS[chain]
+    api_keys = split_api_keys(api_key or os.getenv(explorer["api_key_env"]))
+    _, bucket = choose_api_key(api_keys, explorer.get("rate_limit", EXPLORER_RATE_LIMIT), explorer["label"])
+    return bucket.wait_time()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import requests
+from utils.config import RPC_BATCH_SIZE
+from utils.http_client import async_post
+from utils.metrics import record_upstream
+
+# Native balances are reported under the zero address, which the DeFiLlama coins API prices as the gas token
+NATIVE_ADDRESS = "0x0000000000000000000000000000000000000000"
+NATIVE_DECIMALS = 18
+
+# balanceOf(address)
+_BALANCE_OF = "0x70a08231"
+
+
+def _balance_calls(wallet: str, contracts: list) -> list:
+    """
+    One JSON-RPC request per contract plus eth_getBalance; the id is the position in `contracts`
+    (the native balance uses len(contracts)).
+    """
+    owner = wallet.lower().removeprefix("0x").rjust(64, "0")
+    calls = [
+        {"jsonrpc": "2.0", "id": i, "method": "eth_call",
+         "params": [{"to": contract, "data": _BALANCE_OF + owner}, "latest"]}
+        for i, contract in enumerate(contracts)
+    ]
+    calls.append({"jsonrpc": "2.0", "id": len(contracts), "method": "eth_getBalance", "params": [wallet, "latest"]})
+    return calls
+
+
+def _parse_results(replies, contracts: list, balances: dict):
+    if not isinstance(replies, list):
+        raise ValueError(f"expected a batch reply, got {str(replies)[:200]}")
+
+    for reply in replies:
+        index = reply.get("id")
+        result = reply.get("result")
+        if not isinstance(index, int) or not isinstance(result, str) or "error" in reply:
+            continue
+        try:
+            value = int(result, 16) if result not in ("0x", "") else 0
+        except ValueError:
+            continue
+        balances[contracts[index] if index < len(contracts) else NATIVE_ADDRESS] = value
+
+
+def _batches(calls: list) -> list:
+    return [calls[i:i + RPC_BATCH_SIZE] for i in range(0, len(calls), RPC_BATCH_SIZE)]
+
+
+def fetch_current_balances(rpc_url: str, wallet: str, contracts: list, label: str = "RPC") -> dict:
+    """
+    Current raw balanceOf for every contract, plus the native balance, in batched JSON-RPC calls.
+
+    Work is O(contracts), whatever the length of the wallet's history.
+    Contracts whose call reverts (e.g. not a token) are left out.
+
+    Args:
+        rpc_url (str): JSON-RPC endpoint.
+        wallet (str): Wallet address.
+        contracts (list): Token contract addresses.
+        label (str): Upstream name used in metrics.
+
+    Returns:
+        dict: contract -> raw balance (int), with the native balance under NATIVE_ADDRESS.
+    """
+    balances = {}
+    for batch in _batches(_balance_calls(wallet, contracts)):
+        started = time.perf_counter()
+        try:
+            response = requests.post(rpc_url, json=batch, timeout=10)
+            response.raise_for_status()
+            _parse_results(response.json(), contracts, balances)
+        except Exception:
+            record_upstream(label, "error", time.perf_counter() - started)
+            raise
+        record_upstream(label, "ok", time.perf_counter() - started)
+    return balances
+
+
+async def fetch_current_balances_async(rpc_url: str, wallet: str, contracts: list, label: str = "RPC") -> dict:
+    """
+    Async variant of fetch_current_balances; batches are sent concurrently.
+    """
+    balances = {}
+
+    async def _batch(batch):
+        started = time.perf_counter()
+        try:
+            response = await async_post(rpc_url, json=batch)
+            response.raise_for_status()
+            _parse_results(response.json(), contracts, balances)
+        except Exception:
+            record_upstream(label, "error", time.perf_counter() - started)
+            raise
+        record_upstream(label, "ok", time.perf_counter() - started)
+
+    await asyncio.gather(*(_batch(batch) for batch in _batches(_balance_calls(wallet, contracts))))
+    return balances
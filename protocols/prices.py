@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from utils.config import EVM_EXPLORERS, PRICE_API_URL, PRICE_CACHE_TTL, PRICE_CACHE_MAX
+from utils.http_client import async_get
+from utils.metrics import timed, record_upstream, CACHE_REQUESTS
+from utils import shared_cache
+
+# DeFiLlama coins API chain prefixes
+PRICE_CHAINS = {chain: explorer["price_chain"] for chain, explorer in EVM_EXPLORERS.items()}
+PRICE_CHAINS["solana"] = "solana"
+
+# Keys per upstream call, keeps the URL a sane length
+BATCH_SIZE = 100
+
+_cache = OrderedDict()  # coin key -> (price or None, expires_at)
+_cache_lock = threading.Lock()
+
+
+def _fetch_quotes(keys: list) -> dict:
+    quotes = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        batch = keys[i:i + BATCH_SIZE]
+        response = requests.get(f"{PRICE_API_URL}/{','.join(batch)}", timeout=10)
+        response.raise_for_status()
+        quotes.update(_parse_quotes(response))
+    return quotes
+
+
+async def _fetch_quotes_async(keys: list) -> dict:
+    quotes = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        batch = keys[i:i + BATCH_SIZE]
+        response = await async_get(f"{PRICE_API_URL}/{','.join(batch)}")
+        response.raise_for_status()
+        quotes.update(_parse_quotes(response))
+    return quotes
+
+
+def _parse_quotes(response) -> dict:
+    coins = response.json().get("coins", {})
+    return {_normalize_key(key): coin["price"] for key, coin in coins.items() if coin.get("price") is not None}
+
+
+def _normalize_key(key: str) -> str:
+    # EVM addresses are case-insensitive; Solana mints (base58) are not
+    prefix, _, address = key.partition(":")
+    return f"{prefix}:{address.lower()}" if address.startswith("0x") else key
+
+
+_source = _fetch_quotes
+_source_async = _fetch_quotes_async
+
+
+def set_price_source(fetch_quotes, fetch_quotes_async=None):
+    """
+    Swap the upstream price source, e.g. for a local stub in tests.
+
+    Args:
+        fetch_quotes (callable): keys -> {key: price}. Keys look like 'ethereum:0xabc...'.
+        fetch_quotes_async (callable, optional): Async equivalent. Defaults to calling fetch_quotes.
+    """
+    global _source, _source_async
+
+    async def _call_sync(keys):
+        return fetch_quotes(keys)
+
+    _source = fetch_quotes
+    _source_async = fetch_quotes_async or _call_sync
+    clear_price_cache()
+
+
+def clear_price_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _coin_key(chain: str, token: dict):
+    contract = token.get("contract_address")
+    prefix = PRICE_CHAINS.get(chain)
+    if not contract or not prefix:
+        return None
+    return _normalize_key(f"{prefix}:{contract}")
+
+
+def _cached_local(keys: list):
+    now = time.time()
+    hits, misses = {}, []
+    with _cache_lock:
+        for key in keys:
+            entry = _cache.get(key)
+            if entry and entry[1] > now:
+                hits[key] = entry[0]
+                _cache.move_to_end(key)
+            else:
+                misses.append(key)
+    return hits, misses
+
+
+def _cached_shared(misses: list):
+    """
+    Another worker on this host may already have fetched them. Blocking SQLite I/O.
+    """
+    try:
+        shared = shared_cache.get_many("prices", misses)
+    except Exception as e:
+        print(f"⚠️ Shared price cache unavailable: {e}")
+        shared = {}
+    if shared:
+        CACHE_REQUESTS.inc(len(shared), cache="prices_shared", result="hit")
+        with _cache_lock:
+            for key, entry in shared.items():
+                _cache[key] = entry
+                _cache.move_to_end(key)
+    return {key: price for key, (price, _) in shared.items()}, [key for key in misses if key not in shared]
+
+
+def _cached(keys: list):
+    hits, misses = _cached_local(keys)
+    if misses and shared_cache.enabled():
+        shared, misses = _cached_shared(misses)
+        hits.update(shared)
+    return hits, misses
+
+
+async def _cached_async(keys: list):
+    hits, misses = _cached_local(keys)
+    if misses and shared_cache.enabled():
+        shared, misses = await asyncio.to_thread(_cached_shared, misses)
+        hits.update(shared)
+    return hits, misses
+
+
+def _store_local(keys: list, quotes: dict) -> float:
+    expires_at = time.time() + PRICE_CACHE_TTL
+    with _cache_lock:
+        for key in keys:
+            # Unpriced tokens are cached too, so spam tokens are not re-queried on every request
+            _cache[key] = (quotes.get(key), expires_at)
+            _cache.move_to_end(key)
+        while len(_cache) > PRICE_CACHE_MAX:
+            _cache.popitem(last=False)
+    return expires_at
+
+
+def _store_shared(keys: list, quotes: dict, expires_at: float):
+    try:
+        shared_cache.set_many("prices", {key: quotes.get(key) for key in keys}, expires_at)
+    except Exception as e:
+        print(f"⚠️ Could not write shared price cache: {e}")
+
+
+def _store(keys: list, quotes: dict):
+    expires_at = _store_local(keys, quotes)
+    if shared_cache.enabled():
+        _store_shared(keys, quotes, expires_at)
+
+
+async def _store_async(keys: list, quotes: dict):
+    expires_at = _store_local(keys, quotes)
+    if shared_cache.enabled():
+        await asyncio.to_thread(_store_shared, keys, quotes, expires_at)
+
+
+def _apply(chain: str, tokens: list, prices: dict):
+    for token in tokens:
+        key = _coin_key(chain, token)
+        if key is not None and key in prices:
+            token["price_usd"] = prices[key] or 0.0
+    return tokens
+
+
+def price_tokens(chain: str, tokens: list) -> list:
+    """
+    Fill in price_usd for every token with a contract address, in one batched lookup.
+
+    Quotes are cached for PRICE_CACHE_TTL seconds, so tokens repeated across
+    wallets cost nothing. Tokens the upstream has no price for are valued at
+    0. If the upstream is unreachable, prices are left as the fetcher set them.
+
+    Args:
+        chain (str): Chain name.
+        tokens (list): Fetcher results ({'symbol', 'contract_address', 'amount', 'price_usd'}).
+
+    Returns:
+        list: The same tokens, updated in place.
+    """
+    keys = list({key for key in (_coin_key(chain, t) for t in tokens) if key})
+    prices, misses = _cached(keys)
+    CACHE_REQUESTS.inc(len(prices), cache="prices", result="hit")
+    CACHE_REQUESTS.inc(len(misses), cache="prices", result="miss")
+
+    if misses:
+        started = time.perf_counter()
+        with timed("prices", chain):
+            try:
+                quotes = _source(misses)
+            except Exception as e:
+                record_upstream("DeFiLlama coins", "error", time.perf_counter() - started)
+                print(f"❌ Price API Error: {e}")
+                return _apply(chain, tokens, prices)
+        record_upstream("DeFiLlama coins", "ok", time.perf_counter() - started)
+        _store(misses, quotes)
+        prices.update({key: quotes.get(key) for key in misses})
+
+    return _apply(chain, tokens, prices)
+
+
+async def price_tokens_async(chain: str, tokens: list) -> list:
+    """
+    Async variant of price_tokens using the shared HTTP client.
+    """
+    keys = list({key for key in (_coin_key(chain, t) for t in tokens) if key})
+    prices, misses = await _cached_async(keys)
+    CACHE_REQUESTS.inc(len(prices), cache="prices", result="hit")
+    CACHE_REQUESTS.inc(len(misses), cache="prices", result="miss")
+
+    if misses:
+        started = time.perf_counter()
+        with timed("prices", chain):
+            try:
+                quotes = await _source_async(misses)
+            except Exception as e:
+                record_upstream("DeFiLlama coins", "error", time.perf_counter() - started)
+                print(f"❌ Price API Error: {e}")
+                return _apply(chain, tokens, prices)
+        record_upstream("DeFiLlama coins", "ok", time.perf_counter() - started)
+        await _store_async(misses, quotes)
+        prices.update({key: quotes.get(key) for key in misses})
+
+    return _apply(chain, tokens, prices)
@@ -1,58 +1,270 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
 import requests
-from utils.config import HELIUS_API_KEY
+from utils.config import (
+    HELIUS_API_KEY, HELIUS_API_URL, HELIUS_RPC_URL, SOLANA_METADATA_CACHE_MAX, SOLANA_UNKNOWN_MINT_TTL
+)
+from utils.http_client import async_get, async_post
+from utils.metrics import timed, record_upstream, CACHE_REQUESTS
+
+# Wrapped SOL; the native balance is reported under this mint so it prices and matches like SOL
+NATIVE_SOL_MINT = "So11111111111111111111111111111111111111112"
+NATIVE_SOL_DECIMALS = 9
+
+# Mints per getAssetBatch call
+METADATA_BATCH_SIZE = 100
+
+_metadata = OrderedDict()  # mint -> ({'symbol', 'decimals'} or None, expires_at)
+_metadata_lock = threading.Lock()
+
+
+def _balances_url(wallet: str, api_key: str) -> str:
+    return f"{HELIUS_API_URL}/v0/addresses/{wallet}/balances?api-key={api_key}"
+
+
+def _rpc_url(api_key: str) -> str:
+    return f"{HELIUS_RPC_URL}/?api-key={api_key}"
+
+
+def _asset_batch_request(mints: list) -> dict:
+    return {"jsonrpc": "2.0", "id": "mint-metadata", "method": "getAssetBatch", "params": {"ids": mints}}
+
+
+def _parse_holdings(response) -> dict:
+    """
+    Sum raw token amounts per mint.
+
+    Returns:
+        dict: mint -> {'raw': int, 'decimals': int | None, 'symbol': str | None}
+    """
+    try:
+        data = response.json()
+    except Exception as e:
+        print(f"❌ Invalid JSON response: {e} | {response.text}")
+        return {}
+
+    holdings = {}
+    for token in data.get("tokens", []):
+        mint = token.get("mint")
+        try:
+            raw = int(token.get("amount") or 0)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Error parsing amount for {mint}: {e}")
+            continue
+        if not mint or raw <= 0:
+            continue
+
+        holding = holdings.setdefault(mint, {"raw": 0, "decimals": None, "symbol": None})
+        holding["raw"] += raw
+        holding["decimals"] = token.get("decimals", holding["decimals"])
+        holding["symbol"] = token.get("tokenSymbol") or holding["symbol"]
+
+    try:
+        native = int(data.get("nativeBalance") or 0)
+    except (TypeError, ValueError) as e:
+        print(f"⚠️ Error parsing native balance: {e}")
+        native = 0
+    if native > 0:
+        holding = holdings.setdefault(NATIVE_SOL_MINT, {"raw": 0, "decimals": NATIVE_SOL_DECIMALS, "symbol": "SOL"})
+        holding["raw"] += native
+
+    if not holdings:
+        print("⚠️ No tokens found for this wallet.")
+    return holdings
+
+
+def _needs_metadata(holdings: dict) -> list:
+    # The balances endpoint often omits the symbol for SPL tokens
+    return [mint for mint, h in holdings.items() if not h["symbol"] or h["decimals"] is None]
+
+
+def _cached_metadata(mints: list):
+    now = time.time()
+    hits, misses = {}, []
+    with _metadata_lock:
+        for mint in mints:
+            entry = _metadata.get(mint)
+            if entry and entry[1] > now:
+                hits[mint] = entry[0]
+                _metadata.move_to_end(mint)
+            else:
+                misses.append(mint)
+    CACHE_REQUESTS.inc(len(hits), cache="solana_metadata", result="hit")
+    CACHE_REQUESTS.inc(len(misses), cache="solana_metadata", result="miss")
+    return hits, misses
+
+
+def _store_metadata(mints: list, resolved: dict):
+    unknown_until = time.time() + SOLANA_UNKNOWN_MINT_TTL
+    with _metadata_lock:
+        for mint in mints:
+            meta = resolved.get(mint)
+            _metadata[mint] = (meta, float("inf") if meta else unknown_until)
+            _metadata.move_to_end(mint)
+        while len(_metadata) > SOLANA_METADATA_CACHE_MAX:
+            _metadata.popitem(last=False)
+
+
+def _parse_assets(response) -> dict:
+    resolved = {}
+    for asset in response.json().get("result") or []:
+        if not asset or not asset.get("id"):
+            continue
+        token_info = asset.get("token_info") or {}
+        content_meta = (asset.get("content") or {}).get("metadata") or {}
+        symbol = token_info.get("symbol") or content_meta.get("symbol")
+        if symbol:
+            resolved[asset["id"]] = {"symbol": symbol.strip(), "decimals": token_info.get("decimals")}
+    return resolved
+
+
+def _fetch_metadata(mints: list, api_key: str) -> dict:
+    resolved = {}
+    for i in range(0, len(mints), METADATA_BATCH_SIZE):
+        batch = mints[i:i + METADATA_BATCH_SIZE]
+        response = requests.post(_rpc_url(api_key), json=_asset_batch_request(batch), timeout=10)
+        response.raise_for_status()
+        resolved.update(_parse_assets(response))
+    return resolved
+
+
+async def _fetch_metadata_async(mints: list, api_key: str) -> dict:
+    async def _batch(batch):
+        response = await async_post(_rpc_url(api_key), json=_asset_batch_request(batch))
+        response.raise_for_status()
+        return _parse_assets(response)
+
+    # Batches go out concurrently, so hundreds of unknown mints cost one round trip
+    batches = [mints[i:i + METADATA_BATCH_SIZE] for i in range(0, len(mints), METADATA_BATCH_SIZE)]
+    resolved = {}
+    for result in await asyncio.gather(*(_batch(batch) for batch in batches)):
+        resolved.update(result)
+    return resolved
+
+
+def _build_balances(holdings: dict, metadata: dict) -> list:
+    result = []
+    for mint, holding in holdings.items():
+        meta = metadata.get(mint) or {}
+        decimals = holding["decimals"] if holding["decimals"] is not None else meta.get("decimals")
+        if decimals is None:
+            # Without decimals the raw amount could be off by many orders of magnitude
+            print(f"⚠️ Skipping {mint}: decimals unknown")
+            continue
+        symbol = meta.get("symbol") or holding["symbol"]
+        result.append({
+            # Unresolved mints keep their address, which is case-sensitive
+            "symbol": symbol.upper() if symbol else mint,
+            "contract_address": mint,
+            "amount": holding["raw"] / 10 ** decimals,
+            "price_usd": 1.0  # ✅ Placeholder, replaced by protocols.prices
+        })
+    return result
+
+
+def resolve_mint_metadata(mints: list, api_key: str = None) -> dict:
+    """
+    Symbol and decimals for many mints, from the cache or in batched Helius calls.
+
+    Args:
+        mints (list): Mint addresses.
+        api_key (str, optional): Helius API key. Defaults to env key.
+
+    Returns:
+        dict: mint -> {'symbol', 'decimals'} for every mint that could be resolved.
+    """
+    metadata, misses = _cached_metadata(mints)
+    if misses:
+        started = time.perf_counter()
+        with timed("metadata", "solana"):
+            try:
+                resolved = _fetch_metadata(misses, api_key or HELIUS_API_KEY)
+            except Exception as e:
+                record_upstream("Helius metadata", "error", time.perf_counter() - started)
+                print(f"⚠️ Helius metadata lookup failed: {e}")
+                return {mint: meta for mint, meta in metadata.items() if meta}
+        record_upstream("Helius metadata", "ok", time.perf_counter() - started)
+        _store_metadata(misses, resolved)
+        metadata.update(resolved)
+    return {mint: meta for mint, meta in metadata.items() if meta}
+
+
+async def resolve_mint_metadata_async(mints: list, api_key: str = None) -> dict:
+    """
+    Async variant of resolve_mint_metadata; batches are sent concurrently.
+    """
+    metadata, misses = _cached_metadata(mints)
+    if misses:
+        started = time.perf_counter()
+        with timed("metadata", "solana"):
+            try:
+                resolved = await _fetch_metadata_async(misses, api_key or HELIUS_API_KEY)
+            except Exception as e:
+                record_upstream("Helius metadata", "error", time.perf_counter() - started)
+                print(f"⚠️ Helius metadata lookup failed: {e}")
+                return {mint: meta for mint, meta in metadata.items() if meta}
+        record_upstream("Helius metadata", "ok", time.perf_counter() - started)
+        _store_metadata(misses, resolved)
+        metadata.update(resolved)
+    return {mint: meta for mint, meta in metadata.items() if meta}
 
 
 def get_solana_balances(wallet: str, api_key: str = None):
     """
     Fetch token balances for a Solana wallet using the Helius API.
 
+    Balances are summed per mint. Symbols and decimals the balances endpoint
+    leaves out are resolved through the mint metadata cache.
+
     Args:
         wallet (str): Wallet address.
         api_key (str, optional): Helius API key. Defaults to env key.
 
     Returns:
-        list: List of tokens with symbol, amount, and USD price (placeholder).
+        list: Tokens with symbol, contract_address (the mint), amount, and placeholder USD price.
     """
     api_key = api_key or HELIUS_API_KEY  # ✅ Use passed key or fallback
 
-    url = f"https://api.helius.xyz/v0/addresses/{wallet}/balances?api-key={api_key}"
+    started = time.perf_counter()
+    with timed("explorer", "solana"):
+        try:
+            response = requests.get(_balances_url(wallet, api_key), timeout=10)
+            response.raise_for_status()
+        except Exception as e:
+            record_upstream("Helius", "error", time.perf_counter() - started)
+            print(f"❌ Helius API Error: {e}")
+            return []
 
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"❌ Helius API Error: {e}")
-        return []
+        record_upstream("Helius", "ok", time.perf_counter() - started)
+        holdings = _parse_holdings(response)
 
-    try:
-        data = response.json()
-    except Exception as e:
-        print(f"❌ Invalid JSON response: {e} | {response.text}")
-        return []
+    metadata = resolve_mint_metadata(_needs_metadata(holdings), api_key)
+    return _build_balances(holdings, metadata)
 
-    tokens = data.get("tokens", [])
-    if not tokens:
-        print("⚠️ No tokens found for this wallet.")
-        return []
 
-    token_balances = {}
-    for token in tokens:
+async def get_solana_balances_async(wallet: str, api_key: str = None):
+    """
+    Async variant of get_solana_balances using the shared HTTP client.
+    """
+    api_key = api_key or HELIUS_API_KEY
+
+    started = time.perf_counter()
+    with timed("explorer", "solana"):
         try:
-            symbol = token.get("tokenSymbol", "UNKNOWN").upper()
-            amount = float(token.get("amount", 0))
-            token_balances[symbol] = token_balances.get(symbol, 0) + amount
+            response = await async_get(_balances_url(wallet, api_key))
+            response.raise_for_status()
         except Exception as e:
-            print(f"⚠️ Error parsing amount for {symbol}: {e}")
-            continue
-
-    token_prices = {symbol: 1.0 for symbol in token_balances}  # 🔥 Placeholder prices
+            record_upstream("Helius", "error", time.perf_counter() - started)
+            print(f"❌ Helius API Error: {e}")
+            return []
 
-    result = []
-    for symbol, amount in token_balances.items():
-        result.append({
-            "symbol": symbol,
-            "amount": amount,
-            "price_usd": token_prices.get(symbol, 1.0)
-        })
+        record_upstream("Helius", "ok", time.perf_counter() - started)
+        holdings = _parse_holdings(response)
 
-    return result
\ No newline at end of file
+    # Which mints need metadata is only known from the balances response, so this call cannot start earlier;
+    # mints seen before come from the cache without a second round trip
+    metadata = await resolve_mint_metadata_async(_needs_metadata(holdings), api_key)
+    return _build_balances(holdings, metadata)
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from utils.config import EXPLORER_MAX_RETRIES, EXPLORER_RATE_LIMIT
+from utils.http_client import async_get
+from utils.rate_limit import choose_api_key, backoff_delay, is_rate_limited
+from utils.metrics import record_upstream
+
+# Fetches the next page while the caller is still folding the current one
+_prefetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tokentx-prefetch")
+
+# _page_rows result meaning "throttled, try again"
+_RATE_LIMITED = object()
+
+
+def _page_params(wallet: str, start_block: int, page_size: int) -> dict:
+    return {
+        "module": "account",
+        "action": "tokentx",
+        "address": wallet,
+        "startblock": start_block,
+        "page": 1,
+        "offset": page_size,
+        "sort": "asc"
+    }
+
+
+def _page_rows(response, label: str):
+    if response.status_code == 429:
+        return _RATE_LIMITED
+
+    try:
+        response.raise_for_status()
+        response_json = response.json()
+    except Exception as e:
+        print(f"❌ {label} API Error: {e}")
+        return None
+
+    if is_rate_limited(response_json):
+        return _RATE_LIMITED
+
+    result = response_json.get("result")
+    if response_json.get("status") != "1":
+        # Also what a window past the end of the history looks like
+        if response_json.get("message") == "No transactions found":
+            return []
+        print(f"❌ {label} API Error: {response_json.get('message')} | Details: {result}")
+        return None
+
+    if not isinstance(result, list):
+        print(f"❌ {label} unexpected response format: {result}")
+        return None
+
+    return result
+
+
+def _split_page(rows: list, page_size: int):
+    """
+    Split a page into rows that are safe to fold and the next startblock.
+
+    A full page may end part-way through a block, so rows from its last
+    block are held back and that block is re-read whole by the next window.
+
+    Returns:
+        tuple: (rows to fold, next startblock or None when the history is complete)
+    """
+    if len(rows) < page_size:
+        return rows, None
+
+    last_block = int(rows[-1]['blockNumber'])
+    cut = len(rows)
+    while cut > 0 and int(rows[cut - 1]['blockNumber']) == last_block:
+        cut -= 1
+
+    if cut == 0:
+        # One block fills the whole page; explorers cannot window inside a block
+        print(f"⚠️ Block {last_block} has more than {page_size} transfers, some may be missing")
+        return rows, last_block + 1
+
+    return rows[:cut], last_block
+
+
+def _outcome(rows) -> str:
+    if rows is _RATE_LIMITED:
+        return "rate_limited"
+    return "error" if rows is None else "ok"
+
+
+def _fetch_page(explorer: dict, params: dict, api_keys: list):
+    """
+    Fetch one page, queueing on the API key's token bucket and retrying with
+    jittered backoff while the explorer reports a rate limit.
+    """
+    label = explorer["label"]
+    rate = explorer.get("rate_limit", EXPLORER_RATE_LIMIT)
+
+    for attempt in range(EXPLORER_MAX_RETRIES + 1):
+        api_key, bucket = choose_api_key(api_keys, rate, label)
+        time.sleep(bucket.reserve())
+
+        started = time.perf_counter()
+        try:
+            response = requests.get(explorer["api_url"], params={**params, "apikey": api_key}, timeout=10)
+        except Exception as e:
+            record_upstream(label, "error", time.perf_counter() - started)
+            print(f"❌ {label} API Error: {e}")
+            return None
+
+        rows = _page_rows(response, label)
+        record_upstream(label, _outcome(rows), time.perf_counter() - started)
+        if rows is not _RATE_LIMITED:
+            return rows
+
+        # Everyone on this key backs off, not just this caller
+        bucket.penalize(backoff_delay(attempt))
+
+    print(f"❌ {label} API Error: still rate limited after {EXPLORER_MAX_RETRIES} retries")
+    return None
+
+
+async def _fetch_page_async(explorer: dict, params: dict, api_keys: list):
+    label = explorer["label"]
+    rate = explorer.get("rate_limit", EXPLORER_RATE_LIMIT)
+
+    for attempt in range(EXPLORER_MAX_RETRIES + 1):
+        api_key, bucket = choose_api_key(api_keys, rate, label)
+        await asyncio.sleep(bucket.reserve())
+
+        started = time.perf_counter()
+        try:
+            response = await async_get(explorer["api_url"], params={**params, "apikey": api_key})
+        except Exception as e:
+            record_upstream(label, "error", time.perf_counter() - started)
+            print(f"❌ {label} API Error: {e}")
+            return None
+
+        rows = _page_rows(response, label)
+        record_upstream(label, _outcome(rows), time.perf_counter() - started)
+        if rows is not _RATE_LIMITED:
+            return rows
+
+        bucket.penalize(backoff_delay(attempt))
+
+    print(f"❌ {label} API Error: still rate limited after {EXPLORER_MAX_RETRIES} retries")
+    return None
+
+
+def iter_token_transfer_pages(explorer: dict, wallet: str, api_keys: list, start_block: int = 0):
+    """
+    Walk a wallet's full tokentx history in block windows, one page at a time.
+
+    Only one page is held at once (plus the one being prefetched), so memory
+    does not grow with the history. Every yielded page covers whole blocks.
+    If a request fails the walk stops early, and what was yielded is still
+    consistent up to its last block.
+
+    Args:
+        explorer (dict): EVM_EXPLORERS entry (api_url, label, page_size, rate_limit).
+        wallet (str): Wallet address.
+        api_keys (list): Pool of API keys to spread calls across.
+        start_block (int): First block to include.
+
+    Yields:
+        list: tokentx rows in ascending block order.
+    """
+    page_size = explorer["page_size"]
+
+    future = _prefetch_pool.submit(_fetch_page, explorer, _page_params(wallet, start_block, page_size), api_keys)
+    while future is not None:
+        rows = future.result()
+        if not rows:
+            return
+
+        rows, next_block = _split_page(rows, page_size)
+        future = None
+        if next_block is not None:
+            future = _prefetch_pool.submit(
+                _fetch_page, explorer, _page_params(wallet, next_block, page_size), api_keys
+            )
+
+        yield rows
+
+
+async def aiter_token_transfer_pages(explorer: dict, wallet: str, api_keys: list, start_block: int = 0):
+    """
+    Async variant of iter_token_transfer_pages using the shared HTTP client.
+    """
+    page_size = explorer["page_size"]
+
+    task = asyncio.ensure_future(
+        _fetch_page_async(explorer, _page_params(wallet, start_block, page_size), api_keys)
+    )
+    try:
+        while task is not None:
+            rows = await task
+            if not rows:
+                return
+
+            rows, next_block = _split_page(rows, page_size)
+            task = None
+            if next_block is not None:
+                task = asyncio.ensure_future(
+                    _fetch_page_async(explorer, _page_params(wallet, next_block, page_size), api_keys)
+                )
+
+            yield rows
+    finally:
+        if task is not None and not task.done():
+            task.cancel()
+
+
+async def has_transfers_since_async(explorer: dict, wallet: str, api_keys: list, start_block: int):
+    """
+    Ask for a single tokentx row at or after start_block.
+
+    Returns:
+        bool | None: Whether the wallet has transfers from start_block on, or None if the explorer failed.
+    """
+    rows = await _fetch_page_async(explorer, _page_params(wallet, start_block, 1), api_keys)
+    return None if rows is None else len(rows) > 0
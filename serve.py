@@ -0,0 +1,53 @@
+"""
+Production entry point: several uvicorn workers sharing one host-wide cache.
+
+    python serve.py --workers 4 --port 8001
+
+The parent warms the pool snapshot file once, so every worker starts by
+memory-mapping it instead of downloading /pools itself, and enables
+SHARED_CACHE_PATH so prices, results and the pool download lease are shared.
+Point the load balancer's health check at /ready.
+
+Alert subscriptions, their event streams and the watchlist live in each
+worker's memory, and requests land on any worker. Runs with one worker by
+default; only raise --workers when those endpoints are not used (or are
+routed to a single instance).
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Yield Optimizer MCP with several workers.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "1")))
+    parser.add_argument("--no-warm", action="store_true", help="Skip downloading the pool snapshot before forking.")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        print(f"⚠️ {args.workers} workers: /alerts and /watchlist state is per worker, not shared")
+
+    # Workers inherit the environment, so set shared defaults before anything reads utils.config
+    os.environ.setdefault("SHARED_CACHE_PATH", "shared_cache.sqlite3")
+
+    from utils.config import POOL_SNAPSHOT_PATH, warn_missing_keys
+    warn_missing_keys()
+
+    if not args.no_warm and POOL_SNAPSHOT_PATH:
+        from protocols.defillama import refresh_pool_snapshot
+
+        # ✅ Reuses a fresh file from a previous run, otherwise downloads and writes one
+        snapshot = refresh_pool_snapshot()
+        if snapshot is None:
+            print("⚠️ Could not warm the pool snapshot; workers will download it themselves")
+        else:
+            print(f"✅ Pool snapshot ready: {len(snapshot)} pools in {POOL_SNAPSHOT_PATH}")
+
+    import uvicorn  # Only needed to serve, not to import the app
+
+    uvicorn.run("app:app", host=args.host, port=args.port, workers=max(1, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import asyncio
+import ipaddress
+import json
+import socket
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from utils.config import (
+    ALERT_APY_CHANGE, ALERT_MAX_SUBSCRIPTIONS, ALERT_WEBHOOK_TIMEOUT, ALERT_WEBHOOK_RETRIES,
+    ALERT_WEBHOOK_CONCURRENCY, ALERT_STREAM_BUFFER, ALERT_STREAM_KEEPALIVE, ALERT_WEBHOOK_ALLOWED_HOSTS
+)
+from utils.http_client import async_post
+from utils.metrics import timed, ALERTS_SENT, ALERT_SUBSCRIPTIONS
+
+
+def _wallet_key(wallet: str, chain: str) -> tuple:
+    # EVM addresses are case-insensitive; Solana addresses are not
+    return (wallet.lower() if wallet.lower().startswith("0x") else wallet, chain.lower())
+
+
+async def check_webhook_url(url: str):
+    """
+    Reject webhook URLs that could reach internal services.
+
+    Hosts in ALERT_WEBHOOK_ALLOWED_HOSTS are accepted as configured. Any other
+    host must resolve only to public addresses: loopback, private (RFC 1918),
+    link-local (including cloud metadata at 169.254.169.254), multicast and
+    reserved ranges are refused. Deliveries connect to the address checked
+    here (see _pinned_request), so a DNS change cannot point a hook inward.
+
+    Returns:
+        str | None: A checked public address of the host, or None for an allow-listed host.
+
+    Raises:
+        ValueError: If the URL is not an http(s) URL to a public host.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("'webhook_url' must be an http(s) URL")
+
+    host = parts.hostname.lower()
+    if host in ALERT_WEBHOOK_ALLOWED_HOSTS:
+        return None
+
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, parts.port or 443, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError(f"cannot resolve webhook host '{host}': {e}")
+
+    addresses = []
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"webhook host '{host}' resolves to a non-public address ({address})")
+        addresses.append(address)
+    if not addresses:
+        raise ValueError(f"cannot resolve webhook host '{host}'")
+    return str(addresses[0])
+
+
+def _pinned_request(url: str, address: str) -> tuple:
+    """
+    The URL rewritten to connect to a checked address, with the Host header and TLS server name
+    (SNI and certificate check) kept on the original host name.
+
+    Returns:
+        tuple: (url, headers, extensions) for utils.http_client.async_post.
+    """
+    parts = urlsplit(url)
+    port = f":{parts.port}" if parts.port else ""
+    userinfo = parts.netloc.rpartition("@")[0]
+    ip = f"[{address}]" if ":" in address else address
+    netloc = f"{userinfo}@{ip}{port}" if userinfo else f"{ip}{port}"
+    return (
+        parts._replace(netloc=netloc).geturl(),
+        {"Host": f"{parts.hostname}{port}"},
+        {"sni_hostname": parts.hostname},
+    )
+
+
+def _position_pools(result: dict) -> dict:
+    """
+    Pools backing a wallet result: every position's best pool and ranked alternatives.
+
+    Returns:
+        dict: pool id -> {'asset', 'protocol', 'symbol', 'baseline'}
+    """
+    pools = {}
+    for position in result.get("positions", []):
+        for pool in position.get("alternatives") or []:
+            if pool.get("pool") and pool["pool"] not in pools:
+                pools[pool["pool"]] = {
+                    "asset": position["asset"],
+                    "protocol": pool.get("protocol"),
+                    "symbol": pool.get("symbol"),
+                    "baseline": float(pool.get("apy", 0.0)),
+                }
+    return pools
+
+
+def _reasons(subscription: dict, baseline: float, old: float, new: float) -> list:
+    if np.isnan(new):
+        return ["pool_removed"]
+
+    reasons = []
+    if subscription["apy_change"] and abs(new - baseline) >= subscription["apy_change"]:
+        reasons.append("apy_change")
+    below, above = subscription["apy_below"], subscription["apy_above"]
+    if below is not None and new < below <= old:
+        reasons.append("apy_below")
+    if above is not None and old <= above < new:
+        reasons.append("apy_above")
+    return reasons
+
+
+class AlertHub:
+    """
+    APY alert subscriptions, fed by pool snapshot diffs.
+
+    Each subscription watches the pools behind a wallet's positions. A
+    reverse index maps pool id -> subscriptions, so a new snapshot is only
+    compared with the previous one for watched pools, and only subscribers
+    of pools that changed are evaluated. Alert cost scales with changes,
+    not with subscribers times polls.
+
+    Alerts go to the subscription's webhook (retried with backoff) and to
+    any open server-sent-events streams for it.
+    """
+
+    def __init__(self, max_subscriptions: int = ALERT_MAX_SUBSCRIPTIONS):
+        self.max_subscriptions = max_subscriptions
+        self.subscriptions = {}
+        self.by_wallet = {}  # (wallet, chain) -> subscription ids
+        self.by_pool = {}  # pool id -> subscription ids
+        self.streams = {}  # subscription id -> queues of open streams
+        self.lock = threading.Lock()
+        self.loop = None
+        self.tasks = set()
+        self.webhook_slots = None  # Created in start(), on the loop that delivers
+
+    def _set_pools(self, subscription: dict, pools: dict):
+        # Pools still watched keep their baseline, so a slow drift still adds up to an alert
+        for pool_id in subscription["pools"].keys() - pools.keys():
+            ids = self.by_pool.get(pool_id)
+            if ids is not None:
+                ids.discard(subscription["id"])
+                if not ids:
+                    del self.by_pool[pool_id]
+        for pool_id, pool in pools.items():
+            if pool_id in subscription["pools"]:
+                pool["baseline"] = subscription["pools"][pool_id]["baseline"]
+            self.by_pool.setdefault(pool_id, set()).add(subscription["id"])
+        subscription["pools"] = pools
+
+    def subscribe(self, wallet: str, chain: str, result: dict, webhook_url: str = None, apy_change: float = None,
+                  apy_below: float = None, apy_above: float = None):
+        """
+        Watch the pools behind a wallet result.
+
+        Args:
+            wallet (str): Wallet address.
+            chain (str): Chain name.
+            result (dict): The wallet's current get_wallet_yield result.
+            webhook_url (str, optional): URL that receives each alert as a JSON POST.
+            apy_change (float, optional): Alert when a pool's APY moves this many percentage points
+                from the last value alerted on. Defaults to ALERT_APY_CHANGE.
+            apy_below (float, optional): Alert when a pool's APY falls below this.
+            apy_above (float, optional): Alert when a pool's APY rises above this.
+
+        Returns:
+            dict | None: The subscription, or None if the subscription limit is reached.
+        """
+        subscription = {
+            "id": uuid.uuid4().hex,
+            "wallet": wallet,
+            "chain": chain.lower(),
+            "webhook_url": webhook_url,
+            "apy_change": float(ALERT_APY_CHANGE if apy_change is None else apy_change),
+            "apy_below": None if apy_below is None else float(apy_below),
+            "apy_above": None if apy_above is None else float(apy_above),
+            "pools": {},
+            "created_at": time.time(),
+            "last_alert": None,
+        }
+        with self.lock:
+            if len(self.subscriptions) >= self.max_subscriptions:
+                return None
+            self.subscriptions[subscription["id"]] = subscription
+            self.by_wallet.setdefault(_wallet_key(wallet, chain), set()).add(subscription["id"])
+            self._set_pools(subscription, _position_pools(result))
+            ALERT_SUBSCRIPTIONS.set(len(self.subscriptions))
+        return subscription
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        with self.lock:
+            subscription = self.subscriptions.pop(subscription_id, None)
+            if subscription is None:
+                return False
+            self._set_pools(subscription, {})
+            wallet_ids = self.by_wallet.get(_wallet_key(subscription["wallet"], subscription["chain"]), set())
+            wallet_ids.discard(subscription_id)
+            if not wallet_ids:
+                self.by_wallet.pop(_wallet_key(subscription["wallet"], subscription["chain"]), None)
+            ALERT_SUBSCRIPTIONS.set(len(self.subscriptions))
+
+        # Open streams end once they drain
+        self._publish([(subscription_id, None, None)])
+        return True
+
+    def update_wallet(self, wallet: str, chain: str, result: dict):
+        """
+        Re-point a wallet's subscriptions at the pools of a freshly computed result. Cheap when nobody subscribed.
+        """
+        key = _wallet_key(wallet, chain)
+        if key not in self.by_wallet:
+            return
+        pools = _position_pools(result)
+        with self.lock:
+            for subscription_id in self.by_wallet.get(key, ()):
+                self._set_pools(self.subscriptions[subscription_id], {k: dict(v) for k, v in pools.items()})
+
+    def get(self, subscription_id: str):
+        return self.subscriptions.get(subscription_id)
+
+    def snapshot(self) -> list:
+        with self.lock:
+            return [
+                {
+                    "id": s["id"],
+                    "wallet": s["wallet"],
+                    "chain": s["chain"],
+                    "webhook_url": s["webhook_url"],
+                    "apy_change": s["apy_change"],
+                    "apy_below": s["apy_below"],
+                    "apy_above": s["apy_above"],
+                    "pools": len(s["pools"]),
+                    "streams": len(self.streams.get(s["id"], ())),
+                    "created_at": s["created_at"],
+                    "last_alert": s["last_alert"],
+                }
+                for s in self.subscriptions.values()
+            ]
+
+    def on_snapshot(self, previous, snapshot) -> list:
+        """
+        Diff a newly installed pool snapshot against the previous one and send the resulting alerts.
+
+        Only watched pools are compared; only subscribers of pools whose APY
+        changed are checked against their thresholds.
+
+        Returns:
+            list: Alert payloads, one per affected subscription.
+        """
+        if previous is None or not self.by_pool:
+            return []
+
+        with self.lock, timed("alerts_diff"):
+            watched = list(self.by_pool)
+            old_rows = previous.rows_for_pools(watched)
+            new_rows = snapshot.rows_for_pools(watched)
+            old = np.where(old_rows >= 0, previous.apy[old_rows], np.nan)
+            new = np.where(new_rows >= 0, snapshot.apy[new_rows], np.nan)
+            changed = np.flatnonzero((old != new) & ~(np.isnan(old) & np.isnan(new)))
+
+            changes = {}
+            for i in changed.tolist():
+                pool_id = watched[i]
+                for subscription_id in self.by_pool[pool_id]:
+                    subscription = self.subscriptions[subscription_id]
+                    pool = subscription["pools"][pool_id]
+                    reasons = _reasons(subscription, pool["baseline"], old[i], new[i])
+                    if not reasons:
+                        continue
+                    changes.setdefault(subscription_id, []).append({
+                        "pool": pool_id,
+                        "asset": pool["asset"],
+                        "protocol": pool["protocol"],
+                        "symbol": pool["symbol"],
+                        "previous_apy": pool["baseline"],
+                        "apy": None if np.isnan(new[i]) else float(new[i]),
+                        "reasons": reasons,
+                    })
+                    if not np.isnan(new[i]):
+                        pool["baseline"] = float(new[i])
+
+            now = time.time()
+            payloads = []
+            for subscription_id, pool_changes in changes.items():
+                subscription = self.subscriptions[subscription_id]
+                subscription["last_alert"] = now
+                payloads.append((subscription_id, subscription["webhook_url"], {
+                    "subscription": subscription_id,
+                    "wallet": subscription["wallet"],
+                    "chain": subscription["chain"],
+                    "snapshot_version": snapshot.version,
+                    "at": now,
+                    "changes": pool_changes,
+                }))
+
+        self._publish(payloads)
+        return [payload for _, _, payload in payloads]
+
+    def _publish(self, payloads: list):
+        # Snapshots may be installed from a worker thread; delivery always runs on the event loop
+        if payloads and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._deliver, payloads)
+
+    def _deliver(self, payloads: list):
+        for subscription_id, webhook_url, payload in payloads:
+            for queue in list(self.streams.get(subscription_id, ())):
+                if queue.full():
+                    queue.get_nowait()
+                    ALERTS_SENT.inc(channel="stream", outcome="dropped")
+                queue.put_nowait(payload)
+                if payload is not None:
+                    ALERTS_SENT.inc(channel="stream", outcome="ok")
+
+            if webhook_url and payload is not None:
+                task = asyncio.ensure_future(self._post_webhook(webhook_url, payload))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def _post_webhook(self, url: str, payload: dict):
+        async with self.webhook_slots:
+            for attempt in range(ALERT_WEBHOOK_RETRIES + 1):
+                try:
+                    address = await check_webhook_url(url)
+                except ValueError as e:
+                    ALERTS_SENT.inc(channel="webhook", outcome="rejected")
+                    print(f"⚠️ Alert webhook {url} refused: {e}")
+                    return
+                # Connect to the address just checked rather than letting the client resolve the host again
+                target, headers, extensions = _pinned_request(url, address) if address else (url, None, None)
+                try:
+                    response = await async_post(
+                        target, json=payload, timeout=ALERT_WEBHOOK_TIMEOUT, headers=headers, extensions=extensions
+                    )
+                    if response.status_code < 300:
+                        ALERTS_SENT.inc(channel="webhook", outcome="ok")
+                        return
+                    error = f"HTTP {response.status_code}"
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                if attempt < ALERT_WEBHOOK_RETRIES:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+        ALERTS_SENT.inc(channel="webhook", outcome="error")
+        print(f"⚠️ Alert webhook {url} failed after {ALERT_WEBHOOK_RETRIES + 1} attempts: {error}")
+
+    async def stream(self, subscription_id: str):
+        """
+        Server-sent events for one subscription: an 'alert' event per alert, keepalive comments in between.
+        Ends when the subscription is removed or the hub stops.
+        """
+        queue = asyncio.Queue(maxsize=ALERT_STREAM_BUFFER)
+        self.streams.setdefault(subscription_id, set()).add(queue)
+        try:
+            yield f"event: subscribed\ndata: {json.dumps({'subscription': subscription_id})}\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), ALERT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if payload is None:
+                    return
+                yield f"event: alert\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            queues = self.streams.get(subscription_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self.streams[subscription_id]
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.webhook_slots = asyncio.Semaphore(ALERT_WEBHOOK_CONCURRENCY)
+
+    async def stop(self):
+        for subscription_id in list(self.streams):
+            self._deliver([(subscription_id, None, None)])
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.loop = None
+
+
+_hub = AlertHub()
+
+
+def get_alert_hub() -> AlertHub:
+    """Process-wide alert hub."""
+    return _hub
@@ -0,0 +1,485 @@
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.config import APY_HISTORY_DIR, APY_HISTORY_INTERVAL, APY_HISTORY_DAYS
+from utils.metrics import timed
+from utils.mmap_store import write_arrays, read_arrays
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+_lock = threading.Lock()
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m%d")
+
+
+def _segment_path(day: str) -> str:
+    return os.path.join(APY_HISTORY_DIR, f"{day}.bin")
+
+
+def _log_path(day: str) -> str:
+    return os.path.join(APY_HISTORY_DIR, f"{day}.log")
+
+
+def _segment_days() -> list:
+    if not APY_HISTORY_DIR or not os.path.isdir(APY_HISTORY_DIR):
+        return []
+    return sorted({
+        name[:-4] for name in os.listdir(APY_HISTORY_DIR)
+        if name.endswith((".bin", ".log")) and name[:-4].isdigit()
+    })
+
+
+def _file_stamp(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _encode(times: np.ndarray, values: np.ndarray, present: np.ndarray, pools: list, day: str):
+    """
+    One day of samples as arrays for utils/mmap_store.
+
+    APYs are stored in basis points, forward-filled where a pool is missing:
+    the first sample in full, later ones delta-encoded along time, so
+    unchanged APYs are runs of zeros and the deltas usually fit in int16.
+    A packed bitmap records which samples exist.
+    """
+    deltas = np.diff(values, axis=0)
+    dtype = np.int16 if deltas.size == 0 or np.abs(deltas).max() < 2 ** 15 else np.int32
+    arrays = {
+        "times": times.astype(np.float64),
+        "base": values[0].astype(np.int32),
+        "deltas": deltas.astype(dtype).ravel(),
+        "present": np.packbits(present.ravel()),
+    }
+    meta = {"day": day, "shape": list(values.shape), "pools": pools}
+    return arrays, meta
+
+
+def _decode(arrays: dict, meta: dict, columns=None):
+    """
+    Returns:
+        tuple: (times [T], basis points [T, K] forward-filled, present [T, K]) for the given columns (default all).
+    """
+    rows, cols = meta["shape"]
+    base = np.asarray(arrays["base"])
+    deltas = np.asarray(arrays["deltas"]).reshape(rows - 1, cols)
+    present = np.unpackbits(np.asarray(arrays["present"]), count=rows * cols).reshape(rows, cols).astype(bool)
+    if columns is not None:
+        base, deltas, present = base[columns], deltas[:, columns], present[:, columns]
+    values = np.cumsum(np.vstack([base[None, :], deltas]), axis=0, dtype=np.int64)
+    return np.asarray(arrays["times"]), values, present
+
+
+def _read_segment(day: str):
+    path = _segment_path(day)
+    if not os.path.exists(path):
+        return None
+    return read_arrays(path)
+
+
+# Sample log record: fetched_at, length of the new pool ids, changed columns, columns whose presence flipped.
+# Followed by the new pool ids ("\n"-joined), changed columns and their basis points (int32), flipped columns.
+_RECORD = struct.Struct("<dIII")
+
+
+def _pack_record(fetched_at: float, new_pools: list, changed: np.ndarray, bps: np.ndarray,
+                 flipped: np.ndarray) -> bytes:
+    names = "\n".join(new_pools).encode()
+    return b"".join([
+        _RECORD.pack(fetched_at, len(names), len(changed), len(flipped)),
+        names,
+        changed.astype("<i4").tobytes(),
+        bps.astype("<i4").tobytes(),
+        flipped.astype("<i4").tobytes(),
+    ])
+
+
+def _read_log(path: str):
+    """
+    Records of a day's sample log. A record cut short by a crash ends the log.
+
+    Returns:
+        tuple: (list of (fetched_at, new pools, changed, bps, flipped), bytes of complete records)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    records, offset = [], 0
+    while offset + _RECORD.size <= len(data):
+        fetched_at, names_len, n_changed, n_flipped = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + names_len + 4 * (2 * n_changed + n_flipped)
+        if end > len(data):
+            break
+        pos = offset + _RECORD.size
+        names = data[pos:pos + names_len].decode().split("\n") if names_len else []
+        pos += names_len
+        changed = np.frombuffer(data, dtype="<i4", count=n_changed, offset=pos)
+        bps = np.frombuffer(data, dtype="<i4", count=n_changed, offset=pos + 4 * n_changed)
+        flipped = np.frombuffer(data, dtype="<i4", count=n_flipped, offset=pos + 8 * n_changed)
+        records.append((fetched_at, names, changed, bps, flipped))
+        offset = end
+    return records, offset
+
+
+def _load_day(day: str) -> dict:
+    """
+    Every sample of a day: its compacted segment, then its sample log replayed on top.
+
+    Log records at or before the segment's last sample were already compacted into it
+    (a crash between writing the segment and removing the log) and only contribute pool ids.
+
+    Returns:
+        dict: times [T], values [T, K] basis points, present [T, K], pools, log_end (bytes of the log replayed).
+    """
+    segment = _read_segment(day)
+    if segment is not None:
+        arrays, meta = segment
+        times, values, present = _decode(arrays, meta)
+        pools = list(meta["pools"])
+    else:
+        times, values, present, pools = np.zeros(0), np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0), dtype=bool), []
+
+    log_end = 0
+    if os.path.exists(_log_path(day)):
+        records, log_end = _read_log(_log_path(day))
+        column_of = {pool: i for i, pool in enumerate(pools)}
+        row = values[-1] if len(values) else np.zeros(0, dtype=np.int64)
+        row_present = present[-1] if len(present) else np.zeros(0, dtype=bool)
+        last = times[-1] if len(times) else -np.inf
+        new_times, new_rows, new_present = [], [], []
+        for fetched_at, names, changed, bps, flipped in records:
+            for pool in names:
+                if pool not in column_of:
+                    column_of[pool] = len(pools)
+                    pools.append(pool)
+            if fetched_at <= last:
+                continue
+            row = np.pad(row, (0, len(pools) - len(row)))
+            row[changed] = bps
+            row_present = np.pad(row_present, (0, len(pools) - len(row_present)))
+            row_present[flipped] = ~row_present[flipped]
+            new_times.append(fetched_at)
+            new_rows.append(row)
+            new_present.append(row_present)
+            last = fetched_at
+
+        width = len(pools)
+        times = np.append(times, new_times)
+        values = np.vstack([np.pad(values, ((0, 0), (0, width - values.shape[1])))]
+                           + [np.pad(r, (0, width - len(r)))[None, :] for r in new_rows])
+        present = np.vstack([np.pad(present, ((0, 0), (0, width - present.shape[1])))]
+                            + [np.pad(p, (0, width - len(p)))[None, :] for p in new_present])
+
+    return {"times": times, "values": values, "present": present, "pools": pools, "log_end": log_end}
+
+
+def _compact(day: str):
+    """
+    Fold a finished day's sample log into its segment file, then remove the log.
+    """
+    loaded = _load_day(day)
+    if len(loaded["times"]):
+        arrays, meta = _encode(loaded["times"], loaded["values"], loaded["present"], loaded["pools"], day)
+        write_arrays(_segment_path(day), arrays, meta)
+    os.remove(_log_path(day))
+
+
+# Appender state for the day being logged, so a sample costs one append instead of rewriting the day
+_tail = None
+
+
+def _tail_for(day: str) -> dict:
+    """
+    The appender state for `day`, restored from disk when this process has none or another
+    process appended since (the pool download lease moves between workers).
+    """
+    global _tail
+
+    log_path = _log_path(day)
+    if _tail is not None and _tail["day"] == day and _file_stamp(log_path) == _tail["stamp"]:
+        return _tail
+
+    for other in _segment_days():
+        if other < day and os.path.exists(_log_path(other)):
+            try:
+                _compact(other)
+            except Exception as e:
+                print(f"⚠️ Could not compact APY history for {other}: {e}")
+
+    loaded = _load_day(day)
+    if os.path.exists(log_path) and os.path.getsize(log_path) > loaded["log_end"]:
+        # Drop a record cut short by a crash, so the next one starts on a record boundary
+        with open(log_path, "r+b") as f:
+            f.truncate(loaded["log_end"])
+
+    pools = loaded["pools"]
+    has = len(loaded["times"]) > 0
+    _tail = {
+        "day": day,
+        "pools": pools,
+        "column_of": {pool: i for i, pool in enumerate(pools)},
+        "row": loaded["values"][-1].copy() if has else np.zeros(len(pools), dtype=np.int64),
+        "present": loaded["present"][-1].copy() if has else np.zeros(len(pools), dtype=bool),
+        "last": float(loaded["times"][-1]) if has else None,
+        "stamp": _file_stamp(log_path),
+    }
+    return _tail
+
+
+def record_snapshot(snapshot) -> bool:
+    """
+    Append a pool snapshot's APYs to the day's sample log, at most once per APY_HISTORY_INTERVAL.
+
+    Only the columns that changed since the previous sample are written, so an
+    append costs O(changes) rather than a rewrite of the day. Finished days are
+    compacted into segment files when the next day's first sample arrives.
+
+    Returns:
+        bool: True if a sample was written.
+    """
+    global _tail
+
+    if not APY_HISTORY_DIR:
+        return False
+
+    day = _day(snapshot.fetched_at)
+    with _lock, timed("apy_history_append"):
+        os.makedirs(APY_HISTORY_DIR, exist_ok=True)
+        tail = _tail_for(day)
+        if tail["last"] is not None and snapshot.fetched_at - tail["last"] < APY_HISTORY_INTERVAL:
+            return False
+
+        # Map the snapshot's pool ids onto the day's columns, adding new pools at the end
+        pools, column_of = tail["pools"], tail["column_of"]
+        snapshot_pools = [snapshot.pools[i] for i in snapshot.pool_ids.tolist()]
+        new_pools = []
+        for pool in snapshot_pools:
+            if pool and pool not in column_of:
+                column_of[pool] = len(pools)
+                pools.append(pool)
+                new_pools.append(pool)
+        keep = np.array([bool(pool) for pool in snapshot_pools], dtype=bool)
+        columns = np.array([column_of.get(pool, 0) for pool in snapshot_pools], dtype=np.int64)[keep]
+        bps = np.clip(np.round(np.asarray(snapshot.apy)[keep] * 100), -2 ** 31, 2 ** 31 - 1).astype(np.int64)
+
+        previous = np.pad(tail["row"], (0, len(pools) - len(tail["row"])))
+        previous_present = np.pad(tail["present"], (0, len(pools) - len(tail["present"])))
+        row = previous.copy()
+        row[columns] = bps
+        row_present = np.zeros(len(pools), dtype=bool)
+        row_present[columns] = True
+
+        changed = np.flatnonzero(row != previous)
+        flipped = np.flatnonzero(row_present != previous_present)
+        try:
+            with open(_log_path(day), "ab") as f:
+                f.write(_pack_record(snapshot.fetched_at, new_pools, changed, row[changed], flipped))
+        except Exception:
+            _tail = None  # Pools were added to the state but not logged; restore from disk next time
+            raise
+
+        tail.update(row=row, present=row_present, last=float(snapshot.fetched_at), stamp=_file_stamp(_log_path(day)))
+        _prune(day)
+    return True
+
+
+def _prune(today: str):
+    cutoff = _day(datetime.strptime(today, "%Y%m%d").replace(tzinfo=timezone.utc).timestamp()
+                  - APY_HISTORY_DAYS * 24 * 3600)
+    for day in _segment_days():
+        if day < cutoff:
+            for path in (_segment_path(day), _log_path(day)):
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    print(f"⚠️ Could not prune APY history file {path}: {e}")
+
+
+# Decoded days by file stamps, so repeated backtests skip re-reading segment headers and replaying logs
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+def _cached_day(day: str):
+    """
+    A day's samples for column lookups, reused until its segment or log file changes.
+
+    Compacted days keep their memory-mapped arrays and decode only the columns asked for;
+    a day that still has a sample log is held fully decoded.
+    """
+    stamp = (_file_stamp(_segment_path(day)), _file_stamp(_log_path(day)))
+    with _segments_lock:
+        cached = _segments.get(day)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    if stamp[1] is None:
+        segment = _read_segment(day)
+        if segment is None:
+            return None
+        arrays, meta = segment
+        entry = {"arrays": arrays, "meta": meta, "pools": meta["pools"]}
+    else:
+        loaded = _load_day(day)
+        entry = {"full": (loaded["times"], loaded["values"], loaded["present"]), "pools": loaded["pools"]}
+    entry["column_of"] = {pool: i for i, pool in enumerate(entry["pools"])}
+
+    with _segments_lock:
+        _segments[day] = (stamp, entry)
+    return entry
+
+
+def _day_columns(entry: dict, columns: np.ndarray):
+    if "arrays" in entry:
+        return _decode(entry["arrays"], entry["meta"], columns)
+    times, values, present = entry["full"]
+    return times, values[:, columns], present[:, columns]
+
+
+def load_apy_history(pool_ids: list, start: float, end: float):
+    """
+    APY series for some pools over [start, end], scanning only the day segments in range.
+
+    Only the requested columns are decoded, so months of history for
+    thousands of pools cost little more than the columns asked for.
+
+    Args:
+        pool_ids (list): DeFiLlama pool ids.
+        start (float): Unix timestamp.
+        end (float): Unix timestamp.
+
+    Returns:
+        tuple: (times [T], apy [T, len(pool_ids)] in %, NaN where a pool had no sample)
+    """
+    first, last = _day(start), _day(end)
+    all_times, all_apys = [], []
+
+    days = _segment_days()
+    with _segments_lock:
+        for day in [day for day in _segments if day not in days]:
+            del _segments[day]
+
+    for day in days:
+        if day < first or day > last:
+            continue
+        entry = _cached_day(day)
+        if entry is None or not entry["pools"]:
+            continue
+        wanted = np.array([entry["column_of"].get(pool, -1) for pool in pool_ids], dtype=np.int64)
+
+        times, values, present = _day_columns(entry, np.maximum(wanted, 0))
+        apy = np.where(present & (wanted >= 0), values / 100.0, np.nan)
+        in_range = (times >= start) & (times <= end)
+        all_times.append(times[in_range])
+        all_apys.append(apy[in_range])
+
+    if not all_times:
+        return np.zeros(0), np.zeros((0, len(pool_ids)))
+    return np.concatenate(all_times), np.vstack(all_apys)
+
+
+def realized_yields(times: np.ndarray, apy: np.ndarray, values_usd: np.ndarray) -> dict:
+    """
+    Yield each column would have earned over the sampled window, holding each APY until the next sample.
+
+    Args:
+        times (np.ndarray): Sample timestamps [T], ascending.
+        apy (np.ndarray): APY in % [T, K]; NaN gaps earn nothing.
+        values_usd (np.ndarray): Position value per column [K].
+
+    Returns:
+        dict: Arrays per column: realized_usd, annualized_apy, mean_apy, min_apy, max_apy, coverage.
+    """
+    k = apy.shape[1]
+    if len(times) < 2:
+        empty = np.full(k, np.nan)
+        return {"realized_usd": np.zeros(k), "annualized_apy": empty, "mean_apy": empty,
+                "min_apy": empty, "max_apy": empty, "coverage": np.zeros(k)}
+
+    dt = np.diff(times)[:, None]
+    held = apy[:-1]
+    known = ~np.isnan(held)
+    realized_fraction = (np.where(known, held / 100.0, 0.0) * dt).sum(axis=0) / SECONDS_PER_YEAR
+    covered = (known * dt).sum(axis=0)
+
+    sampled = ~np.isnan(apy)
+    count = sampled.sum(axis=0)
+    has = count > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "realized_usd": realized_fraction * values_usd,
+            "annualized_apy": np.where(covered > 0, realized_fraction * SECONDS_PER_YEAR / covered * 100, np.nan),
+            "mean_apy": np.where(has, np.where(sampled, apy, 0.0).sum(axis=0) / count, np.nan),
+            "min_apy": np.where(has, np.where(sampled, apy, np.inf).min(axis=0), np.nan),
+            "max_apy": np.where(has, np.where(sampled, apy, -np.inf).max(axis=0), np.nan),
+            "coverage": covered / (times[-1] - times[0]),
+        }
+
+
+def backtest_positions(positions: list, days: float, end: float = None) -> dict:
+    """
+    Realized-yield backtest of a wallet's positions over the last `days` days.
+
+    Each position is backtested in every pool it was matched to (best pool
+    first, then the ranked alternatives), holding its current USD value.
+
+    Args:
+        positions (list): Positions from get_wallet_yield ('asset', 'value_usd', 'alternatives').
+        days (float): Window length.
+        end (float, optional): Window end (Unix time). Defaults to now.
+
+    Returns:
+        dict: Window, per-position results per pool, and totals for the best-pool strategy.
+    """
+    end = end or time.time()
+    start = end - days * 24 * 3600
+
+    columns = []  # (position index, pool dict)
+    for i, position in enumerate(positions):
+        for pool in position.get("alternatives") or []:
+            if pool.get("pool"):
+                columns.append((i, pool))
+
+    with timed("backtest"):
+        times, apy = load_apy_history([pool["pool"] for _, pool in columns], start, end)
+        values = np.array([positions[i]["value_usd"] for i, _ in columns], dtype=np.float64)
+        stats = realized_yields(times, apy, values)
+
+    def _num(value):
+        return None if not np.isfinite(value) else round(float(value), 6)
+
+    results = [
+        {"asset": p["asset"], "value_usd": p["value_usd"], "pools": []} for p in positions
+    ]
+    for column, (i, pool) in enumerate(columns):
+        results[i]["pools"].append({
+            "pool": pool["pool"],
+            "protocol": pool["protocol"],
+            "symbol": pool["symbol"],
+            "realized_yield_usd": _num(stats["realized_usd"][column]),
+            "annualized_apy": _num(stats["annualized_apy"][column]),
+            "mean_apy": _num(stats["mean_apy"][column]),
+            "min_apy": _num(stats["min_apy"][column]),
+            "max_apy": _num(stats["max_apy"][column]),
+            "coverage": _num(stats["coverage"][column]),
+        })
+
+    best = [r["pools"][0]["realized_yield_usd"] or 0.0 for r in results if r["pools"]]
+    return {
+        "start": start,
+        "end": end,
+        "samples": int(len(times)),
+        "positions": results,
+        "best_pool_realized_yield_usd": float(sum(best)),
+    }
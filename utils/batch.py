@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from utils.config import BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY
+from wallet_yield import get_wallet_yield_cached_async
+
+
+async def _run_one(index: int, item) -> dict:
+    if not isinstance(item, dict) or not item.get("wallet") or not item.get("chain"):
+        return {"index": index, "error": "❌ Each entry needs 'wallet' and 'chain'."}
+
+    line = {"index": index, "wallet": item["wallet"], "chain": item["chain"]}
+
+    try:
+        line["chain"] = chain = str(item["chain"]).lower()
+        # Shares cached results, and in-flight lookups, with /wallet-yield/ and the pre-warmer
+        result = await get_wallet_yield_cached_async(item["wallet"], chain)
+    except Exception as e:
+        line["error"] = f"❌ Internal error fetching yield: {str(e)}"
+        return line
+
+    if "error" in result:
+        line["error"] = result["error"]
+    else:
+        line["output"] = result
+    return line
+
+
+async def stream_wallet_yields(items, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Run a batch of (wallet, chain) lookups and yield NDJSON lines as each finishes.
+
+    At most `concurrency` lookups run at once, and explorer calls are held
+    to each API key's rate budget by utils/rate_limit. Results leave as soon
+    as they are ready and at most `concurrency` of them are buffered, so the
+    output batch is never held in memory as a whole.
+
+    Args:
+        items: Iterable of {'wallet': ..., 'chain': ...} dicts, consumed lazily.
+        concurrency (int): Maximum lookups in flight, capped at BATCH_MAX_CONCURRENCY.
+
+    Yields:
+        str: One JSON document per entry, newline terminated, in completion order.
+    """
+    concurrency = max(1, min(int(concurrency), BATCH_MAX_CONCURRENCY))
+    # Workers share one iterator; next() never awaits, so no lock is needed
+    source = enumerate(items)
+    results = asyncio.Queue(maxsize=concurrency)
+    done = object()
+
+    async def _worker():
+        for index, item in source:
+            await results.put(await _run_one(index, item))
+
+    async def _supervise():
+        try:
+            await asyncio.gather(*(_worker() for _ in range(concurrency)))
+        except Exception as e:
+            await results.put({"error": f"❌ Batch aborted: {str(e)}"})
+        await results.put(done)
+
+    supervisor = asyncio.create_task(_supervise())
+    try:
+        while True:
+            line = await results.get()
+            if line is done:
+                break
+            yield json.dumps(line) + "\n"
+    finally:
+        # Client went away or the batch finished: stop any remaining lookups
+        supervisor.cancel()
@@ -9,6 +9,200 @@ ARBISCAN_API_KEY = os.getenv("ARBISCAN_API_KEY")
 BASESCAN_API_KEY = os.getenv("BASESCAN_API_KEY")
 OPTIMISMSCAN_API_KEY = os.getenv("OPTIMISMSCAN_API_KEY")
 HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
+HELIUS_API_URL = os.getenv("HELIUS_API_URL", "https://api.helius.xyz")
+HELIUS_RPC_URL = os.getenv("HELIUS_RPC_URL", "https://mainnet.helius-rpc.com")
+
+# Solana mint metadata (symbol, decimals) never changes, so it is kept until evicted;
+# mints Helius cannot resolve are retried after SOLANA_UNKNOWN_MINT_TTL seconds
+SOLANA_METADATA_CACHE_MAX = int(os.getenv("SOLANA_METADATA_CACHE_MAX", "100000"))
+SOLANA_UNKNOWN_MINT_TTL = int(os.getenv("SOLANA_UNKNOWN_MINT_TTL", "3600"))
+
+# DeFiLlama pool snapshot (seconds before a cached snapshot is considered stale)
+DEFILLAMA_POOLS_URL = os.getenv("DEFILLAMA_POOLS_URL", "https://yields.llama.fi/pools")
+DEFILLAMA_POOLS_TTL = int(os.getenv("DEFILLAMA_POOLS_TTL", "300"))
+# Memory-mapped copy of the last pool snapshot, shared by workers and used for warm starts (empty disables it)
+POOL_SNAPSHOT_PATH = os.getenv("POOL_SNAPSHOT_PATH", "pool_snapshot.bin")
+
+# Host-wide cache shared by every worker (SQLite file; empty keeps caches per process). serve.py enables it
+# by default. Holds prices and /wallet-yield/ results (unless RESULT_CACHE_URL points at Redis) and the lease
+# that lets one worker at a time download /pools while the others adopt its POOL_SNAPSHOT_PATH file.
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+POOL_DOWNLOAD_LEASE = float(os.getenv("POOL_DOWNLOAD_LEASE", "60"))
+
+# Shared async HTTP client (keep-alive pool used by every explorer integration)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Multi-chain fan-out (per-chain budget before a chain is reported as failed)
+MULTI_CHAIN_TIMEOUT = float(os.getenv("MULTI_CHAIN_TIMEOUT", "15"))
+
+# Batch endpoint (wallets in flight at once)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "100"))
+
+# Default calls per second per explorer API key, and retries when an explorer answers "rate limit reached".
+# Any *_API_KEY may hold a comma-separated pool of keys to spread load across.
+EXPLORER_RATE_LIMIT = float(os.getenv("EXPLORER_RATE_LIMIT", "5"))
+EXPLORER_MAX_RETRIES = int(os.getenv("EXPLORER_MAX_RETRIES", "4"))
+EXPLORER_BACKOFF_BASE = float(os.getenv("EXPLORER_BACKOFF_BASE", "0.5"))
+EXPLORER_BACKOFF_MAX = float(os.getenv("EXPLORER_BACKOFF_MAX", "30"))
+
+# Etherscan-family explorers, one entry per EVM chain. Adding a chain is just a new entry.
+# 'price_chain' is the chain prefix used by the DeFiLlama coins API; 'rpc_url' is the JSON-RPC node
+# used by the "rpc" balance mode.
+EVM_EXPLORERS = {
+    "ethereum": {
+        "label": "Etherscan",
+        "api_url": os.getenv("ETHERSCAN_API_URL", "https://api.etherscan.io/api"),
+        "api_key_env": "ETHERSCAN_API_KEY",
+        "page_size": 10000,
+        "rate_limit": EXPLORER_RATE_LIMIT,
+        "price_chain": "ethereum",
+        "rpc_url": os.getenv("ETHEREUM_RPC_URL", "https://ethereum-rpc.publicnode.com"),
+        "native_symbol": "ETH",
+    },
+    "avalanche": {
+        "label": "Snowtrace",
+        "api_url": os.getenv("SNOWTRACE_API_URL", "https://api.snowtrace.io/api"),
+        "api_key_env": "SNOWTRACE_API_KEY",
+        "page_size": 10000,
+        "rate_limit": EXPLORER_RATE_LIMIT,
+        "price_chain": "avax",
+        "rpc_url": os.getenv("AVALANCHE_RPC_URL", "https://api.avax.network/ext/bc/C/rpc"),
+        "native_symbol": "AVAX",
+    },
+    "arbitrum": {
+        "label": "Arbiscan",
+        "api_url": os.getenv("ARBISCAN_API_URL", "https://api.arbiscan.io/api"),
+        "api_key_env": "ARBISCAN_API_KEY",
+        "page_size": 10000,
+        "rate_limit": EXPLORER_RATE_LIMIT,
+        "price_chain": "arbitrum",
+        "rpc_url": os.getenv("ARBITRUM_RPC_URL", "https://arb1.arbitrum.io/rpc"),
+        "native_symbol": "ETH",
+    },
+    "optimism": {
+        "label": "OptimismScan",
+        "api_url": os.getenv("OPTIMISMSCAN_API_URL", "https://api-optimistic.etherscan.io/api"),
+        "api_key_env": "OPTIMISMSCAN_API_KEY",
+        "page_size": 10000,
+        "rate_limit": EXPLORER_RATE_LIMIT,
+        "price_chain": "optimism",
+        "rpc_url": os.getenv("OPTIMISM_RPC_URL", "https://mainnet.optimism.io"),
+        "native_symbol": "ETH",
+    },
+    "base": {
+        "label": "Basescan",
+        "api_url": os.getenv("BASESCAN_API_URL", "https://api.basescan.org/api"),
+        "api_key_env": "BASESCAN_API_KEY",
+        "page_size": 10000,
+        "rate_limit": EXPLORER_RATE_LIMIT,
+        "price_chain": "base",
+        "rpc_url": os.getenv("BASE_RPC_URL", "https://mainnet.base.org"),
+        "native_symbol": "ETH",
+    },
+}
+
+# How EVM balances are computed. "ledger" sums tokentx history; "rpc" still walks new transfers to learn
+# which token contracts a wallet touched, then reads current balanceOf for each plus the native balance
+# from the chain's JSON-RPC node, RPC_BATCH_SIZE calls per batched request. Correct for rebasing and
+# fee-on-transfer tokens; falls back to the ledger figures if the node is unreachable.
+EVM_BALANCE_MODE = os.getenv("EVM_BALANCE_MODE", "ledger").lower()
+RPC_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+
+# Risk-adjusted pool ranking. Pools below the TVL floor, in excluded protocols (comma-separated DeFiLlama
+# project slugs) or failing the enabled flags are never suggested. Eligible pools are scored as
+#   min(apy, RANKING_APY_CAP) - RANKING_SIGMA_WEIGHT * sigma + RANKING_TVL_WEIGHT * log10(tvl)
+# and the top RANKING_TOP_N per held token are returned as alternatives.
+RANKING_MIN_TVL = float(os.getenv("RANKING_MIN_TVL", "1000000"))
+RANKING_STABLECOIN_ONLY = os.getenv("RANKING_STABLECOIN_ONLY", "false").lower() in ("1", "true", "yes")
+RANKING_EXCLUDE_IL_RISK = os.getenv("RANKING_EXCLUDE_IL_RISK", "false").lower() in ("1", "true", "yes")
+RANKING_EXCLUDE_OUTLIERS = os.getenv("RANKING_EXCLUDE_OUTLIERS", "true").lower() in ("1", "true", "yes")
+RANKING_EXCLUDED_PROTOCOLS = [p.strip() for p in os.getenv("RANKING_EXCLUDED_PROTOCOLS", "").split(",") if p.strip()]
+RANKING_APY_CAP = float(os.getenv("RANKING_APY_CAP", "100"))
+RANKING_SIGMA_WEIGHT = float(os.getenv("RANKING_SIGMA_WEIGHT", "1"))
+RANKING_TVL_WEIGHT = float(os.getenv("RANKING_TVL_WEIGHT", "0.5"))
+RANKING_TOP_N = int(os.getenv("RANKING_TOP_N", "3"))
+
+# Token prices (DeFiLlama coins API; point PRICE_API_URL at a local stub for tests)
+PRICE_API_URL = os.getenv("PRICE_API_URL", "https://coins.llama.fi/prices/current")
+PRICE_CACHE_TTL = int(os.getenv("PRICE_CACHE_TTL", "60"))
+PRICE_CACHE_MAX = int(os.getenv("PRICE_CACHE_MAX", "50000"))
+
+# /wallet-yield/ result cache. Entries live RESULT_CACHE_TTL seconds; after RESULT_CACHE_RECHECK seconds
+# a hit first asks the explorer for transfers newer than the cached block, and in rpc balance mode the
+# node for the native balance (0 disables the check).
+# Set RESULT_CACHE_URL to a redis:// URL to share the cache between workers (needs the redis package).
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "60"))
+RESULT_CACHE_MAX = int(os.getenv("RESULT_CACHE_MAX", "10000"))
+RESULT_CACHE_RECHECK = float(os.getenv("RESULT_CACHE_RECHECK", "10"))
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL", "")
+
+# Watchlist pre-warming. Watched (wallet, chain) results are recomputed about every PREWARM_INTERVAL
+# seconds (+/- PREWARM_JITTER as a fraction), most-requested first, using at most PREWARM_RATE_SHARE of
+# each explorer's rate budget. Entries not requested for PREWARM_IDLE_TTL seconds are dropped.
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "45"))
+PREWARM_JITTER = float(os.getenv("PREWARM_JITTER", "0.2"))
+PREWARM_TICK = float(os.getenv("PREWARM_TICK", "1"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "10"))
+PREWARM_RATE_SHARE = float(os.getenv("PREWARM_RATE_SHARE", "0.5"))
+PREWARM_IDLE_TTL = float(os.getenv("PREWARM_IDLE_TTL", "86400"))
+PREWARM_HIT_HALF_LIFE = float(os.getenv("PREWARM_HIT_HALF_LIFE", "3600"))
+PREWARM_MAX_ENTRIES = int(os.getenv("PREWARM_MAX_ENTRIES", "10000"))
+
+# What-if reallocation simulator. Each move pays SIMULATOR_GAS_USD for its chain (<CHAIN>_GAS_USD overrides),
+# plus SIMULATOR_SWAP_FEE_BPS and a constant-product price impact when the target pool does not take the
+# asset as is. A deposit dilutes the target's APY by the TVL it adds and may be at most SIMULATOR_MAX_TVL_SHARE
+# of that TVL. One-off costs are spread over SIMULATOR_HORIZON_DAYS. The SIMULATOR_CANDIDATES best-scored
+# pools on the chain are tried with each of SIMULATOR_FRACTIONS of every position.
+SIMULATOR_GAS_USD = {
+    chain: float(os.getenv(f"{chain.upper()}_GAS_USD", default))
+    for chain, default in {
+        "ethereum": "15", "avalanche": "0.5", "arbitrum": "0.3", "optimism": "0.2", "base": "0.1", "solana": "0.01"
+    }.items()
+}
+SIMULATOR_SWAP_FEE_BPS = float(os.getenv("SIMULATOR_SWAP_FEE_BPS", "30"))
+SIMULATOR_MAX_TVL_SHARE = float(os.getenv("SIMULATOR_MAX_TVL_SHARE", "0.1"))
+SIMULATOR_HORIZON_DAYS = float(os.getenv("SIMULATOR_HORIZON_DAYS", "365"))
+SIMULATOR_CANDIDATES = int(os.getenv("SIMULATOR_CANDIDATES", "256"))
+SIMULATOR_FRACTIONS = [float(f) for f in os.getenv("SIMULATOR_FRACTIONS", "0.25,0.5,0.75,1").split(",") if f.strip()]
+SIMULATOR_CACHE_TTL = int(os.getenv("SIMULATOR_CACHE_TTL", "600"))
+SIMULATOR_CACHE_MAX = int(os.getenv("SIMULATOR_CACHE_MAX", "2000"))
+
+# APY alerts. A subscriber hears about a pool behind one of their positions when its APY moves
+# ALERT_APY_CHANGE percentage points from the last value alerted on (or crosses their own thresholds).
+# Webhooks get ALERT_WEBHOOK_TIMEOUT seconds and ALERT_WEBHOOK_RETRIES retries, at most
+# ALERT_WEBHOOK_CONCURRENCY in flight; each SSE stream buffers ALERT_STREAM_BUFFER alerts and sends a
+# keepalive every ALERT_STREAM_KEEPALIVE seconds. Webhook hosts must resolve to public addresses unless
+# listed in ALERT_WEBHOOK_ALLOWED_HOSTS (comma-separated), e.g. for an internal alert relay.
+ALERT_APY_CHANGE = float(os.getenv("ALERT_APY_CHANGE", "1"))
+ALERT_MAX_SUBSCRIPTIONS = int(os.getenv("ALERT_MAX_SUBSCRIPTIONS", "10000"))
+ALERT_WEBHOOK_TIMEOUT = float(os.getenv("ALERT_WEBHOOK_TIMEOUT", "5"))
+ALERT_WEBHOOK_RETRIES = int(os.getenv("ALERT_WEBHOOK_RETRIES", "3"))
+ALERT_WEBHOOK_CONCURRENCY = int(os.getenv("ALERT_WEBHOOK_CONCURRENCY", "20"))
+ALERT_STREAM_BUFFER = int(os.getenv("ALERT_STREAM_BUFFER", "100"))
+ALERT_STREAM_KEEPALIVE = float(os.getenv("ALERT_STREAM_KEEPALIVE", "15"))
+ALERT_WEBHOOK_ALLOWED_HOSTS = [
+    h.strip().lower() for h in os.getenv("ALERT_WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()
+]
+
+# APY history: one pool snapshot sample per APY_HISTORY_INTERVAL seconds is appended to a per-day log
+# under APY_HISTORY_DIR (empty disables it) and compacted into a segment file once the day is over;
+# days older than APY_HISTORY_DAYS are removed
+APY_HISTORY_DIR = os.getenv("APY_HISTORY_DIR", "apy_history")
+APY_HISTORY_INTERVAL = float(os.getenv("APY_HISTORY_INTERVAL", "3600"))
+APY_HISTORY_DAYS = int(os.getenv("APY_HISTORY_DAYS", "180"))
+
+# Per-request stage timings as a Server-Timing header: always when true, otherwise only for
+# requests that send "X-Server-Timing: 1"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+# Natural-language parser (recent inputs remembered so repeated queries skip parsing)
+NLP_CACHE_SIZE = int(os.getenv("NLP_CACHE_SIZE", "1024"))
+
+# Incremental balance ledger (SQLite file; set to an empty string to always replay full history)
+LEDGER_PATH = os.getenv("LEDGER_PATH", "ledger.sqlite3")
 
 
 REQUIRED_KEYS = {
@@ -20,6 +214,11 @@ REQUIRED_KEYS = {
     "HELIUS_API_KEY": HELIUS_API_KEY,
 }
 
-missing = [key for key, value in REQUIRED_KEYS.items() if not value]
-if missing:
-    print(f"⚠️ Warning: Missing API keys for {', '.join(missing)}")
\ No newline at end of file
+
+def warn_missing_keys():
+    """
+    Print a warning for unset explorer API keys. Called once at startup rather than on import.
+    """
+    missing = [key for key, value in REQUIRED_KEYS.items() if not value]
+    if missing:
+        print(f"⚠️ Warning: Missing API keys for {', '.join(missing)}")
\ No newline at end of file
@@ -0,0 +1,99 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+from utils.config import HTTP_MAX_CONNECTIONS, HTTP_MAX_CONNECTIONS_PER_HOST, HTTP_TIMEOUT
+
+_client = None
+_client_loop = None
+_host_slots = {}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide keep-alive client for the running event loop.
+
+    Connections are tied to the loop that opened them, so a new client is
+    created if the loop changes (e.g. between test clients).
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+        _client_loop = loop
+        _host_slots.clear()
+
+    return _client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+    return slot
+
+
+async def async_get(url: str, params: dict = None, timeout: float = None) -> httpx.Response:
+    """
+    GET through the shared client, capped at HTTP_MAX_CONNECTIONS_PER_HOST per host.
+
+    Args:
+        url (str): Request URL.
+        params (dict, optional): Query parameters.
+        timeout (float, optional): Overrides HTTP_TIMEOUT for this call.
+
+    Returns:
+        httpx.Response: The response (status is not checked).
+    """
+    client = get_async_client()
+    async with _host_slot(url):
+        return await client.get(url, params=params, timeout=timeout or HTTP_TIMEOUT)
+
+
+async def async_post(url: str, json: dict = None, params: dict = None, timeout: float = None,
+                     headers: dict = None, extensions: dict = None) -> httpx.Response:
+    """
+    POST a JSON body through the shared client, with the same per-host cap as async_get.
+
+    Returns:
+        httpx.Response: The response (status is not checked).
+    """
+    client = get_async_client()
+    async with _host_slot(url):
+        return await client.post(
+            url, json=json, params=params, timeout=timeout or HTTP_TIMEOUT, headers=headers, extensions=extensions
+        )
+
+
+async def async_stream(url: str, params: dict = None, timeout: float = None, chunk_size: int = 65536):
+    """
+    Stream a GET response body through the shared client, chunk by chunk.
+
+    Raises for a non-2xx status before the first chunk.
+
+    Yields:
+        bytes: Body chunks (already decompressed).
+    """
+    client = get_async_client()
+    async with _host_slot(url):
+        async with client.stream("GET", url, params=params, timeout=timeout or HTTP_TIMEOUT) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+
+async def close_async_client():
+    global _client
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _host_slots.clear()
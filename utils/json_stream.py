@@ -0,0 +1,93 @@
+import codecs
+import json
+
+_WHITESPACE = " \t\r\n"
+
+# An element still undecodable after this many characters is malformed, not just incomplete
+MAX_ELEMENT_CHARS = 4_000_000
+
+
+class JsonArrayStream:
+    """
+    Incrementally decode the objects of one top-level array, e.g. "data" in
+    {"status": "success", "data": [{...}, {...}]}, from body chunks.
+
+    Only the undecoded tail (at most one partial object) is buffered, so the
+    full body never exists as one string or object graph.
+
+    The key is located by its first occurrence as "key": in the body, which
+    is fine for payloads whose earlier fields are simple scalars.
+    """
+
+    def __init__(self, key: str):
+        self.marker = json.dumps(key)
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.state = "seek"  # seek -> items -> done
+        self.items_seen = 0
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        Add a chunk of the body.
+
+        Returns:
+            list: Array elements completed by this chunk.
+        """
+        if self.state == "done":
+            return []
+        self.buffer += self.utf8.decode(chunk)
+        return self._drain()
+
+    def close(self):
+        """
+        Raise if the body ended before the array did.
+        """
+        self.buffer += self.utf8.decode(b"", final=True)
+        if self.state != "done":
+            raise ValueError(f"JSON body ended before the {self.marker} array was complete")
+
+    def _drain(self) -> list:
+        items = []
+        buffer = self.buffer
+        pos = 0
+
+        if self.state == "seek":
+            found = buffer.find(self.marker)
+            if found < 0:
+                # Keep enough of the tail to match a marker split across chunks
+                self.buffer = buffer[-len(self.marker):]
+                return items
+            pos = found + len(self.marker)
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE + ":":
+                pos += 1
+            if pos >= len(buffer):
+                self.buffer = buffer[found:]
+                return items
+            if buffer[pos] != "[":
+                raise ValueError(f"{self.marker} is not an array")
+            pos += 1
+            self.state = "items"
+
+        end = len(buffer)
+        while True:
+            while pos < end and buffer[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos >= end:
+                break
+            if buffer[pos] == "]":
+                self.state = "done"
+                pos = end
+                break
+            try:
+                item, pos = self.decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if end - pos > MAX_ELEMENT_CHARS:
+                    raise
+                # The element continues in the next chunk
+                break
+            items.append(item)
+
+        self.buffer = buffer[pos:]
+        self.items_seen += len(items)
+        return items
@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+
+from utils.config import LEDGER_PATH
+
+_conn = None
+_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (
+    chain TEXT NOT NULL,
+    wallet TEXT NOT NULL,
+    last_block INTEGER NOT NULL,
+    PRIMARY KEY (chain, wallet)
+);
+CREATE TABLE IF NOT EXISTS balances (
+    chain TEXT NOT NULL,
+    wallet TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    decimals INTEGER NOT NULL,
+    raw_balance TEXT NOT NULL,  -- uint256 does not fit SQLite INTEGER
+    PRIMARY KEY (chain, wallet, contract)
+);
+"""
+
+
+def _connection():
+    global _conn
+
+    if _conn is None:
+        _conn = sqlite3.connect(LEDGER_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(_SCHEMA)
+    return _conn
+
+
+def get_last_block(chain: str, wallet: str):
+    """
+    Returns:
+        int | None: Last block folded into the wallet's ledger, or None if unseen (or the ledger is off).
+    """
+    if not LEDGER_PATH:
+        return None
+
+    with _lock:
+        row = _connection().execute(
+            "SELECT last_block FROM wallets WHERE chain = ? AND wallet = ?",
+            (chain, wallet.lower())
+        ).fetchone()
+    return row[0] if row else None
+
+
+def fold_transfers(transfers: list, wallet: str, deltas: dict):
+    """
+    Fold tokentx rows into signed per-contract balance deltas, in place.
+
+    Args:
+        transfers (list): tokentx rows (one page is enough).
+        wallet (str): Wallet the deltas are relative to.
+        deltas (dict): contract -> {'symbol', 'decimals', 'balance'}; updated in place.
+
+    Returns:
+        int | None: Highest block among the folded rows.
+    """
+    wallet_lower = wallet.lower()
+    last_block = None
+
+    for tx in transfers:
+        try:
+            block = int(tx.get('blockNumber') or 0)
+            contract = (tx.get('contractAddress') or '').lower()
+            value = int(tx.get('value') or 0)
+
+            entry = deltas.setdefault(contract, {
+                'symbol': tx.get('tokenSymbol') or 'UNKNOWN',
+                'decimals': int(tx.get('tokenDecimal') or 18),
+                'balance': 0
+            })
+
+            if (tx.get('to') or '').lower() == wallet_lower:
+                entry['balance'] += value
+            if (tx.get('from') or '').lower() == wallet_lower:
+                entry['balance'] -= value
+
+            last_block = block if last_block is None else max(last_block, block)
+        except Exception as e:
+            print(f"⚠️ Error processing transaction: {e}")
+            continue
+
+    return last_block
+
+
+def record_transfers(chain: str, wallet: str, since_block, last_block, deltas: dict) -> dict:
+    """
+    Apply deltas to the stored balances and return the wallet's full balances.
+
+    The update is compare-and-set on since_block: if a concurrent request
+    already advanced the ledger past it, these deltas are discarded rather
+    than counted twice.
+
+    Args:
+        chain (str): Chain name.
+        wallet (str): Wallet address.
+        since_block (int | None): Ledger position the deltas were fetched from.
+        last_block (int | None): Highest block covered by the deltas.
+        deltas (dict): contract -> {'symbol', 'decimals', 'balance'} (raw units).
+
+    Returns:
+        dict: contract -> {'symbol', 'decimals', 'balance'} (raw units).
+    """
+    if not LEDGER_PATH:
+        return deltas
+
+    wallet = wallet.lower()
+    with _lock:
+        conn = _connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT last_block FROM wallets WHERE chain = ? AND wallet = ?", (chain, wallet)
+            ).fetchone()
+            current_block = row[0] if row else None
+
+            if current_block == since_block and last_block is not None:
+                stored = {
+                    contract: int(raw)
+                    for contract, raw in conn.execute(
+                        "SELECT contract, raw_balance FROM balances WHERE chain = ? AND wallet = ?",
+                        (chain, wallet)
+                    )
+                }
+                conn.executemany(
+                    "INSERT OR REPLACE INTO balances VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (chain, wallet, contract, d['symbol'], d['decimals'],
+                         str(stored.get(contract, 0) + d['balance']))
+                        for contract, d in deltas.items()
+                    ]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO wallets VALUES (?, ?, ?)", (chain, wallet, last_block)
+                )
+
+            balances = {
+                contract: {'symbol': symbol, 'decimals': decimals, 'balance': int(raw)}
+                for contract, symbol, decimals, raw in conn.execute(
+                    "SELECT contract, symbol, decimals, raw_balance FROM balances WHERE chain = ? AND wallet = ?",
+                    (chain, wallet)
+                )
+            }
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return balances
+
+
+def balances_to_tokens(balances: dict) -> list:
+    """
+    Convert raw per-contract balances into the fetcher result format, dropping empty ones.
+    """
+    result = []
+    for contract, data in balances.items():
+        balance = data['balance'] / (10 ** data['decimals'])
+        if balance > 0:
+            result.append({
+                "symbol": data['symbol'],
+                "contract_address": contract,
+                "amount": balance,
+                "price_usd": 1.0  # ✅ Placeholder, replaced by protocols.prices
+            })
+
+    return result
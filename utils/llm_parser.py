@@ -1,36 +1,151 @@
+import asyncio
+import json
 import re
+from functools import lru_cache
+
+from utils.config import NLP_CACHE_SIZE
+
+# Alias -> canonical chain name. Matched as whole words, so "database" is not "base".
+CHAIN_ALIASES = {
+    "ethereum": "ethereum", "eth": "ethereum",
+    "avalanche": "avalanche", "avax": "avalanche",
+    "arbitrum": "arbitrum", "arb": "arbitrum",
+    "optimism": "optimism", "op": "optimism",
+    "base": "base",
+    "solana": "solana", "sol": "solana",
+}
+
+# One pass over the input finds wallets and chains together. Base58 excludes 0, O, I and l.
+_TOKEN_RE = re.compile(
+    r"\b(?P<evm>0x[a-fA-F0-9]{40})\b"
+    r"|\b(?P<solana>[1-9A-HJ-NP-Za-km-z]{32,44})\b"
+    r"|(?i:\b(?P<all>all|every|each)\s+chains?\b)"
+    r"|(?i:\b(?P<chain>" + "|".join(sorted(CHAIN_ALIASES, key=len, reverse=True)) + r")\b)"
+)
+
+_ADDRESS_RE = re.compile(r"0x[a-fA-F0-9]{40}|[1-9A-HJ-NP-Za-km-z]{32,44}")
+
+_LLM_PROMPT = (
+    "Extract blockchain wallet addresses and chain names from the user's request. "
+    "Reply with JSON only: {\"wallets\": [...], \"chains\": [...]}. "
+    f"Chains must be from {sorted(set(CHAIN_ALIASES.values()))} or 'all'."
+)
+
+
+@lru_cache(maxsize=NLP_CACHE_SIZE)
+def _fast_parse(user_input: str):
+    wallets, chains = [], []
+
+    for match in _TOKEN_RE.finditer(user_input):
+        if match.group("evm"):
+            wallet = match.group("evm").lower()
+        elif match.group("solana"):
+            wallet = match.group("solana")  # Base58 is case-sensitive
+        else:
+            chain = "all" if match.group("all") else CHAIN_ALIASES[match.group("chain").lower()]
+            if chain not in chains:
+                chains.append(chain)
+            continue
+
+        if wallet not in wallets:
+            wallets.append(wallet)
+
+    # ✅ A Solana address on its own is enough to know the chain
+    if wallets and not chains and all(not w.startswith("0x") for w in wallets):
+        chains.append("solana")
+
+    return tuple(wallets), tuple(chains)
+
+
+def _llm_parse(user_input: str, openai_api_key: str, model: str):
+    from openai import OpenAI  # Only imported when the fast path could not parse the input
+
+    client = OpenAI(api_key=openai_api_key)
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": _LLM_PROMPT},
+            {"role": "user", "content": user_input}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0
+    )
+    parsed = json.loads(response.choices[0].message.content or "{}")
+
+    # Re-validate so the model cannot invent chains or malformed addresses
+    wallets = [
+        w.lower() if w.startswith("0x") else w
+        for w in (w.strip() for w in parsed.get("wallets") or [] if isinstance(w, str))
+        if _ADDRESS_RE.fullmatch(w)
+    ]
+    chains = [
+        "all" if c.lower() == "all" else CHAIN_ALIASES[c.lower()]
+        for c in parsed.get("chains") or []
+        if isinstance(c, str) and (c.lower() == "all" or c.lower() in CHAIN_ALIASES)
+    ]
+    return wallets, chains
+
 
 def parse_nlp_to_payload(user_input: str, openai_api_key: str = None, model: str = "gpt-4o") -> dict:
     """
     Parses natural language input like
-    "Check yield for wallet 0xabc... on Ethereum"
-    into {'wallet': ..., 'chain': ...}
+    "Check yield for wallet 0xabc... on Ethereum and arb"
+    into {'wallet': ..., 'chain': ..., 'wallets': [...], 'chains': [...]}
+
+    Recent inputs are answered from an LRU. The LLM is only asked when the
+    regex pass finds no wallet or no chain, and only if a key is given.
 
     Args:
         user_input (str): Natural language input.
-        openai_api_key (str): OpenAI key (not used in this regex-based parser).
-        model (str): Model name (not used in this regex-based parser).
+        openai_api_key (str): OpenAI key for the fallback parser.
+        model (str): Model name for the fallback parser.
 
     Returns:
-        dict: Extracted wallet and chain.
+        dict: First wallet and chain, plus every wallet and chain mentioned.
+    """
+    wallets, chains = _fast_parse(user_input.strip())
+    wallets, chains = list(wallets), list(chains)
+
+    if (not wallets or not chains) and openai_api_key:
+        try:
+            llm_wallets, llm_chains = _llm_parse(user_input, openai_api_key, model)
+            wallets = wallets or llm_wallets
+            chains = chains or llm_chains
+        except Exception as e:
+            print(f"⚠️ LLM fallback parsing failed: {e}")
+
+    return _payload(wallets, chains)
+
+
+async def parse_nlp_to_payload_async(user_input: str, openai_api_key: str = None, model: str = "gpt-4o") -> dict:
+    """
+    Async variant of parse_nlp_to_payload. The regex/LRU fast path runs inline;
+    the blocking LLM fallback runs in a worker thread so the event loop keeps serving.
     """
-    user_input = user_input.lower()
+    wallets, chains = _fast_parse(user_input.strip())
+    wallets, chains = list(wallets), list(chains)
+
+    if (not wallets or not chains) and openai_api_key:
+        try:
+            llm_wallets, llm_chains = await asyncio.to_thread(_llm_parse, user_input, openai_api_key, model)
+            wallets = wallets or llm_wallets
+            chains = chains or llm_chains
+        except Exception as e:
+            print(f"⚠️ LLM fallback parsing failed: {e}")
 
-    # ✅ Find wallet (starts with 0x... for EVM)
-    wallet_match = re.search(r"0x[a-fA-F0-9]{40}", user_input)
-    wallet = wallet_match.group(0) if wallet_match else None
+    return _payload(wallets, chains)
 
-    # ✅ Find chain name
-    chains = ["ethereum", "avalanche", "arbitrum", "optimism", "base", "solana"]
-    chain = next((c for c in chains if c in user_input), None)
 
-    if not wallet:
+def _payload(wallets: list, chains: list) -> dict:
+    if not wallets:
         raise ValueError("❌ Wallet address not found in input.")
 
-    if not chain:
+    if not chains:
         raise ValueError("❌ Chain not found in input.")
 
     return {
-        "wallet": wallet,
-        "chain": chain,
-    }
\ No newline at end of file
+        "wallet": wallets[0],
+        "chain": chains[0],
+        "wallets": wallets,
+        "chains": chains,
+    }
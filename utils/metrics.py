@@ -0,0 +1,197 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; wide enough for a cached hit and a full multi-page history walk
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = [(key, (list(e[0]), e[1], e[2])) for key, e in self.values.items()]
+        for key, (counts, count, total) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, _INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+        return lines
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram(
+    "yield_stage_duration_seconds", "Time spent per pipeline stage.", ("stage", "chain")
+)
+UPSTREAM_SECONDS = Histogram(
+    "yield_upstream_request_duration_seconds", "Latency of calls to upstream APIs.", ("upstream",)
+)
+UPSTREAM_REQUESTS = Counter(
+    "yield_upstream_requests_total", "Calls to upstream APIs by outcome (ok, error, rate_limited).",
+    ("upstream", "outcome")
+)
+CACHE_REQUESTS = Counter(
+    "yield_cache_requests_total", "Cache lookups by cache and result (hit, miss, coalesced, revalidated, invalidated).", ("cache", "result")
+)
+HTTP_REQUESTS = Counter(
+    "yield_http_requests_total", "HTTP requests served.", ("path", "status")
+)
+HTTP_SECONDS = Histogram(
+    "yield_http_request_duration_seconds", "HTTP request latency.", ("path",)
+)
+HTTP_IN_FLIGHT = Gauge(
+    "yield_http_requests_in_flight", "HTTP requests currently being served.", ("path",)
+)
+POOL_SNAPSHOT_VERSION = Gauge(
+    "yield_pool_snapshot_version", "Version of the installed DeFiLlama pool snapshot."
+)
+POOL_SNAPSHOT_POOLS = Gauge(
+    "yield_pool_snapshot_pools", "Pools in the installed DeFiLlama pool snapshot."
+)
+PREWARM_REFRESHES = Counter(
+    "yield_prewarm_refreshes_total", "Watchlist refreshes by outcome (ok, error, deferred).", ("chain", "outcome")
+)
+PREWARM_WATCHED = Gauge(
+    "yield_prewarm_watched", "(wallet, chain) pairs on the watchlist."
+)
+ALERTS_SENT = Counter(
+    "yield_alerts_sent_total", "APY alerts by channel (webhook, stream) and outcome (ok, error, rejected, dropped).",
+    ("channel", "outcome")
+)
+ALERT_SUBSCRIPTIONS = Gauge(
+    "yield_alert_subscriptions", "Active APY alert subscriptions."
+)
+
+# Per-request stage totals, only set while a Server-Timing breakdown was asked for
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timing() -> dict:
+    """
+    Collect stage timings for the current request (and tasks it spawns) into the returned dict.
+    """
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(stage: str, chain: str = ""):
+    """
+    Time a block as one pipeline stage. Works around awaits as well as plain code.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, chain=chain)
+        timings = _request_timings.get()
+        if timings is not None:
+            key = f"{stage}-{chain}" if chain else stage
+            timings[key] = timings.get(key, 0.0) + elapsed
+
+
+def record_upstream(upstream: str, outcome: str, seconds: float = None):
+    UPSTREAM_REQUESTS.inc(upstream=upstream, outcome=outcome)
+    if seconds is not None:
+        UPSTREAM_SECONDS.observe(seconds, upstream=upstream)
+
+
+def server_timing_header(timings: dict) -> str:
+    """
+    Format stage totals as a Server-Timing header value (durations in ms).
+    """
+    return ", ".join(f"{key};dur={seconds * 1000:.1f}" for key, seconds in timings.items())
+
+
+def render_metrics() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
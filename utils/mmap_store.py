@@ -0,0 +1,97 @@
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+# File layout: MAGIC | header length (uint64 LE) | JSON header | arrays, each 64-byte aligned
+MAGIC = b"YOMMAP01"
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_arrays(path: str, arrays: dict, meta: dict):
+    """
+    Write named arrays plus JSON metadata to one file, atomically.
+
+    The file is written next to `path` and renamed over it, so readers that
+    already mapped the old file keep a consistent view.
+
+    Args:
+        path (str): Destination file.
+        arrays (dict): Name -> np.ndarray (1-D, fixed-width dtype).
+        meta (dict): JSON-serializable metadata stored in the header.
+    """
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    # Offsets depend on the header length, which depends on the offsets: iterate until it settles
+    data_start = _aligned(len(MAGIC) + 8)
+    while True:
+        offset = data_start
+        layout = {}
+        for name, a in arrays.items():
+            layout[name] = {"dtype": a.dtype.str, "length": int(a.shape[0]), "offset": offset}
+            offset = _aligned(offset + a.nbytes)
+        header = json.dumps({"meta": meta, "arrays": layout}).encode()
+        needed = _aligned(len(MAGIC) + 8 + len(header))
+        if needed <= data_start:
+            header += b" " * (data_start - len(MAGIC) - 8 - len(header))
+            break
+        data_start = needed
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, a in arrays.items():
+                f.seek(layout[name]["offset"])
+                f.write(a.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_meta(path: str) -> dict:
+    """
+    Read only the metadata, without mapping any array.
+    """
+    return _read_header(path)["meta"]
+
+
+def _read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an array store file")
+        (length,) = struct.unpack("<Q", f.read(8))
+        return json.loads(f.read(length))
+
+
+def read_arrays(path: str):
+    """
+    Map every array in the file read-only.
+
+    Pages come from the OS page cache, so processes mapping the same file
+    share one copy of the data.
+
+    Returns:
+        tuple: (name -> read-only np.ndarray, meta dict)
+    """
+    header = _read_header(path)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        if spec["length"] == 0:
+            arrays[name] = np.zeros(0, dtype=np.dtype(spec["dtype"]))
+            continue
+        arrays[name] = np.memmap(
+            path, dtype=np.dtype(spec["dtype"]), mode="r", offset=spec["offset"], shape=(spec["length"],)
+        )
+    return arrays, header["meta"]
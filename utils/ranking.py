@@ -0,0 +1,141 @@
+import numpy as np
+
+from utils.config import (
+    RANKING_MIN_TVL, RANKING_STABLECOIN_ONLY, RANKING_EXCLUDE_IL_RISK, RANKING_EXCLUDE_OUTLIERS,
+    RANKING_EXCLUDED_PROTOCOLS, RANKING_APY_CAP, RANKING_SIGMA_WEIGHT, RANKING_TVL_WEIGHT, RANKING_TOP_N
+)
+
+
+class RankingProfile:
+    """
+    Filters and weights for ranking pools. Defaults come from the RANKING_* settings.
+
+    Args:
+        min_tvl (float): Pools with less TVL (USD) are never suggested.
+        stablecoin_only (bool): Only suggest pools DeFiLlama flags as stablecoin pools.
+        exclude_il_risk (bool): Skip pools flagged with impermanent-loss risk.
+        exclude_outliers (bool): Skip pools DeFiLlama flags as APY outliers.
+        excluded_protocols (list): DeFiLlama project slugs to skip.
+        apy_cap (float): APY (%) counted at most this much, so one absurd APY cannot win on its own.
+        sigma_weight (float): Score penalty per unit of APY volatility (DeFiLlama's sigma).
+        tvl_weight (float): Score bonus per order of magnitude of TVL.
+        top_n (int): Alternatives returned per token.
+    """
+
+    def __init__(self, min_tvl: float = RANKING_MIN_TVL, stablecoin_only: bool = RANKING_STABLECOIN_ONLY,
+                 exclude_il_risk: bool = RANKING_EXCLUDE_IL_RISK, exclude_outliers: bool = RANKING_EXCLUDE_OUTLIERS,
+                 excluded_protocols: list = RANKING_EXCLUDED_PROTOCOLS, apy_cap: float = RANKING_APY_CAP,
+                 sigma_weight: float = RANKING_SIGMA_WEIGHT, tvl_weight: float = RANKING_TVL_WEIGHT,
+                 top_n: int = RANKING_TOP_N):
+        self.min_tvl = float(min_tvl)
+        self.stablecoin_only = bool(stablecoin_only)
+        self.exclude_il_risk = bool(exclude_il_risk)
+        self.exclude_outliers = bool(exclude_outliers)
+        self.excluded_protocols = tuple(sorted(set(excluded_protocols)))
+        self.apy_cap = float(apy_cap)
+        self.sigma_weight = float(sigma_weight)
+        self.tvl_weight = float(tvl_weight)
+        self.top_n = max(1, int(top_n))
+
+    @property
+    def key(self) -> tuple:
+        return (
+            self.min_tvl, self.stablecoin_only, self.exclude_il_risk, self.exclude_outliers,
+            self.excluded_protocols, self.apy_cap, self.sigma_weight, self.tvl_weight, self.top_n
+        )
+
+
+DEFAULT_PROFILE = RankingProfile()
+
+
+class PoolRanking:
+    """
+    Eligible pools of one snapshot, grouped by (chain, token) and sorted by risk-adjusted score.
+
+    Built once per snapshot and profile, so a lookup is a slice of a precomputed
+    array rather than a filter and sort per request.
+
+    Args:
+        snapshot (PoolSnapshot): Snapshot to rank; its (chain, token) groups are reused.
+        profile (RankingProfile): Filters and weights.
+    """
+
+    def __init__(self, snapshot, profile: RankingProfile):
+        self.snapshot = snapshot
+        self.profile = profile
+
+        eligible = snapshot.tvl >= profile.min_tvl
+        if profile.stablecoin_only:
+            eligible &= snapshot.stablecoin
+        if profile.exclude_il_risk:
+            eligible &= ~snapshot.il_risk
+        if profile.exclude_outliers:
+            eligible &= ~snapshot.outlier
+        excluded = [snapshot.protocol_lookup[p] for p in profile.excluded_protocols if p in snapshot.protocol_lookup]
+        if excluded:
+            eligible &= ~np.isin(snapshot.protocol_ids, excluded)
+
+        self.score = (
+            np.minimum(snapshot.apy, profile.apy_cap)
+            - profile.sigma_weight * snapshot.sigma
+            + profile.tvl_weight * np.log10(np.maximum(snapshot.tvl, 1.0))
+        )
+
+        # Re-sort every (chain, token) group of the snapshot index by score and drop ineligible rows
+        rows = snapshot.index_rows
+        group_count = len(snapshot.group_starts)
+        groups = np.repeat(np.arange(group_count), snapshot.group_ends - snapshot.group_starts)
+        order = np.lexsort((-self.score[rows], groups))
+        order = order[eligible[rows[order]]]
+
+        self.rows = rows[order].astype(np.int32)
+        ranked_groups = groups[order]
+        self.group_starts = np.searchsorted(ranked_groups, np.arange(group_count), side="left").astype(np.int32)
+        self.group_ends = np.searchsorted(ranked_groups, np.arange(group_count), side="right").astype(np.int32)
+
+        # Best row per group, with a trailing -1 so a missing group (-1) maps to "no pool"
+        has_pool = self.group_starts < self.group_ends
+        best = self.rows[np.minimum(self.group_starts, max(len(self.rows) - 1, 0))] if len(self.rows) else self.group_starts
+        self.group_best = np.append(np.where(has_pool, best, -1), -1).astype(np.int64)
+
+    def _groups(self, chain: str, symbols: list) -> np.ndarray:
+        chain_id = self.snapshot.chain_lookup.get(chain.lower())
+        if chain_id is None:
+            return np.full(len(symbols), -1, dtype=np.int64)
+        return np.array([self.snapshot._group(chain_id, s) for s in symbols], dtype=np.int64)
+
+    def best_rows(self, chain: str, symbols: list) -> np.ndarray:
+        """
+        Best-scored row per symbol, or -1 when no eligible pool holds it.
+        """
+        return self.group_best[self._groups(chain, symbols)]
+
+    def top_rows(self, chain: str, symbols: list, top_n: int = None) -> list:
+        """
+        Up to top_n eligible rows per symbol, best score first.
+
+        Returns:
+            list: One np.ndarray of rows per symbol (empty when nothing qualifies).
+        """
+        top_n = top_n or self.profile.top_n
+        ranked = []
+        for group in self._groups(chain, symbols).tolist():
+            if group < 0:
+                ranked.append(self.rows[:0])
+                continue
+            start, end = int(self.group_starts[group]), int(self.group_ends[group])
+            ranked.append(self.rows[start:min(end, start + top_n)])
+        return ranked
+
+    def pool(self, row: int) -> dict:
+        """
+        Pool dict for a ranked row, with its score and flags.
+        """
+        pool = self.snapshot.pool(row)
+        pool.update({
+            "score": round(float(self.score[row]), 4),
+            "sigma": float(self.snapshot.sigma[row]),
+            "stablecoin": bool(self.snapshot.stablecoin[row]),
+            "il_risk": bool(self.snapshot.il_risk[row]),
+        })
+        return pool
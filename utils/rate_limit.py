@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+
+from utils.config import EXPLORER_BACKOFF_BASE, EXPLORER_BACKOFF_MAX
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens may go negative: each reservation queues
+    behind the previous ones, so callers wait their turn instead of failing.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a reservation made now could go ahead."""
+        with self.lock:
+            self._refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def penalize(self, seconds: float):
+        """Hold back every caller on this bucket for at least `seconds`."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def split_api_keys(value) -> list:
+    """
+    Accept one key, a comma-separated pool of keys, or a list. An empty value means one anonymous key.
+    """
+    if isinstance(value, (list, tuple)):
+        keys = [k for k in value if k]
+    else:
+        keys = [k.strip() for k in (value or "").split(",") if k.strip()]
+    return keys or [None]
+
+
+def get_bucket(api_key: str, rate: float, label: str = "Explorer") -> TokenBucket:
+    """
+    Return the process-wide bucket for an API key (anonymous calls share one per explorer).
+    """
+    name = api_key or f"anonymous:{label}"
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = _buckets[name] = TokenBucket(rate)
+    return bucket
+
+
+def choose_api_key(api_keys: list, rate: float, label: str = "Explorer"):
+    """
+    Pick the key from a pool whose bucket frees up soonest.
+
+    Returns:
+        tuple: (api_key, TokenBucket)
+    """
+    candidates = [(key, get_bucket(key, rate, label)) for key in api_keys]
+    return min(candidates, key=lambda kb: kb[1].wait_time())
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given retry attempt (0-based)."""
+    delay = min(EXPLORER_BACKOFF_MAX, EXPLORER_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.5)
+
+
+def is_rate_limited(response_json: dict) -> bool:
+    """
+    Etherscan-style APIs report throttling as HTTP 200 with status '0', e.g.
+    {"status": "0", "message": "NOTOK", "result": "Max rate limit reached"}.
+    """
+    if not isinstance(response_json, dict) or response_json.get("status") == "1":
+        return False
+    text = f"{response_json.get('message', '')} {response_json.get('result', '')}".lower()
+    return "rate limit" in text
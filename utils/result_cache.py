@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from utils.config import RESULT_CACHE_TTL, RESULT_CACHE_MAX, RESULT_CACHE_RECHECK, RESULT_CACHE_URL
+from utils.metrics import CACHE_REQUESTS
+from utils import shared_cache
+
+
+class MemoryBackend:
+    """
+    In-process LRU store. Entries past their expiry are dropped on read.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: dict):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+
+
+class RedisBackend:
+    """
+    Shared store for several workers. Entries are JSON and expire through Redis itself.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # Optional dependency, only needed when RESULT_CACHE_URL is set
+
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str):
+        raw = await self.client.get(key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, entry: dict):
+        ttl = max(1, int(entry["expires_at"] - time.time()))
+        await self.client.set(key, json.dumps(entry), ex=ttl)
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+
+class SharedBackend:
+    """
+    Store shared by every worker on one host, in the SHARED_CACHE_PATH SQLite file (see utils/shared_cache).
+    SQLite calls block, so they run in a worker thread.
+    """
+
+    def __init__(self, namespace: str = "results"):
+        self.namespace = namespace
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(shared_cache.get, self.namespace, key)
+
+    async def set(self, key: str, entry: dict):
+        await asyncio.to_thread(shared_cache.set_many, self.namespace, {key: entry}, entry["expires_at"])
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(shared_cache.delete, self.namespace, key)
+
+
+class ResultCache:
+    """
+    TTL cache with request coalescing and optional early invalidation.
+
+    Identical concurrent misses share one computation. Once an entry is
+    older than `recheck` seconds, the next hit first calls `still_valid`
+    with the entry's stamp (e.g. the last block it reflects) and recomputes
+    if that says the entry is out of date. Entries stored by refresh() with
+    `trusted_for` skip that check until the window ends, since whoever
+    refreshes them ahead of demand will do so again by then.
+    """
+
+    def __init__(self, backend, ttl: float = RESULT_CACHE_TTL, recheck: float = RESULT_CACHE_RECHECK,
+                 name: str = "results"):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.recheck = recheck
+        self._inflight = {}
+
+    async def get_or_compute(self, key: str, compute, still_valid=None):
+        """
+        Args:
+            key (str): Cache key.
+            compute (callable): Async, returns (value, stamp). Values with an 'error' key are not stored.
+            still_valid (callable, optional): Async, stamp -> bool. Skipped when the stamp is None.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        entry = await self.backend.get(key)
+        if entry is not None and not self._needs_check(entry, still_valid):
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return entry["value"]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            CACHE_REQUESTS.inc(cache=self.name, result="coalesced")
+        else:
+            task = asyncio.ensure_future(self._load(key, entry, compute, still_valid))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key) if self._inflight.get(key) is t else None)
+
+        # A caller that goes away must not cancel the computation others are waiting on
+        return await asyncio.shield(task)
+
+    def _needs_check(self, entry: dict, still_valid) -> bool:
+        if still_valid is None or entry["stamp"] is None or self.recheck <= 0:
+            return False
+        now = time.time()
+        if now < entry.get("trusted_until", 0):
+            return False
+        return now - entry["checked_at"] >= self.recheck
+
+    async def _load(self, key: str, entry, compute, still_valid, trusted_for: float = 0):
+        if entry is not None:
+            try:
+                valid = await still_valid(entry["stamp"])
+            except Exception as e:
+                print(f"⚠️ Cache revalidation failed, serving cached result: {e}")
+                valid = True
+
+            if valid:
+                CACHE_REQUESTS.inc(cache=self.name, result="revalidated")
+                entry["checked_at"] = time.time()
+                await self.backend.set(key, entry)
+                return entry["value"]
+
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if entry is None else "invalidated")
+        value, stamp = await compute()
+        if isinstance(value, dict) and "error" in value:
+            await self.backend.delete(key)
+            return value
+
+        now = time.time()
+        await self.backend.set(key, {
+            "value": value,
+            "stamp": stamp,
+            "checked_at": now,
+            "trusted_until": now + trusted_for,
+            "expires_at": now + self.ttl
+        })
+        return value
+
+    async def refresh(self, key: str, compute, trusted_for: float = 0):
+        """
+        Recompute and store a value now, e.g. ahead of demand. Shares an in-flight computation if there is one.
+
+        Args:
+            trusted_for (float, optional): Seconds during which hits skip revalidation, e.g. until the next
+                scheduled refresh.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, None, compute, None, trusted_for))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key) if self._inflight.get(key) is t else None)
+        return await asyncio.shield(task)
+
+    async def invalidate(self, key: str):
+        await self.backend.delete(key)
+
+
+_cache = None
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Return the process-wide cache, backed by Redis when RESULT_CACHE_URL is set, else by the host-wide
+    shared cache when SHARED_CACHE_PATH is set.
+    """
+    global _cache
+
+    if _cache is None:
+        backend = None
+        if RESULT_CACHE_URL:
+            try:
+                backend = RedisBackend(RESULT_CACHE_URL)
+            except ImportError:
+                print("⚠️ RESULT_CACHE_URL is set but the redis package is not installed, using the in-memory cache")
+        if backend is None and shared_cache.enabled():
+            backend = SharedBackend()
+        _cache = ResultCache(backend or MemoryBackend(), name="wallet_yield")
+
+    return _cache
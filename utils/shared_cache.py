@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.config import SHARED_CACHE_PATH
+
+_conn = None
+_lock = threading.Lock()
+_last_purge = 0.0
+
+# Expired rows are swept at most this often, by whichever worker writes first
+_PURGE_INTERVAL = 60
+
+# Host parameters per query, below SQLite's limit
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,  -- JSON
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def enabled() -> bool:
+    return bool(SHARED_CACHE_PATH)
+
+
+def _connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(SHARED_CACHE_PATH, timeout=5, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(_SCHEMA)
+    return _conn
+
+
+def get_many(namespace: str, keys: list) -> dict:
+    """
+    Unexpired entries for some keys.
+
+    Returns:
+        dict: key -> (value, expires_at) for every key found.
+    """
+    now = time.time()
+    found = {}
+    with _lock:
+        conn = _connection()
+        for i in range(0, len(keys), _CHUNK):
+            batch = keys[i:i + _CHUNK]
+            rows = conn.execute(
+                f"SELECT key, value, expires_at FROM entries "
+                f"WHERE namespace = ? AND expires_at > ? AND key IN ({','.join('?' * len(batch))})",
+                (namespace, now, *batch)
+            ).fetchall()
+            for key, value, expires_at in rows:
+                found[key] = (json.loads(value), expires_at)
+    return found
+
+
+def get(namespace: str, key: str):
+    """
+    Returns:
+        The unexpired value for a key, or None.
+    """
+    entry = get_many(namespace, [key]).get(key)
+    return entry[0] if entry else None
+
+
+def set_many(namespace: str, items: dict, expires_at: float):
+    """
+    Store JSON-serializable values until `expires_at` (Unix time), in one transaction.
+    """
+    global _last_purge
+
+    rows = [(namespace, key, json.dumps(value), expires_at) for key, value in items.items()]
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+            if now - _last_purge >= _PURGE_INTERVAL:
+                conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                _last_purge = now
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def delete(namespace: str, key: str):
+    with _lock:
+        _connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+def acquire_lease(name: str, ttl: float) -> bool:
+    """
+    Take a host-wide lease, e.g. so only one worker downloads something at a time.
+
+    A lease this process already holds is renewed; one held by another
+    process is only taken over once it has expired.
+
+    Returns:
+        bool: True if this process holds the lease now.
+    """
+    now = time.time()
+    owner = os.getpid()
+    with _lock:
+        conn = _connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)", (name, owner, now + ttl))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return True
+
+
+def release_lease(name: str):
+    with _lock:
+        _connection().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, os.getpid()))
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+
+import numpy as np
+
+from utils.config import (
+    SIMULATOR_GAS_USD, SIMULATOR_SWAP_FEE_BPS, SIMULATOR_MAX_TVL_SHARE, SIMULATOR_CANDIDATES,
+    SIMULATOR_FRACTIONS, SIMULATOR_HORIZON_DAYS, SIMULATOR_CACHE_TTL, SIMULATOR_CACHE_MAX
+)
+from utils.metrics import timed
+from utils.result_cache import ResultCache, MemoryBackend
+
+
+class SimulationParams:
+    """
+    Cost model for a reallocation. Defaults come from the SIMULATOR_* settings.
+
+    Args:
+        gas_usd (float): Cost of one move (withdraw, swap, deposit) in USD.
+        swap_fee_bps (float): Swap fee charged when the target pool does not hold the asset.
+        max_tvl_share (float): Largest deposit as a fraction of the target pool's TVL.
+        horizon_days (float): Period one-off costs are spread over.
+        fractions (list): Shares of a position that may be moved.
+        candidates (int): Best-scored eligible pools on the chain considered per position.
+    """
+
+    def __init__(self, gas_usd: float, swap_fee_bps: float = SIMULATOR_SWAP_FEE_BPS,
+                 max_tvl_share: float = SIMULATOR_MAX_TVL_SHARE, horizon_days: float = SIMULATOR_HORIZON_DAYS,
+                 fractions: list = SIMULATOR_FRACTIONS, candidates: int = SIMULATOR_CANDIDATES):
+        self.gas_usd = max(0.0, float(gas_usd))
+        self.swap_fee_bps = max(0.0, float(swap_fee_bps))
+        self.max_tvl_share = min(max(float(max_tvl_share), 0.0), 1.0)
+        self.horizon_days = max(1.0, float(horizon_days))
+        self.fractions = tuple(sorted({min(max(float(f), 0.0), 1.0) for f in fractions} - {0.0})) or (1.0,)
+        self.candidates = max(1, int(candidates))
+
+    @classmethod
+    def for_chain(cls, chain: str, **overrides):
+        """
+        Parameters for a chain, with its default gas cost; overrides that are None are ignored.
+        """
+        overrides = {k: v for k, v in overrides.items() if v is not None}
+        overrides.setdefault("gas_usd", SIMULATOR_GAS_USD.get(chain, 0.0))
+        return cls(**overrides)
+
+    def as_dict(self) -> dict:
+        return {
+            "gas_usd": self.gas_usd,
+            "swap_fee_bps": self.swap_fee_bps,
+            "max_tvl_share": self.max_tvl_share,
+            "horizon_days": self.horizon_days,
+            "fractions": list(self.fractions),
+            "candidates": self.candidates,
+        }
+
+
+def _candidate_rows(ranking, chain: str, limit: int) -> np.ndarray:
+    """
+    Best-scored eligible rows on a chain, each pool once.
+    """
+    snapshot = ranking.snapshot
+    chain_id = snapshot.chain_lookup.get(chain.lower())
+    if chain_id is None or not len(ranking.rows):
+        return np.zeros(0, dtype=np.int64)
+
+    rows = np.unique(ranking.rows[snapshot.chain_ids[ranking.rows] == chain_id]).astype(np.int64)
+    order = np.argsort(-ranking.score[rows], kind="stable")
+    return rows[order[:limit]]
+
+
+def _holds_asset(ranking, chain: str, symbols: list, candidates: np.ndarray) -> np.ndarray:
+    """
+    [positions, candidates] mask of pools that take the asset as is, i.e. need no swap.
+    """
+    holds = np.zeros((len(symbols), len(candidates)), dtype=bool)
+    for i, group in enumerate(ranking._groups(chain, symbols).tolist()):
+        if group >= 0:
+            rows = ranking.rows[ranking.group_starts[group]:ranking.group_ends[group]]
+            holds[i] = np.isin(candidates, rows)
+    return holds
+
+
+def _evaluate(values, current_apy, apy, tvl, used_tvl, holds, excluded, params: SimulationParams) -> tuple:
+    """
+    Yearly yield delta (USD) of every (position, candidate, fraction) scenario.
+
+    The moved amount stops earning its current APY and earns the target's APY
+    diluted by the TVL it adds. Gas, the swap fee and a constant-product price
+    impact (amount / (tvl + amount)) are paid once and spread over the horizon.
+    Scenarios over the pool's capacity, or into the pool a position already
+    uses, are -inf.
+
+    Args:
+        values, current_apy (np.ndarray): [N] position values (USD) and current APYs (%).
+        apy, tvl, used_tvl (np.ndarray): [M] candidate APYs, TVLs and TVL already planned into them.
+        holds, excluded (np.ndarray): [N, M] masks.
+        params (SimulationParams): Cost model.
+
+    Returns:
+        tuple: (delta [N, M, F], costs [N, M, F], effective APY [N, M, F]).
+    """
+    moved = values[:, None, None] * np.asarray(params.fractions)[None, None, :]
+    pool_tvl = (tvl + used_tvl)[None, :, None]
+    effective_apy = apy[None, :, None] * pool_tvl / (pool_tvl + moved)
+
+    swap = ~holds[:, :, None]
+    slippage = np.where(swap, moved * (params.swap_fee_bps / 10000 + moved / (pool_tvl + moved)), 0.0)
+    costs = params.gas_usd + slippage
+
+    gain = moved * (effective_apy - current_apy[:, None, None]) / 100
+    delta = gain - costs * 365 / params.horizon_days
+
+    over_capacity = used_tvl[None, :, None] + moved > params.max_tvl_share * tvl[None, :, None]
+    delta = np.where(over_capacity | excluded[:, :, None], -np.inf, delta)
+    return delta, costs, effective_apy
+
+
+def simulate_reallocation(positions: list, chain: str, snapshot, params: SimulationParams) -> dict:
+    """
+    Search reallocations of a wallet's positions into the chain's best-scored pools.
+
+    Every (position, candidate pool, fraction moved) scenario is evaluated in
+    one batch. The plan then takes positions in order of their best scenario
+    and re-evaluates each against the TVL already planned into every pool,
+    so two moves cannot overfill or double-count the same pool.
+
+    Args:
+        positions (list): Positions from get_wallet_yield ('asset', 'value_usd', 'apy', 'best_protocol', 'alternatives').
+        chain (str): Chain the positions are on.
+        snapshot (PoolSnapshot): Pool snapshot to search.
+        params (SimulationParams): Cost model.
+
+    Returns:
+        dict: Ranked moves with their yearly yield deltas, and portfolio totals.
+    """
+    ranking = snapshot.ranking()
+    candidates = _candidate_rows(ranking, chain, params.candidates)
+    symbols = [p["asset"] for p in positions]
+    values = np.array([p["value_usd"] for p in positions], dtype=np.float64)
+    current_apy = np.array([p["apy"] for p in positions], dtype=np.float64)
+    current_yearly = float((values * current_apy / 100).sum())
+
+    with timed("simulate", chain):
+        apy = snapshot.apy[candidates]
+        tvl = snapshot.tvl[candidates]
+        used_tvl = np.zeros(len(candidates))
+        holds = _holds_asset(ranking, chain, symbols, candidates)
+
+        # A position's own best pool is where it already is
+        candidate_ids = [snapshot.pools[i] for i in snapshot.pool_ids[candidates].tolist()]
+        current_pools = [(p.get("alternatives") or [{}])[0].get("pool") for p in positions]
+        excluded = np.array([[pool_id == current for pool_id in candidate_ids] for current in current_pools],
+                            dtype=bool).reshape(len(positions), len(candidates))
+
+        delta, _, _ = _evaluate(values, current_apy, apy, tvl, used_tvl, holds, excluded, params)
+        scenarios = int(delta.size)
+        best = delta.max(axis=(1, 2), initial=-np.inf)
+
+        plan = []
+        for i in np.argsort(-best, kind="stable").tolist():
+            if not best[i] > 0:
+                break
+            d, costs, effective = _evaluate(
+                values[i:i + 1], current_apy[i:i + 1], apy, tvl, used_tvl, holds[i:i + 1], excluded[i:i + 1], params
+            )
+            j, f = np.unravel_index(int(np.argmax(d[0])), d[0].shape)
+            if not d[0, j, f] > 0:
+                continue
+
+            moved = float(values[i] * params.fractions[f])
+            used_tvl[j] += moved
+            yearly_delta = float(d[0, j, f])
+            cost = float(costs[0, j, f])
+            plan.append({
+                "asset": positions[i]["asset"],
+                "from_protocol": positions[i].get("best_protocol"),
+                "from_apy": float(current_apy[i]),
+                "move_usd": moved,
+                "fraction": params.fractions[f],
+                "to": ranking.pool(int(candidates[j])),
+                "swap": bool(not holds[i, j]),
+                "effective_apy": float(effective[0, j, f]),
+                "gas_usd": params.gas_usd,
+                "slippage_usd": cost - params.gas_usd,
+                "yearly_yield_delta_usd": yearly_delta,
+                "payback_days": cost / ((yearly_delta + cost * 365 / params.horizon_days) / 365),
+            })
+
+    plan.sort(key=lambda move: move["yearly_yield_delta_usd"], reverse=True)
+    total_delta = sum(move["yearly_yield_delta_usd"] for move in plan)
+    return {
+        "chain": chain,
+        "snapshot_version": snapshot.version,
+        "params": params.as_dict(),
+        "scenarios_evaluated": scenarios,
+        "candidate_pools": int(len(candidates)),
+        "current_yearly_yield_usd": current_yearly,
+        "planned_yearly_yield_usd": current_yearly + total_delta,
+        "yearly_yield_delta_usd": total_delta,
+        "plan": plan,
+    }
+
+
+def positions_hash(positions: list) -> str:
+    """
+    Stable digest of what a simulation depends on in the positions: asset, value, APY and current pool.
+    """
+    digest = [
+        (p["asset"], round(float(p["value_usd"]), 2), round(float(p["apy"]), 6),
+         (p.get("alternatives") or [{}])[0].get("pool"))
+        for p in positions
+    ]
+    return hashlib.sha256(json.dumps(digest, sort_keys=True).encode()).hexdigest()[:32]
+
+
+_cache = ResultCache(MemoryBackend(SIMULATOR_CACHE_MAX), ttl=SIMULATOR_CACHE_TTL, name="simulator")
+
+
+async def simulate_reallocation_cached(positions: list, chain: str, snapshot, params: SimulationParams) -> dict:
+    """
+    simulate_reallocation behind a cache keyed by (positions hash, snapshot version, parameters).
+
+    A new pool snapshot changes the key, so plans never outlive the pool data they were computed from.
+    """
+    params_hash = hashlib.sha256(json.dumps(params.as_dict(), sort_keys=True).encode()).hexdigest()[:16]
+    key = f"simulate:{chain}:{snapshot.version}:{positions_hash(positions)}:{params_hash}"
+
+    async def _compute():
+        return await asyncio.to_thread(simulate_reallocation, positions, chain, snapshot, params), None
+
+    return await _cache.get_or_compute(key, _compute)
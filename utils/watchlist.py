@@ -0,0 +1,227 @@
+import asyncio
+import math
+import random
+import threading
+import time
+
+from utils.config import (
+    PREWARM_INTERVAL, PREWARM_JITTER, PREWARM_TICK, PREWARM_CONCURRENCY, PREWARM_RATE_SHARE,
+    PREWARM_IDLE_TTL, PREWARM_HIT_HALF_LIFE, PREWARM_MAX_ENTRIES, EVM_EXPLORERS, EXPLORER_RATE_LIMIT
+)
+from utils.metrics import PREWARM_REFRESHES, PREWARM_WATCHED
+
+
+def _watch_key(wallet: str, chain: str) -> tuple:
+    # EVM addresses are case-insensitive; Solana addresses are not
+    return (wallet.lower() if wallet.lower().startswith("0x") else wallet, chain.lower())
+
+
+def _jittered(interval: float) -> float:
+    return interval * random.uniform(1 - PREWARM_JITTER, 1 + PREWARM_JITTER)
+
+
+class Watchlist:
+    """
+    (wallet, chain) pairs whose results are kept warm, with a decayed request count per pair.
+
+    Requests for a watched pair bump its count, which halves every
+    PREWARM_HIT_HALF_LIFE seconds; the scheduler refreshes busier pairs first.
+    """
+
+    def __init__(self, max_entries: int = PREWARM_MAX_ENTRIES, idle_ttl: float = PREWARM_IDLE_TTL):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def watch(self, wallet: str, chain: str) -> bool:
+        """
+        Add a pair. Its first refresh is spread over the first part of an interval.
+
+        Returns:
+            bool: False if the watchlist is full.
+        """
+        key = _watch_key(wallet, chain)
+        now = time.time()
+        with self.lock:
+            if key not in self.entries:
+                if len(self.entries) >= self.max_entries:
+                    return False
+                self.entries[key] = {
+                    "wallet": wallet,
+                    "chain": key[1],
+                    "hits": 0.0,
+                    "hits_at": now,
+                    "last_requested": now,
+                    "last_refreshed": None,
+                    "next_due": now + random.uniform(0, PREWARM_INTERVAL * PREWARM_JITTER),
+                    "refreshing": False,
+                }
+            PREWARM_WATCHED.set(len(self.entries))
+        return True
+
+    def unwatch(self, wallet: str, chain: str) -> bool:
+        with self.lock:
+            removed = self.entries.pop(_watch_key(wallet, chain), None) is not None
+            PREWARM_WATCHED.set(len(self.entries))
+        return removed
+
+    def _decayed_hits(self, entry: dict, now: float) -> float:
+        return entry["hits"] * math.pow(0.5, (now - entry["hits_at"]) / PREWARM_HIT_HALF_LIFE)
+
+    def record_hit(self, wallet: str, chain: str):
+        """
+        Count a request for a pair; unwatched pairs are ignored.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(_watch_key(wallet, chain))
+            if entry is None:
+                return
+            entry["hits"] = self._decayed_hits(entry, now) + 1
+            entry["hits_at"] = now
+            entry["last_requested"] = now
+
+    def expire(self) -> int:
+        """
+        Drop pairs nobody has requested for idle_ttl seconds.
+        """
+        cutoff = time.time() - self.idle_ttl
+        with self.lock:
+            idle = [key for key, entry in self.entries.items() if entry["last_requested"] < cutoff]
+            for key in idle:
+                del self.entries[key]
+            PREWARM_WATCHED.set(len(self.entries))
+        return len(idle)
+
+    def due(self) -> list:
+        """
+        Pairs whose refresh is due and not already running, most requested first.
+        """
+        now = time.time()
+        with self.lock:
+            due = [e for e in self.entries.values() if e["next_due"] <= now and not e["refreshing"]]
+            due.sort(key=lambda e: self._decayed_hits(e, now), reverse=True)
+        return due
+
+    def snapshot(self) -> list:
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "wallet": e["wallet"],
+                    "chain": e["chain"],
+                    "requests": round(self._decayed_hits(e, now), 2),
+                    "last_requested": e["last_requested"],
+                    "last_refreshed": e["last_refreshed"],
+                    "next_due": e["next_due"],
+                }
+                for e in self.entries.values()
+            ]
+
+
+class PrewarmScheduler:
+    """
+    Background task that keeps watched results fresh in the result cache.
+
+    Every PREWARM_TICK seconds it starts refreshes for due pairs, busiest
+    first, with at most PREWARM_CONCURRENCY in flight. Each EVM chain gets
+    PREWARM_RATE_SHARE of its explorer's rate budget per tick, and a chain
+    whose API keys are already queued behind live traffic is skipped until
+    the next tick. Refreshes are rescheduled with jitter so pairs added
+    together do not stay in lockstep.
+
+    Args:
+        watchlist (Watchlist): Pairs to keep warm.
+        refresh (callable): Async, (wallet, chain) -> result; recomputes and stores one pair.
+        wait_time (callable, optional): chain -> seconds until its explorer has budget. EVM chains only.
+    """
+
+    def __init__(self, watchlist: Watchlist, refresh, wait_time=None):
+        self.watchlist = watchlist
+        self.refresh = refresh
+        self.wait_time = wait_time
+        self.tasks = set()
+        self.runner = None
+
+    def _chain_budget(self, chain: str) -> int:
+        explorer = EVM_EXPLORERS.get(chain)
+        if explorer is None:
+            return PREWARM_CONCURRENCY
+        rate = explorer.get("rate_limit", EXPLORER_RATE_LIMIT)
+        return max(1, int(rate * PREWARM_RATE_SHARE * PREWARM_TICK))
+
+    def tick(self) -> int:
+        """
+        Start refreshes for the pairs that are due now.
+
+        Returns:
+            int: Refreshes started.
+        """
+        self.watchlist.expire()
+        budgets = {}
+        started = 0
+
+        for entry in self.watchlist.due():
+            if len(self.tasks) >= PREWARM_CONCURRENCY:
+                break
+
+            chain = entry["chain"]
+            if chain not in budgets:
+                busy = self.wait_time is not None and chain in EVM_EXPLORERS and self.wait_time(chain) > 0
+                budgets[chain] = 0 if busy else self._chain_budget(chain)
+            if budgets[chain] <= 0:
+                PREWARM_REFRESHES.inc(chain=chain, outcome="deferred")
+                continue
+
+            budgets[chain] -= 1
+            entry["refreshing"] = True
+            task = asyncio.ensure_future(self._refresh_one(entry))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            started += 1
+
+        return started
+
+    async def _refresh_one(self, entry: dict):
+        try:
+            result = await self.refresh(entry["wallet"], entry["chain"])
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+        except Exception as e:
+            print(f"⚠️ Pre-warm failed for {entry['wallet']} on {entry['chain']}: {e}")
+            outcome = "error"
+
+        PREWARM_REFRESHES.inc(chain=entry["chain"], outcome=outcome)
+        now = time.time()
+        if outcome == "ok":
+            entry["last_refreshed"] = now
+        entry["next_due"] = now + _jittered(PREWARM_INTERVAL)
+        entry["refreshing"] = False
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(PREWARM_TICK)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Pre-warm tick failed: {e}")
+
+    def start(self):
+        if self.runner is None or self.runner.done():
+            self.runner = asyncio.ensure_future(self.run())
+        return self.runner
+
+    async def stop(self):
+        for task in [self.runner, *self.tasks]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in [self.runner, *self.tasks] if t is not None), return_exceptions=True)
+        self.runner = None
+
+
+_watchlist = Watchlist()
+
+
+def get_watchlist() -> Watchlist:
+    """Process-wide watchlist."""
+    return _watchlist
@@ -1,60 +1,74 @@
+import asyncio
+import importlib
 import os
+import sys
 
-from protocols.defillama import fetch_defillama_yields
-from protocols.etherscan import get_token_balances as eth_balances
-from protocols.snowtrace import get_avalanche_balances
-from protocols.arbiscan import get_arbitrum_balances
-from protocols.basescan import get_base_balances
-from protocols.optimismscan import get_optimism_balances
-from protocols.solscan import get_solana_balances
+import numpy as np
 
+from protocols.defillama import get_pool_snapshot, get_pool_snapshot_async
+from protocols.prices import price_tokens, price_tokens_async
+from utils.config import EVM_EXPLORERS, MULTI_CHAIN_TIMEOUT, PREWARM_INTERVAL, PREWARM_JITTER
+from utils.result_cache import get_result_cache
+from utils.watchlist import get_watchlist
+from utils.alerts import get_alert_hub
+from utils.metrics import timed
 
-def get_wallet_yield(wallet: str, chain: str):
-    chain = chain.lower()
+EVM_CHAINS = list(EVM_EXPLORERS)
+SUPPORTED_CHAINS = EVM_CHAINS + ["solana"]
 
-    if chain == "ethereum":
-        balances = eth_balances(wallet, os.getenv("ETHERSCAN_API_KEY"))
-    elif chain == "avalanche":
-        balances = get_avalanche_balances(wallet, os.getenv("SNOWTRACE_API_KEY"))
-    elif chain == "arbitrum":
-        balances = get_arbitrum_balances(wallet, os.getenv("ARBISCAN_API_KEY"))
-    elif chain == "base":
-        balances = get_base_balances(wallet, os.getenv("BASESCAN_API_KEY"))
-    elif chain == "optimism":
-        balances = get_optimism_balances(wallet, os.getenv("OPTIMISMSCAN_API_KEY"))
-    elif chain == "solana":
-        balances = get_solana_balances(wallet, os.getenv("HELIUS_API_KEY"))
-    else:
-        return {"error": f"❌ Unsupported chain '{chain}'"}
+# Protocol clients are imported on first use, so a worker only loads the integrations it actually serves
+_CHAIN_CLIENTS = {**{chain: "protocols.evm_explorer" for chain in EVM_CHAINS}, "solana": "protocols.solscan"}
 
-    if not balances:
-        return {"error": "❌ No assets found for wallet"}
 
-    yield_data = fetch_defillama_yields(chain)
+def _client(chain: str):
+    return importlib.import_module(_CHAIN_CLIENTS[chain])
 
-    positions = []
-    total_value = 0
 
-    for token in balances:
-        symbol = token['symbol']
-        amount = token['amount']
-        price = token['price_usd']
-        token_value = amount * price
+def loaded_clients() -> list:
+    """
+    Chains whose protocol client this worker has imported so far.
+    """
+    return [chain for chain, module in _CHAIN_CLIENTS.items() if module in sys.modules]
+
 
-        # Find best APY
-        yields = [y for y in yield_data if y['symbol'].lower() == symbol.lower()]
-        best_yield = max(yields, key=lambda x: x.get('apy', 0), default=None)
+def explorer_wait_time(chain: str) -> float:
+    """
+    Seconds until an EVM chain's explorer has rate budget again (see protocols.evm_explorer).
+    """
+    return _client(chain).explorer_wait_time(chain)
 
-        apy = best_yield['apy'] if best_yield else 0
+
+def _build_wallet_yield(wallet: str, chain: str, balances: list, snapshot):
+    # Best risk-adjusted pool and top-N alternatives per token, sliced from the snapshot's precomputed ranking
+    symbols = [token['symbol'] for token in balances]
+    if snapshot is not None:
+        ranking = snapshot.ranking()
+        rows = ranking.best_rows(chain, symbols)
+        found = rows >= 0
+        apys = np.where(found, snapshot.apy[rows], 0.0).tolist() if len(snapshot) else [0.0] * len(balances)
+        protocol_ids = snapshot.protocol_ids[rows].tolist() if len(snapshot) else rows.tolist()
+        found = found.tolist()
+        alternatives = [[ranking.pool(row) for row in top.tolist()] for top in ranking.top_rows(chain, symbols)]
+    else:
+        apys = [0.0] * len(balances)
+        protocol_ids = found = [False] * len(balances)
+        alternatives = [[] for _ in balances]
+
+    positions = []
+    total_value = 0
+
+    for token, apy, has_pool, protocol_id, top in zip(balances, apys, found, protocol_ids, alternatives):
+        token_value = token['amount'] * token['price_usd']
         yearly_yield = token_value * (apy / 100)
 
         positions.append({
-            "asset": symbol,
-            "amount": amount,
+            "asset": token['symbol'],
+            "amount": token['amount'],
             "value_usd": token_value,
             "apy": apy,
-            "best_protocol": best_yield['protocol'] if best_yield else "N/A",
-            "estimated_yield_per_year_usd": yearly_yield
+            "best_protocol": snapshot.protocols[protocol_id] if has_pool else "N/A",
+            "estimated_yield_per_year_usd": yearly_yield,
+            "alternatives": top
         })
 
         total_value += token_value
@@ -64,4 +78,173 @@ def get_wallet_yield(wallet: str, chain: str):
         "chain": chain,
         "total_value_usd": total_value,
         "positions": positions
-    }
\ No newline at end of file
+    }
+
+
+def get_wallet_yield(wallet: str, chain: str):
+    chain = chain.lower()
+
+    if chain in EVM_EXPLORERS:
+        balances = _client(chain).get_evm_balances(chain, wallet)
+    elif chain == "solana":
+        balances = _client(chain).get_solana_balances(wallet, os.getenv("HELIUS_API_KEY"))
+    else:
+        return {"error": f"❌ Unsupported chain '{chain}'"}
+
+    if not balances:
+        return {"error": "❌ No assets found for wallet"}
+
+    balances = price_tokens(chain, balances)
+    snapshot = get_pool_snapshot()
+    with timed("scoring", chain):
+        return _build_wallet_yield(wallet, chain, balances, snapshot)
+
+
+async def get_wallet_yield_async(wallet: str, chain: str, snapshot=None):
+    """
+    Async variant of get_wallet_yield; never blocks the event loop on I/O.
+
+    Args:
+        wallet (str): Wallet address.
+        chain (str): Chain name.
+        snapshot (PoolSnapshot, optional): Pool snapshot to score against. Defaults to the shared one.
+    """
+    result, _ = await _stamped_wallet_yield_async(wallet, chain, snapshot)
+    return result
+
+
+async def _stamped_wallet_yield_async(wallet: str, chain: str, snapshot=None):
+    # The result plus the cache stamp of the balances it was built from (EVM chains only)
+    chain = chain.lower()
+    stamp = None
+
+    if chain in EVM_EXPLORERS:
+        client = _client(chain)
+        balances, native = await client.get_evm_balances_with_native_async(chain, wallet)
+        stamp = await asyncio.to_thread(client.cache_stamp, chain, wallet, native)
+    elif chain == "solana":
+        balances = await _client(chain).get_solana_balances_async(wallet, os.getenv("HELIUS_API_KEY"))
+    else:
+        return {"error": f"❌ Unsupported chain '{chain}'"}, stamp
+
+    if not balances:
+        return {"error": "❌ No assets found for wallet"}, stamp
+
+    balances = await price_tokens_async(chain, balances)
+    snapshot = snapshot or await get_pool_snapshot_async()
+    with timed("scoring", chain):
+        return _build_wallet_yield(wallet, chain, balances, snapshot), stamp
+
+
+def _cache_key(wallet: str, chain: str) -> str:
+    # EVM addresses are case-insensitive; Solana addresses are not
+    return f"wallet-yield:{chain}:{wallet.lower() if wallet.lower().startswith('0x') else wallet}"
+
+
+def _cached_compute(wallet: str, chain: str, snapshot=None):
+    async def _compute():
+        result, stamp = await _stamped_wallet_yield_async(wallet, chain, snapshot)
+        if "error" not in result:
+            # Alert subscriptions follow the wallet's positions as they change
+            get_alert_hub().update_wallet(wallet, chain, result)
+        return result, stamp
+
+    return _compute
+
+
+async def get_wallet_yield_cached_async(wallet: str, chain: str, snapshot=None):
+    """
+    get_wallet_yield_async behind the shared result cache, keyed by (wallet, chain).
+
+    Concurrent requests for the same wallet share one lookup. EVM results
+    remember the ledger's last block (and in RPC mode the native balance),
+    so a cached result is dropped early once the explorer reports a newer
+    transfer or the native balance moves. Watched
+    wallets are usually already warm (see utils/watchlist).
+
+    Args:
+        wallet (str): Wallet address.
+        chain (str): Chain name.
+        snapshot (PoolSnapshot, optional): Pool snapshot to score against on a miss.
+    """
+    chain = chain.lower()
+    get_watchlist().record_hit(wallet, chain)
+
+    async def _still_valid(stamp):
+        return not await _client(chain).has_new_transfers_async(chain, wallet, stamp)
+
+    with timed("wallet_yield", chain):
+        return await get_result_cache().get_or_compute(
+            _cache_key(wallet, chain), _cached_compute(wallet, chain, snapshot), _still_valid
+        )
+
+
+async def refresh_wallet_yield_async(wallet: str, chain: str):
+    """
+    Recompute one (wallet, chain) result and store it in the result cache, ahead of demand.
+
+    Requests skip revalidating the stored result until the scheduler's next refresh is due.
+    """
+    chain = chain.lower()
+    with timed("prewarm", chain):
+        return await get_result_cache().refresh(
+            _cache_key(wallet, chain), _cached_compute(wallet, chain), trusted_for=PREWARM_INTERVAL * (1 + PREWARM_JITTER)
+        )
+
+
+def chains_for_wallet(wallet: str) -> list:
+    """
+    Chains an address can live on: every EVM chain for 0x addresses, otherwise Solana.
+    """
+    return list(EVM_CHAINS) if wallet.lower().startswith("0x") else ["solana"]
+
+
+async def get_multi_chain_yield_async(wallet: str, chains: list, timeout: float = MULTI_CHAIN_TIMEOUT):
+    """
+    Fetch one wallet's yield on several chains concurrently.
+
+    All chains are scored against one pool snapshot. A chain that fails or
+    exceeds the timeout is reported under its own key instead of failing
+    the whole lookup.
+
+    Args:
+        wallet (str): Wallet address.
+        chains (list): Chain names to query.
+        timeout (float): Per-chain time budget in seconds.
+
+    Returns:
+        dict: Per-chain results plus cross-chain totals.
+    """
+    snapshot = await get_pool_snapshot_async()
+
+    async def _one_chain(chain):
+        try:
+            return await asyncio.wait_for(get_wallet_yield_cached_async(wallet, chain, snapshot), timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"❌ Timed out after {timeout}s"}
+        except Exception as e:
+            return {"error": f"❌ Internal error fetching yield: {str(e)}"}
+
+    results = await asyncio.gather(*(_one_chain(chain) for chain in chains))
+
+    per_chain = {}
+    total_value = 0
+    total_yearly_yield = 0
+    failed_chains = []
+
+    for chain, result in zip(chains, results):
+        per_chain[chain] = result
+        if "error" in result:
+            failed_chains.append(chain)
+            continue
+
+        total_value += result["total_value_usd"]
+        total_yearly_yield += sum(p["estimated_yield_per_year_usd"] for p in result["positions"])
+
+    return {
+        "wallet": wallet,
+        "chains": per_chain,
+        "failed_chains": failed_chains,
+        "total_value_usd": total_value,
+        "estimated_yield_per_year_usd": total_yearly_yield
+    }